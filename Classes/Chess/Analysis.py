@@ -0,0 +1,135 @@
+"""
+This module scores every legal root move of a position on all CPU cores (root splitting).
+
+Root moves are generated with `Layout` in the main process, every position after a root move is sent to a worker
+of a `concurrent.futures.ProcessPoolExecutor` as a FEN string (not a pickled Layout) and its subtree is searched
+by `Engine` to a fixed depth. Scores of root moves are merged into one ranked list.
+
+Usage (from the root catalogue of the repository):
+    python -m Classes.Chess.Analysis --depth 4
+    python -m Classes.Chess.Analysis --fen "<FEN>" --depth 5 --workers 32
+
+Classes:
+    - MoveScore: Score of a root move with the size of its searched subtree.
+
+Functions:
+    - analyse(fen: str, depth: int, workers: int | None=None) -> list[MoveScore]: Ranked root moves.
+    - main(argv: list[str] | None=None) -> int: Command line entry point.
+
+Author: WK-K
+"""
+
+# standard modules
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+# project modules
+from Classes.Chess.Layout import Layout
+from Classes.Chess.Engine import Engine, SearchResult, MATE_SCORE, MAX_PLY
+from Classes.Chess.Move import MoveList, decode_move, move2uci
+
+class MoveScore:
+    """
+    Score of a root move.
+
+    ATTRIBUTES:
+        - move (str): Move in UCI notation.
+        - score (int): Score in centipawns from the point of view of the side to move at the root
+            (mate in n plies is MATE_SCORE - n).
+        - nodes (int): Number of nodes searched below the move.
+    """
+    __slots__ = ("move", "score", "nodes")
+    def __init__(self, move: str, score: int, nodes: int) -> None:
+        """Initializes the score."""
+        self.move: str = move
+        self.score: int = score
+        self.nodes: int = nodes
+    def __repr__(self) -> str:
+        """Returns one line representation."""
+        return f"{self.move}: {self.score} ({self.nodes} nodes)"
+
+# engine of a worker process, reused by all tasks the process gets
+_worker_engine: Engine | None = None
+
+def _score_subtree(fen: str, depth: int) -> tuple[int, int]:
+    """
+    Worker task: searches position after a root move to a given depth.
+
+    Arguments:
+    - fen (str): Position after the root move (opponent to move).
+    - depth (int): Remaining depth in plies.
+
+    Returns:
+    - tuple[int, int]: Score from the point of view of the side to move at the root and number of searched nodes.
+    """
+    global _worker_engine
+    if _worker_engine is None:
+        _worker_engine = Engine(time_limit=None)
+    result: SearchResult = _worker_engine.search(Layout(fen), max_depth=depth, time_limit=None)
+    score: int = -result.score
+    # mate is one ply further from the root than from the searched position
+    if score >= MATE_SCORE - MAX_PLY:
+        score -= 1
+    elif score <= -MATE_SCORE + MAX_PLY:
+        score += 1
+    return score, result.nodes
+
+def analyse(fen: str, depth: int, workers: int | None=None) -> list[MoveScore]:
+    """
+    Scores every legal move of a position by searching its subtree to a fixed depth in parallel.
+
+    Arguments:
+    - fen (str): Position to analyse.
+    - depth (int): Depth in plies, including the root move (at least 1).
+    - workers (int | None): Number of worker processes (number of CPUs if None, 1 searches in this process).
+
+    Returns:
+    - list[MoveScore]: Root moves ranked from the best one.
+    """
+    if depth < 1:
+        raise ValueError(f"Analysis depth has to be at least 1: {depth}")
+    layout = Layout(fen)
+    moves: list[int] = list(layout.generate_moves(MoveList()))
+    # positions are sent to workers as FEN strings
+    child_fens: list[str] = []
+    for move in moves:
+        undo = layout.make_move(*decode_move(move))
+        child_fens.append(layout.layout2fen())
+        layout.unmake_move(undo)
+
+    if workers == 1:
+        results: list[tuple[int, int]] = [_score_subtree(child_fen, depth - 1) for child_fen in child_fens]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results: list[tuple[int, int]] = list(executor.map(_score_subtree, child_fens,
+                                                               [depth - 1] * len(child_fens)))
+
+    ranked: list[MoveScore] = [MoveScore(move2uci(move), score, nodes) for move, (score, nodes) in zip(moves, results)]
+    ranked.sort(key=lambda move_score: move_score.score, reverse=True)
+    return ranked
+
+def main(argv: list[str] | None=None) -> int:
+    """Command line entry point: prints ranked root moves, total nodes and nodes per second."""
+    parser = argparse.ArgumentParser(prog="python -m Classes.Chess.Analysis",
+                                     description="Score all root moves of a position on all CPU cores.")
+    parser.add_argument("--fen", default=None, help="position to analyse (defaults to the start position)")
+    parser.add_argument("--depth", type=int, default=4, help="depth in plies including the root move (default: 4)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help=f"number of worker processes (default: number of CPUs, {os.cpu_count()})")
+    args = parser.parse_args(argv)
+
+    fen: str = args.fen if args.fen else Layout().layout2fen()
+    start: float = time.perf_counter()
+    ranked: list[MoveScore] = analyse(fen, args.depth, args.workers)
+    elapsed: float = time.perf_counter() - start
+
+    for move_score in ranked:
+        print(move_score)
+    nodes: int = sum(move_score.nodes for move_score in ranked)
+    print(f"\nDepth: {args.depth}\nNodes: {nodes}\nTime: {elapsed:.2f} s\nNPS: {nodes / max(elapsed, 1e-9):.0f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,243 @@
+"""
+This module converts many positions at once into NumPy arrays (for machine learning data preparation)
+and answers simple queries about all of them with array operations instead of Python loops over `Layout.fields`.
+
+A `Batch` is built from layouts (`Batch.from_layouts()`), from packed records in memory (`Batch.from_records()`)
+or straight from a file of packed records (`Batch.load()`, see Classes.Chess.Positions), in which case
+records are unpacked by NumPy without creating any Layout.
+
+Board tensors:
+    - boards: (N, 64) int8 piece numbers as in `Layout.fields` (0 = a1, ..., 63 = h8),
+    - planes(): (N, 12, 8, 8) one-hot piece planes in the same order as NNUE input features
+      (white pawn, rook, knight, bishop, queen, king, then black ones), indexed by [rank][file] with rank 1 first,
+      so `planes().reshape(N, 768)` equals `NNUE.features()` of the same layouts,
+    - state(): (N, 13) side to move, castling rights (K, Q, k, q) and one-hot en passant file.
+
+Queries (all (N, ...) arrays):
+    - piece_counts(), material(): Number of pieces of every plane and material balance in centipawns.
+    - leaper_attacks(): Squares attacked by pawns, knights and kings of each colour.
+    - mobility(): Pseudo-legal moves of knights, bishops, rooks, queens and kings of each colour
+      (pins, checks, pawns and castling are not taken into account).
+
+NumPy is required by this module only (optional dependency of the project).
+
+Classes:
+    - Batch: Arrays describing N positions with vectorized queries.
+
+Author: WK-K
+"""
+
+# standard modules
+from __future__ import annotations
+from itertools import chain
+import os
+from typing import Sequence
+# external modules
+import numpy as np
+# project modules
+from Classes.Chess.Common import PACKED_SIZE, position2bytes, piece_values, \
+    knight_targets, king_targets, pawn_captures, direction_rays
+from Classes.Chess.Layout import Layout
+
+# CONSTANTS:
+RECORD_DTYPE: np.dtype = np.dtype([("occupancy", "<u8"), ("pieces", "u1", 16), ("flags", "u1"),
+                                   ("en_passant", "u1"), ("clock", "<u2"), ("moves_made", "<u2")])
+"""NumPy view of a packed record (see `position2bytes()` in Common.py)."""
+assert RECORD_DTYPE.itemsize == PACKED_SIZE
+
+PLANE_PIECES: np.ndarray = np.array([9, 10, 11, 12, 13, 14, 1, 2, 3, 4, 5, 6], dtype=np.int8)
+"""Piece number (as in Layout.fields) of every plane of planes()."""
+
+# TABLES:
+def _target_matrix(targets: list[tuple[int, ...]]) -> np.ndarray:
+    """
+    Returns (64, 64) matrix with 1 in [from square, to square] for given target squares of every square
+    (float32, so products of piece masks and matrices run as BLAS matrix multiplications).
+    """
+    matrix: np.ndarray = np.zeros((64, 64), dtype=np.float32)
+    for square, squares in enumerate(targets):
+        matrix[square, list(squares)] = 1
+    return matrix
+
+_knight_matrix: np.ndarray = _target_matrix(knight_targets)
+_king_matrix: np.ndarray = _target_matrix(king_targets)
+_pawn_matrices: list[np.ndarray] = [_target_matrix(pawn_captures[0]), _target_matrix(pawn_captures[1])]
+
+_signed_material: np.ndarray = np.array([0] + [-value for value in piece_values[1:6]] + [0, 0]
+                                        + [0] + piece_values[1:6] + [0, 0], dtype=np.int32)
+"""Material of a piece number, white positive, black negative (kings are not counted)."""
+
+# rays of all 8 directions of every square as (64, 8, 7) square indices, padded with 64 (a square that is always occupied)
+_directions: list[tuple[int, int]] = list(direction_rays[0].keys())
+_rays: np.ndarray = np.full((64, 8, 7), 64, dtype=np.intp)
+for _square in range(64):
+    for _direction_index, _direction in enumerate(_directions):
+        _ray: tuple[int, ...] = direction_rays[_square][_direction]
+        _rays[_square, _direction_index, :len(_ray)] = _ray
+_ray_lengths: np.ndarray = (_rays != 64).sum(axis=2)
+_diagonal: np.ndarray = np.array([row != 0 and col != 0 for row, col in _directions])
+"""Whether a direction (in the order of `_rays`) is diagonal."""
+del _square, _direction_index, _direction, _ray
+
+# CLASSES:
+class Batch:
+    """
+    Arrays describing N positions with vectorized queries.
+
+    ATTRIBUTES:
+        - boards (np.ndarray): (N, 64) int8 piece numbers as in Layout.fields.
+        - white_to_move (np.ndarray): (N,) bool.
+        - castling (np.ndarray): (N, 4) bool castling rights (K, Q, k, q).
+        - en_passant (np.ndarray): (N,) int8 en passant square or -1.
+        - clock (np.ndarray), moves_made (np.ndarray): (N,) int32.
+
+    METHODS:
+        - from_layouts(layouts: Sequence[Layout]) -> Batch: Batch of layouts.
+        - from_records(records: bytes | np.ndarray) -> Batch: Batch of packed records.
+        - load(path: str) -> Batch: Batch of a file of packed records (memory-mapped while unpacked).
+        - layout(index: int) -> Layout: Position of a given index.
+        - planes(dtype=np.float32) -> np.ndarray, state(dtype=np.float32) -> np.ndarray: Network inputs.
+        - piece_counts() -> np.ndarray, material() -> np.ndarray: Material queries.
+        - leaper_attacks() -> np.ndarray, mobility() -> np.ndarray: Attack and mobility queries.
+    """
+    __slots__ = ("boards", "white_to_move", "castling", "en_passant", "clock", "moves_made")
+    def __init__(self, boards: np.ndarray, white_to_move: np.ndarray, castling: np.ndarray,
+                 en_passant: np.ndarray, clock: np.ndarray, moves_made: np.ndarray) -> None:
+        """Initializes batch from arrays (see class attributes)."""
+        self.boards: np.ndarray = boards
+        self.white_to_move: np.ndarray = white_to_move
+        self.castling: np.ndarray = castling
+        self.en_passant: np.ndarray = en_passant
+        self.clock: np.ndarray = clock
+        self.moves_made: np.ndarray = moves_made
+    def __len__(self) -> int:
+        """Returns number of positions."""
+        return self.boards.shape[0]
+
+    # Construction
+    @classmethod
+    def from_layouts(cls, layouts: Sequence[Layout]) -> Batch:
+        """Returns batch of layouts (fields of all layouts are copied in one pass)."""
+        count: int = len(layouts)
+        boards: np.ndarray = np.fromiter(chain.from_iterable(layout.fields for layout in layouts),
+                                         dtype=np.int8, count=64 * count).reshape(count, 64)
+        return cls(boards,
+                   np.fromiter((layout.white_moves for layout in layouts), dtype=bool, count=count),
+                   np.array([layout.castling for layout in layouts], dtype=bool).reshape(count, 4),
+                   np.fromiter((-1 if layout.en_passant is None else layout.en_passant for layout in layouts),
+                               dtype=np.int8, count=count),
+                   np.fromiter((layout.clock for layout in layouts), dtype=np.int32, count=count),
+                   np.fromiter((layout.moves_made for layout in layouts), dtype=np.int32, count=count))
+    @classmethod
+    def from_records(cls, records: bytes | np.ndarray) -> Batch:
+        """
+        Returns batch of packed records, unpacked with array operations only.
+
+        Arguments:
+        - records (bytes | np.ndarray): Concatenated records (bytes, bytearray, mmap) or an array of RECORD_DTYPE.
+
+        Raises:
+        - ValueError: When size of the data is not a multiple of PACKED_SIZE.
+        """
+        if not isinstance(records, np.ndarray):
+            if len(records) % PACKED_SIZE:
+                raise ValueError(f"Size of records ({len(records)} B) is not a multiple of {PACKED_SIZE} B")
+            records = np.frombuffer(records, dtype=RECORD_DTYPE)
+        count: int = records.shape[0]
+        # occupied squares, bit i of occupancy is square i
+        occupancy: np.ndarray = np.ascontiguousarray(records["occupancy"]).view(np.uint8).reshape(count, 8)
+        occupied: np.ndarray = np.unpackbits(occupancy, axis=1, bitorder="little").astype(bool)
+        # pieces of occupied squares in ascending square order, lower nibble first
+        packed: np.ndarray = records["pieces"]
+        pieces: np.ndarray = np.empty((count, 32), dtype=np.int8)
+        pieces[:, 0::2] = packed & 15
+        pieces[:, 1::2] = packed >> 4
+        # n-th occupied square gets n-th piece
+        order: np.ndarray = np.cumsum(occupied, axis=1) - 1
+        boards: np.ndarray = np.where(occupied, np.take_along_axis(pieces, np.clip(order, 0, 31), axis=1), 0)
+        flags: np.ndarray = records["flags"]
+        en_passant: np.ndarray = records["en_passant"].astype(np.int8) # 255 (no square) becomes -1
+        return cls(boards.astype(np.int8),
+                   (flags & 1).astype(bool),
+                   ((flags[:, None] >> np.arange(1, 5, dtype=np.uint8)) & 1).astype(bool),
+                   en_passant,
+                   records["clock"].astype(np.int32),
+                   records["moves_made"].astype(np.int32))
+    @classmethod
+    def load(cls, path: str) -> Batch:
+        """Returns batch of all records of a file of packed positions (memory-mapped, not read as a whole first)."""
+        if os.path.getsize(path) == 0: # empty files can not be mapped
+            return cls.from_records(b"")
+        return cls.from_records(np.memmap(path, dtype=RECORD_DTYPE, mode="r"))
+    def layout(self, index: int) -> Layout:
+        """Returns position of a given index as a Layout."""
+        en_passant: int = int(self.en_passant[index])
+        return Layout(position2bytes(self.boards[index].tolist(), bool(self.white_to_move[index]),
+                                     self.castling[index].tolist(), None if en_passant < 0 else en_passant,
+                                     int(self.clock[index]), int(self.moves_made[index])))
+
+    # Network inputs
+    def planes(self, dtype: np.dtype=np.float32) -> np.ndarray:
+        """Returns (N, 12, 8, 8) one-hot piece planes (see PLANE_PIECES), indexed by [rank][file], rank 1 first."""
+        one_hot: np.ndarray = self.boards[:, None, :] == PLANE_PIECES[None, :, None]
+        return one_hot.reshape(len(self), 12, 8, 8).astype(dtype)
+    def state(self, dtype: np.dtype=np.float32) -> np.ndarray:
+        """Returns (N, 13) columns: white to move, castling rights (K, Q, k, q), en passant file (one-hot, a-h)."""
+        columns: np.ndarray = np.zeros((len(self), 13), dtype=dtype)
+        columns[:, 0] = self.white_to_move
+        columns[:, 1:5] = self.castling
+        has_en_passant: np.ndarray = self.en_passant >= 0
+        columns[np.flatnonzero(has_en_passant), 5 + self.en_passant[has_en_passant] % 8] = 1
+        return columns
+
+    # Queries
+    def piece_counts(self) -> np.ndarray:
+        """Returns (N, 12) int32 number of pieces of every plane (see PLANE_PIECES)."""
+        return (self.boards[:, None, :] == PLANE_PIECES[None, :, None]).sum(axis=2, dtype=np.int32)
+    def material(self) -> np.ndarray:
+        """Returns (N,) int32 material balance in centipawns (white positive, kings not counted, see piece_values)."""
+        return _signed_material[self.boards].sum(axis=1, dtype=np.int32)
+    def leaper_attacks(self) -> np.ndarray:
+        """
+        Returns (N, 2, 64) bool squares attacked by pawns, knights and kings of each colour ([black, white]).
+        Sliding pieces are not included.
+        """
+        attacks: np.ndarray = np.empty((len(self), 2, 64), dtype=bool)
+        for colour in (0, 1):
+            pieces: int = colour << 3
+            attacked: np.ndarray = (self.boards == pieces + 1).astype(np.float32) @ _pawn_matrices[colour]
+            attacked += (self.boards == pieces + 3).astype(np.float32) @ _knight_matrix
+            attacked += (self.boards == pieces + 6).astype(np.float32) @ _king_matrix
+            attacks[:, colour] = attacked > 0
+        return attacks
+    def mobility(self) -> np.ndarray:
+        """
+        Returns (N, 2) int32 number of pseudo-legal moves of knights, bishops, rooks, queens and kings
+        of each colour ([black, white]): target squares which are empty or occupied by an opponent's piece.
+        Pins, checks, pawn moves and castling are not taken into account.
+        Uses about 12 kB of temporary memory per position (split very large batches).
+        """
+        count: int = len(self)
+        colours: np.ndarray = np.where(self.boards == 0, -1, self.boards >> 3).astype(np.int8) # -1 empty, 0, 1
+        # colour of every ray square, padding square 64 is occupied by a piece of neither colour (2)
+        padded: np.ndarray = np.concatenate((colours, np.full((count, 1), 2, dtype=np.int8)), axis=1)
+        ray_colours: np.ndarray = padded[:, _rays] # (N, 64, 8, 7)
+        empty_run: np.ndarray = np.cumprod(ray_colours == -1, axis=3, dtype=np.int8).sum(axis=3) # (N, 64, 8)
+        blocker: np.ndarray = np.take_along_axis(ray_colours, np.minimum(empty_run, 6)[..., None], axis=3)[..., 0]
+        blocked: np.ndarray = empty_run < _ray_lengths
+        mobility: np.ndarray = np.zeros((count, 2), dtype=np.int32)
+        for colour in (0, 1):
+            pieces: int = colour << 3
+            own: np.ndarray = colours == colour
+            # squares reachable along every ray: empty ones and an opponent's piece at the end
+            reach: np.ndarray = empty_run + (blocked & (blocker == (colour ^ 1)))
+            diagonal: np.ndarray = reach[:, :, _diagonal].sum(axis=2)
+            orthogonal: np.ndarray = reach[:, :, ~_diagonal].sum(axis=2)
+            boards: np.ndarray = self.boards
+            not_own: np.ndarray = (~own).astype(np.float32)
+            mobility[:, colour] = \
+                (diagonal * ((boards == pieces + 4) | (boards == pieces + 5))).sum(axis=1) + \
+                (orthogonal * ((boards == pieces + 2) | (boards == pieces + 5))).sum(axis=1) + \
+                ((not_own @ _knight_matrix.T) * (boards == pieces + 3)).sum(axis=1, dtype=np.int32) + \
+                ((not_own @ _king_matrix.T) * (boards == pieces + 6)).sum(axis=1, dtype=np.int32)
+        return mobility
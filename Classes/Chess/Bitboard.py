@@ -0,0 +1,645 @@
+"""
+This module defines the `Bitboards` class, an alternative board representation for `Layout`
+(selected with `Layout(fen, backend="bitboard")`), together with attack tables precomputed at import.
+
+Every square is one bit of an integer (bit 0 = a1, bit 1 = b1, ..., bit 63 = h8),
+in the same order as indices of `Layout.fields`.
+
+Tables:
+    - KNIGHT_ATTACKS (list[int]): Mask of squares attacked by a knight standing on a given square.
+    - KING_ATTACKS (list[int]): Mask of squares attacked by a king standing on a given square.
+    - PAWN_ATTACKS (list[list[int]]): Masks of squares attacked by a pawn, indexed by [colour][square],
+                                      where colour is 0 for black and 1 for white.
+    - RAYS (list[list[int]]): Masks of all squares in a direction (origin excluded), indexed by [direction][square].
+                              Directions 0-3 go towards higher indices, 4-7 towards lower ones.
+    - ROOK_LOOKUP, BISHOP_LOOKUP (list[tuple[int, dict[int, int], int, dict[int, int]]]):
+                              Per square (mask, attacks) pairs of the two lines (file and rank, diagonal and 
+                              anti-diagonal) of a slider. A mask holds squares of a line that can block it
+                              (squares at the edge of the board never do), attacks along the line are looked up 
+                              by `occupied & mask`, so a slider needs two dictionary lookups instead of walking its rays.
+    - ROOK_REACH, BISHOP_REACH (list[int]): Masks of squares attacked by a slider on an empty board.
+    - BETWEEN (list[list[int]]): Masks of squares strictly between two squares on a common line 
+                              (0 when the squares are not on a line), indexed by [square][square].
+
+Classes:
+    - Bitboards: Piece bitboards and occupancy masks of a single position with move and attack generation
+                 (including legal moves with check and pin masks, see `Bitboards.legal_targets()`
+                 and `Bitboards.legal_moves()`).
+
+Functions:
+    - squares_of(mask: int): Generator yielding indices of set bits of a mask, lowest first.
+    - rook_attacks(square: int, occupied: int) -> int: Rook attack mask with blockers taken into account
+                                                       (looked up in ROOK_LOOKUP).
+    - bishop_attacks(square: int, occupied: int) -> int: Bishop attack mask with blockers taken into account.
+
+Author: WK-K
+"""
+
+# TABLES:
+DIRECTIONS: list[tuple[int, int]] = [(1, 0), (0, 1), (1, 1), (1, -1),
+                                     (-1, 0), (0, -1), (-1, -1), (-1, 1)]
+"""(row, column) offsets of ray directions, first four increase the square index, last four decrease it."""
+
+def _leaper_table(offsets: list[tuple[int, int]]) -> list[int]:
+    """Returns list of 64 masks of squares reachable from every square with given (row, column) offsets."""
+    table: list[int] = []
+    for square in range(64):
+        row, col = divmod(square, 8)
+        mask: int = 0
+        for row_offset, col_offset in offsets:
+            if 0 <= row + row_offset < 8 and 0 <= col + col_offset < 8:
+                mask |= 1 << ((row + row_offset) * 8 + col + col_offset)
+        table.append(mask)
+    return table
+
+def _ray_table() -> list[list[int]]:
+    """Returns ray masks indexed by [direction][square] (see DIRECTIONS)."""
+    table: list[list[int]] = []
+    for row_offset, col_offset in DIRECTIONS:
+        rays: list[int] = []
+        for square in range(64):
+            row, col = divmod(square, 8)
+            mask: int = 0
+            row, col = row + row_offset, col + col_offset
+            while 0 <= row < 8 and 0 <= col < 8:
+                mask |= 1 << (row * 8 + col)
+                row, col = row + row_offset, col + col_offset
+            rays.append(mask)
+        table.append(rays)
+    return table
+
+def _slider_rays(square: int, occupied: int, directions: tuple[int, ...]) -> int:
+    """Returns mask of squares attacked along given directions, every ray ends at (and includes) its first blocker."""
+    attacks: int = 0
+    for direction in directions:
+        ray: int = RAYS[direction][square]
+        blockers: int = ray & occupied
+        if blockers:
+            # nearest blocker is the lowest set bit for rising directions and the highest one otherwise
+            if direction < 4:
+                blocker: int = (blockers & -blockers).bit_length() - 1
+            else:
+                blocker: int = blockers.bit_length() - 1
+            ray ^= RAYS[direction][blocker]
+        attacks |= ray
+    return attacks
+
+def _line_lookup(line: int) -> list[tuple[int, dict[int, int]]]:
+    """
+    Returns (mask, attacks) of a line (directions `line` and `line + 4`) for every square,
+    attacks are computed with _slider_rays() for every subset of the mask.
+    """
+    lookup: list[tuple[int, dict[int, int]]] = []
+    for square in range(64):
+        mask: int = 0
+        for direction in (line, line + 4):
+            ray: int = RAYS[direction][square]
+            if ray:
+                # the farthest square of a ray does not block anything
+                edge: int = ray.bit_length() - 1 if direction < 4 else (ray & -ray).bit_length() - 1
+                mask |= ray ^ (1 << edge)
+        attacks: dict[int, int] = {}
+        subset: int = 0
+        while True:
+            attacks[subset] = _slider_rays(square, subset, (line, line + 4))
+            subset = (subset - mask) & mask # next subset of the mask (carry-rippler)
+            if not subset:
+                break
+        lookup.append((mask, attacks))
+    return lookup
+
+def _between_table() -> list[list[int]]:
+    """Returns masks of squares between every two squares of a common line (see BETWEEN)."""
+    table: list[list[int]] = [[0] * 64 for _ in range(64)]
+    for square in range(64):
+        for direction in range(8):
+            passed: int = 0
+            ray: int = RAYS[direction][square]
+            # squares of the ray nearest first
+            for other in (range(square + 1, 64) if direction < 4 else range(square - 1, -1, -1)):
+                if ray >> other & 1:
+                    table[square][other] = passed
+                    passed |= 1 << other
+    return table
+
+KNIGHT_ATTACKS: list[int] = _leaper_table([(-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1)])
+KING_ATTACKS: list[int] = _leaper_table([(1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (-1, -1), (1, -1), (-1, 1)])
+PAWN_ATTACKS: list[list[int]] = [_leaper_table([(-1, -1), (-1, 1)]), _leaper_table([(1, -1), (1, 1)])]
+RAYS: list[list[int]] = _ray_table()
+ROOK_LOOKUP: list[tuple[int, dict[int, int], int, dict[int, int]]] = \
+    [file + rank for file, rank in zip(_line_lookup(0), _line_lookup(1))]
+BISHOP_LOOKUP: list[tuple[int, dict[int, int], int, dict[int, int]]] = \
+    [diagonal + anti_diagonal for diagonal, anti_diagonal in zip(_line_lookup(2), _line_lookup(3))]
+ROOK_REACH: list[int] = [RAYS[0][square] | RAYS[1][square] | RAYS[4][square] | RAYS[5][square] for square in range(64)]
+BISHOP_REACH: list[int] = [RAYS[2][square] | RAYS[3][square] | RAYS[6][square] | RAYS[7][square] for square in range(64)]
+BETWEEN: list[list[int]] = _between_table()
+ALL_SQUARES: int = 0xFFFFFFFFFFFFFFFF
+NOT_FILE_A: int = ALL_SQUARES ^ 0x0101010101010101
+NOT_FILE_H: int = ALL_SQUARES ^ 0x8080808080808080
+RANK_3: int = 0xFF << 16
+RANK_6: int = 0xFF << 40
+# move codes (as in Classes.Chess.Move, not imported to keep this module free of dependencies)
+_DOUBLE_PUSH: int = 1 << 12
+_CASTLING: int = 2 << 12
+_EN_PASSANT: int = 3 << 12
+
+# FUNCTIONS:
+def squares_of(mask: int):
+    """Generator yielding indices of set bits of a mask, lowest first."""
+    while mask:
+        low_bit: int = mask & -mask
+        yield low_bit.bit_length() - 1
+        mask ^= low_bit
+
+def rook_attacks(square: int, occupied: int) -> int:
+    """Returns mask of squares attacked by a rook on `square` with `occupied` squares blocking its rays."""
+    file_mask, file_attacks, rank_mask, rank_attacks = ROOK_LOOKUP[square]
+    return file_attacks[occupied & file_mask] | rank_attacks[occupied & rank_mask]
+
+def bishop_attacks(square: int, occupied: int) -> int:
+    """Returns mask of squares attacked by a bishop on `square` with `occupied` squares blocking its rays."""
+    diagonal_mask, diagonal_attacks, anti_mask, anti_attacks = BISHOP_LOOKUP[square]
+    return diagonal_attacks[occupied & diagonal_mask] | anti_attacks[occupied & anti_mask]
+
+# CLASSES:
+class Bitboards:
+    """
+    Piece bitboards and occupancy masks of a single position.
+
+    ATTRIBUTES:
+        - boards (list[int]): 16 masks indexed by numbers used in `Layout.fields`:
+            0 - all occupied squares
+            1-6 - black pieces (pawn, rook, knight, bishop, queen, king)
+            7 - all black pieces
+            9-14 - white pieces (pawn, rook, knight, bishop, queen, king)
+            15 - all white pieces
+            (8 is unused)
+          so the occupancy of a colour is `boards[colour_bit | 7]`.
+
+    METHODS:
+        - __init__(fields: list[int]) -> None:
+            Builds bitboards from 64 element array of fields.
+        - copy() -> Bitboards:
+            Returns an independent copy.
+        - add(square: int, piece: int) -> None / remove(square: int, piece: int) -> None:
+            Puts piece on / takes piece off a square.
+        - snapshot() -> tuple[int, ...] / restore(snapshot: tuple[int, ...]) -> None:
+            Saves / restores all masks (used by `Layout.unmake_move`).
+        - attackers(square: int, by_white: bool) -> int:
+            Mask of pieces of a given colour attacking a square.
+        - is_square_attacked(square: int, by_white: bool, occupied: int | None=None) -> bool:
+            Whether a square is attacked by pieces of a given colour (optionally with other blockers).
+        - any_square_attacked(squares: tuple[int, ...], by_white: bool) -> bool:
+            Whether any of given squares is attacked by pieces of a given colour.
+        - targets(square: int, piece: int, en_passant: int | None, castling: list[bool], with_castling: bool) -> tuple[int, int]:
+            Masks of non-capturing and capturing pseudo-legal moves of a piece.
+        - legal_targets(white: bool, en_passant: int | None, castling: list[bool]) -> list[tuple[int, int]]:
+            Masks of legal moves of every piece of the side to move that can move (king first).
+        - legal_moves(white: bool, en_passant: int | None, castling: list[bool]) -> list[int]:
+            Packed legal moves of the side to move (pawns moved as whole masks).
+    """
+    __slots__ = ("boards",)
+
+    def __init__(self, fields: list[int]) -> None:
+        """Builds bitboards from 64 element array of fields (as in `Layout.fields`)."""
+        self.boards: list[int] = [0] * 16
+        for square, piece in enumerate(fields):
+            if piece:
+                self.add(square, piece)
+    def copy(self) -> "Bitboards":
+        """Returns an independent copy."""
+        new: Bitboards = Bitboards.__new__(Bitboards)
+        new.boards = self.boards[:]
+        return new
+    def add(self, square: int, piece: int) -> None:
+        """Puts `piece` on `square` (square is assumed to be empty)."""
+        bit: int = 1 << square
+        boards: list[int] = self.boards
+        boards[piece] |= bit
+        boards[(piece & 8) | 7] |= bit
+        boards[0] |= bit
+    def remove(self, square: int, piece: int) -> None:
+        """Takes `piece` off `square`."""
+        mask: int = ~(1 << square)
+        boards: list[int] = self.boards
+        boards[piece] &= mask
+        boards[(piece & 8) | 7] &= mask
+        boards[0] &= mask
+    def snapshot(self) -> tuple[int, ...]:
+        """Returns all masks as a tuple, to be passed back to restore()."""
+        return tuple(self.boards)
+    def restore(self, snapshot: tuple[int, ...]) -> None:
+        """Restores all masks saved with snapshot()."""
+        self.boards[:] = snapshot
+    def attackers(self, square: int, by_white: bool) -> int:
+        """Returns mask of pieces of a given colour that attack `square`."""
+        boards: list[int] = self.boards
+        color: int = 8 if by_white else 0
+        occupied: int = boards[0]
+        queens: int = boards[5 | color]
+        return (KNIGHT_ATTACKS[square] & boards[3 | color]) | \
+               (KING_ATTACKS[square] & boards[6 | color]) | \
+               (PAWN_ATTACKS[not by_white][square] & boards[1 | color]) | \
+               (rook_attacks(square, occupied) & (boards[2 | color] | queens)) | \
+               (bishop_attacks(square, occupied) & (boards[4 | color] | queens))
+    def is_square_attacked(self, square: int, by_white: bool, occupied: int | None=None) -> bool:
+        """
+        Returns whether `square` is attacked by pieces of a given colour (cheapest tests first).
+        Sliders are blocked by `occupied` squares (all pieces if None), e.g. without the king that is moving.
+        """
+        boards: list[int] = self.boards
+        color: int = 8 if by_white else 0
+        if KNIGHT_ATTACKS[square] & boards[3 | color] or \
+           PAWN_ATTACKS[not by_white][square] & boards[1 | color] or \
+           KING_ATTACKS[square] & boards[6 | color]:
+            return True
+        queens: int = boards[5 | color]
+        if occupied is None:
+            occupied = boards[0]
+        if (boards[2 | color] | queens) and rook_attacks(square, occupied) & (boards[2 | color] | queens):
+            return True
+        if (boards[4 | color] | queens) and bishop_attacks(square, occupied) & (boards[4 | color] | queens):
+            return True
+        return False
+    def any_square_attacked(self, squares: tuple[int, ...], by_white: bool) -> bool:
+        """Returns whether any of given squares is attacked by pieces of a given colour."""
+        for square in squares:
+            if self.is_square_attacked(square, by_white):
+                return True
+        return False
+    def targets(self,
+                square: int,
+                piece: int,
+                en_passant: int | None,
+                castling: list[bool],
+                with_castling: bool=True) -> tuple[int, int]:
+        """
+        Returns masks of pseudo-legal moves of `piece` standing on `square`.
+
+        Arguments:
+        - square (int), piece (int): square (0-63) and piece number (as in `Layout.fields`)
+        - en_passant (int | None): en passant square of the position
+        - castling (list[bool]): castling availability (K, Q, k, q)
+        - with_castling (bool): whether castling moves of a king are included
+
+        Returns:
+        - tuple[int, int]: mask of non-capturing moves and mask of capturing moves
+        (en passant capture is included in the latter). Same moves as `Layout.all_possible_moves_for_piece()`.
+        """
+        boards: list[int] = self.boards
+        color: int = piece & 8
+        own: int = boards[color | 7]
+        enemy: int = boards[(color ^ 8) | 7]
+        occupied: int = boards[0]
+        kind: int = piece & 7
+
+        # Pawn
+        if kind == 1:
+            quiet: int = 0
+            if color:
+                if not occupied & (1 << (square + 8)):
+                    quiet = 1 << (square + 8)
+                    if 8 <= square < 16 and not occupied & (1 << (square + 16)):
+                        quiet |= 1 << (square + 16)
+            else:
+                if not occupied & (1 << (square - 8)):
+                    quiet = 1 << (square - 8)
+                    if 48 <= square < 56 and not occupied & (1 << (square - 16)):
+                        quiet |= 1 << (square - 16)
+            capture_squares: int = enemy
+            if en_passant is not None:
+                capture_squares |= 1 << en_passant
+            return quiet, PAWN_ATTACKS[color >> 3][square] & capture_squares
+
+        # Other pieces
+        if kind == 3:
+            attacks: int = KNIGHT_ATTACKS[square]
+        elif kind == 2:
+            attacks: int = rook_attacks(square, occupied)
+        elif kind == 4:
+            attacks: int = bishop_attacks(square, occupied)
+        elif kind == 5:
+            attacks: int = rook_attacks(square, occupied) | bishop_attacks(square, occupied)
+        else:
+            attacks: int = KING_ATTACKS[square]
+        quiet: int = attacks & ~occupied
+
+        # Castling (rook on its square, empty fields between, king not passing attacked fields)
+        if kind == 6 and with_castling:
+            if color and square == 4:
+                if castling[0] and boards[10] & 0x80 and not occupied & 0x60 and \
+                    not self.any_square_attacked((4, 5, 6), False):
+                    quiet |= 1 << 6
+                if castling[1] and boards[10] & 0x01 and not occupied & 0x0E and \
+                    not self.any_square_attacked((4, 3, 2), False):
+                    quiet |= 1 << 2
+            elif not color and square == 60:
+                if castling[2] and boards[2] & (0x80 << 56) and not occupied & (0x60 << 56) and \
+                    not self.any_square_attacked((60, 61, 62), True):
+                    quiet |= 1 << 62
+                if castling[3] and boards[2] & (0x01 << 56) and not occupied & (0x0E << 56) and \
+                    not self.any_square_attacked((60, 59, 58), True):
+                    quiet |= 1 << 58
+
+        return quiet, attacks & enemy
+    def _king_and_pins(self, white: bool, castling: list[bool]) -> tuple[int, int, int, int, dict[int, int]]:
+        """
+        Returns what legal move generation needs before pieces other than the king are moved:
+        king square, mask of legal king targets (castling included), mask of squares other pieces may move to
+        (squares without own pieces, limited to capturing or blocking the checker in check, 0 in double check),
+        mask of pinned pieces and the line (between the king and the pinner, pinner included) of every pinned piece.
+
+        King targets are tested with the king lifted off the board, pinned pieces are found along BETWEEN masks
+        of enemy sliders that see the king on an empty board.
+        """
+        boards: list[int] = self.boards
+        color: int = 8 if white else 0
+        enemy: int = color ^ 8
+        occupied: int = boards[0]
+        allowed: int = ~boards[color | 7] & ALL_SQUARES # squares without own pieces
+        king: int = boards[6 | color].bit_length() - 1
+        is_attacked = self.is_square_attacked
+        checkers: int = self.attackers(king, not white)
+
+        # King (its own square is not a blocker for squares behind it)
+        targets: int = KING_ATTACKS[king] & allowed
+        lifted: int = occupied ^ (1 << king)
+        for square in squares_of(targets):
+            if is_attacked(square, not white, lifted):
+                targets ^= 1 << square
+        if not checkers:
+            if white and king == 4:
+                if castling[0] and boards[10] & 0x80 and not occupied & 0x60 and \
+                    not is_attacked(5, False) and not is_attacked(6, False):
+                    targets |= 1 << 6
+                if castling[1] and boards[10] & 0x01 and not occupied & 0x0E and \
+                    not is_attacked(3, False) and not is_attacked(2, False):
+                    targets |= 1 << 2
+            elif not white and king == 60:
+                if castling[2] and boards[2] & (0x80 << 56) and not occupied & (0x60 << 56) and \
+                    not is_attacked(61, True) and not is_attacked(62, True):
+                    targets |= 1 << 62
+                if castling[3] and boards[2] & (0x01 << 56) and not occupied & (0x0E << 56) and \
+                    not is_attacked(59, True) and not is_attacked(58, True):
+                    targets |= 1 << 58
+        # in double check only the king can move
+        if checkers & (checkers - 1):
+            return king, targets, 0, 0, {}
+
+        # check mask: capture the checker or block a sliding one
+        if checkers:
+            allowed &= checkers | BETWEEN[king][checkers.bit_length() - 1]
+        # pins: own piece alone between the king and an enemy slider, it may move only along that line
+        pinned: int = 0
+        pins: dict[int, int] = {}
+        enemy_rooks: int = boards[2 | enemy] | boards[5 | enemy]
+        enemy_bishops: int = boards[4 | enemy] | boards[5 | enemy]
+        for slider in squares_of((ROOK_REACH[king] & enemy_rooks) | (BISHOP_REACH[king] & enemy_bishops)):
+            between: int = BETWEEN[king][slider]
+            blockers: int = between & occupied
+            if blockers & (blockers - 1) == 0 and blockers & boards[color | 7]:
+                pinned |= blockers
+                pins[blockers.bit_length() - 1] = between | (1 << slider)
+        return king, targets, allowed, pinned, pins
+    def _pawn_targets(self, square: int, white: bool, allowed: int) -> int:
+        """Returns mask of pushes and captures of a pawn limited to `allowed` squares (en passant not included)."""
+        occupied: int = self.boards[0]
+        push: int = 8 if white else -8
+        targets: int = 0
+        forward: int = square + push
+        if not occupied >> forward & 1:
+            targets = 1 << forward
+            # double push from the second (seventh) rank
+            if (square < 16 if white else square >= 48) and not occupied >> (forward + push) & 1:
+                targets |= 1 << (forward + push)
+        return targets & allowed | PAWN_ATTACKS[white][square] & self.boards[(0 if white else 8) | 7] & allowed
+    def _en_passant_legal(self, square: int, white: bool, en_passant: int, king: int) -> bool:
+        """
+        Whether a pawn on `square` can capture en passant: both pawns leave their squares,
+        which can uncover a check along the rank (or a diagonal), so attacks on the king are recomputed.
+        """
+        boards: list[int] = self.boards
+        enemy: int = 0 if white else 8
+        captured: int = en_passant - (8 if white else -8)
+        after: int = boards[0] ^ (1 << square) ^ (1 << captured) ^ (1 << en_passant)
+        return not (rook_attacks(king, after) & (boards[2 | enemy] | boards[5 | enemy]) or
+                    bishop_attacks(king, after) & (boards[4 | enemy] | boards[5 | enemy]) or
+                    KNIGHT_ATTACKS[king] & boards[3 | enemy] or
+                    PAWN_ATTACKS[white][king] & boards[1 | enemy] & ~(1 << captured))
+    def legal_targets(self, white: bool, en_passant: int | None, castling: list[bool]) -> list[tuple[int, int]]:
+        """
+        Returns legal moves of the side to move as (square, mask of target squares) of every piece that can move, 
+        king first (castling included, a promotion is one target square).
+
+        Works only on bitboards: checkers and pinned pieces are found once (see _king_and_pins()),
+        then moves of other pieces are masked with them. No move is played.
+
+        Arguments:
+        - white (bool): Whether white is to move.
+        - en_passant (int | None), castling (list[bool]): En passant square and castling availability (K, Q, k, q).
+        """
+        boards: list[int] = self.boards
+        color: int = 8 if white else 0
+        occupied: int = boards[0]
+        king, targets, allowed, pinned, pins = self._king_and_pins(white, castling)
+        result: list[tuple[int, int]] = [(king, targets)] if targets else []
+        if not allowed:
+            return result
+
+        # Knights (a pinned knight can not move)
+        for square in squares_of(boards[3 | color] & ~pinned):
+            targets = KNIGHT_ATTACKS[square] & allowed
+            if targets:
+                result.append((square, targets))
+        # Sliders
+        for pieces, lookups in ((boards[2 | color], (ROOK_LOOKUP,)), (boards[4 | color], (BISHOP_LOOKUP,)),
+                                (boards[5 | color], (ROOK_LOOKUP, BISHOP_LOOKUP))):
+            for square in squares_of(pieces):
+                targets = 0
+                for lookup in lookups:
+                    first_mask, first_attacks, second_mask, second_attacks = lookup[square]
+                    targets |= first_attacks[occupied & first_mask] | second_attacks[occupied & second_mask]
+                targets &= allowed
+                if pinned >> square & 1:
+                    targets &= pins[square]
+                if targets:
+                    result.append((square, targets))
+        # Pawns
+        pawn_attacks: list[int] = PAWN_ATTACKS[white]
+        for square in squares_of(boards[1 | color]):
+            targets = self._pawn_targets(square, white, allowed)
+            if pinned >> square & 1:
+                targets &= pins[square]
+            if en_passant is not None and pawn_attacks[square] >> en_passant & 1 and \
+                self._en_passant_legal(square, white, en_passant, king):
+                targets |= 1 << en_passant
+            if targets:
+                result.append((square, targets))
+        return result
+    def legal_moves(self, white: bool, en_passant: int | None, castling: list[bool]) -> list[int]:
+        """
+        Returns packed legal moves of the side to move (see Classes.Chess.Move, promotions listed once
+        for every piece), the same moves as legal_targets() without building (square, mask) pairs first.
+
+        Pawns that are not pinned are moved all at once: pushes and captures of every pawn are shifted masks
+        and the origin of a move is its target minus the shift, pinned pawns and en passant are handled one by one.
+
+        Arguments:
+        - white (bool): Whether white is to move.
+        - en_passant (int | None), castling (list[bool]): En passant square and castling availability (K, Q, k, q).
+        """
+        boards: list[int] = self.boards
+        color: int = 8 if white else 0
+        occupied: int = boards[0]
+        king, targets, allowed, pinned, pins = self._king_and_pins(white, castling)
+        moves: list[int] = []
+        append = moves.append
+        while targets:
+            low_bit: int = targets & -targets
+            targets ^= low_bit
+            new_field: int = low_bit.bit_length() - 1
+            if new_field - king in (2, -2):
+                append(king | (new_field << 6) | _CASTLING)
+            else:
+                append(king | (new_field << 6))
+        if not allowed:
+            return moves
+
+        # Knights (a pinned knight can not move)
+        knights: int = boards[3 | color] & ~pinned
+        while knights:
+            low_bit: int = knights & -knights
+            knights ^= low_bit
+            square: int = low_bit.bit_length() - 1
+            targets = KNIGHT_ATTACKS[square] & allowed
+            while targets:
+                low_bit = targets & -targets
+                targets ^= low_bit
+                append(square | ((low_bit.bit_length() - 1) << 6))
+        # Sliders
+        for pieces, lookups in ((boards[2 | color], (ROOK_LOOKUP,)), (boards[4 | color], (BISHOP_LOOKUP,)),
+                                (boards[5 | color], (ROOK_LOOKUP, BISHOP_LOOKUP))):
+            while pieces:
+                low_bit: int = pieces & -pieces
+                pieces ^= low_bit
+                square: int = low_bit.bit_length() - 1
+                targets = 0
+                for lookup in lookups:
+                    first_mask, first_attacks, second_mask, second_attacks = lookup[square]
+                    targets |= first_attacks[occupied & first_mask] | second_attacks[occupied & second_mask]
+                targets &= allowed
+                if low_bit & pinned:
+                    targets &= pins[square]
+                while targets:
+                    low_bit = targets & -targets
+                    targets ^= low_bit
+                    append(square | ((low_bit.bit_length() - 1) << 6))
+
+        # Pawns that are not pinned, as (targets, target - origin, code)
+        pawns: int = boards[1 | color]
+        free: int = pawns & ~pinned
+        empty: int = ~occupied & ALL_SQUARES
+        enemies: int = boards[(color ^ 8) | 7] & allowed
+        if white:
+            single: int = (free << 8) & empty
+            pawn_moves: tuple = ((single & allowed, 8, 0), ((single & RANK_3) << 8 & empty & allowed, 16, _DOUBLE_PUSH),
+                                 ((free & NOT_FILE_A) << 7 & enemies, 7, 0), ((free & NOT_FILE_H) << 9 & enemies, 9, 0))
+        else:
+            single: int = (free >> 8) & empty
+            pawn_moves: tuple = ((single & allowed, -8, 0), ((single & RANK_6) >> 8 & empty & allowed, -16, _DOUBLE_PUSH),
+                                 ((free & NOT_FILE_A) >> 9 & enemies, -9, 0), ((free & NOT_FILE_H) >> 7 & enemies, -7, 0))
+        for targets, shift, code in pawn_moves:
+            while targets:
+                low_bit: int = targets & -targets
+                targets ^= low_bit
+                new_field: int = low_bit.bit_length() - 1
+                move: int = (new_field - shift) | (new_field << 6)
+                if new_field > 55 or new_field < 8:
+                    for promotion in (7, 6, 5, 4): # queen, rook, bishop, knight
+                        append(move | (promotion << 12))
+                else:
+                    append(move | code)
+        # pinned pawns
+        pinned_pawns: int = pawns & pinned
+        while pinned_pawns:
+            low_bit: int = pinned_pawns & -pinned_pawns
+            pinned_pawns ^= low_bit
+            square: int = low_bit.bit_length() - 1
+            targets = self._pawn_targets(square, white, allowed) & pins[square]
+            while targets:
+                low_bit = targets & -targets
+                targets ^= low_bit
+                new_field: int = low_bit.bit_length() - 1
+                move: int = square | (new_field << 6)
+                if new_field > 55 or new_field < 8:
+                    for promotion in (7, 6, 5, 4):
+                        append(move | (promotion << 12))
+                elif new_field - square in (16, -16):
+                    append(move | _DOUBLE_PUSH)
+                else:
+                    append(move)
+        # en passant (pawns that attack the en passant square)
+        if en_passant is not None:
+            for square in squares_of(PAWN_ATTACKS[not white][en_passant] & pawns):
+                if self._en_passant_legal(square, white, en_passant, king):
+                    append(square | (en_passant << 6) | _EN_PASSANT)
+        return moves
+
+        # check mask: capture the checker or block a sliding one
+        if checkers:
+            checker: int = checkers.bit_length() - 1
+            allowed &= checkers | BETWEEN[king][checker]
+        # pins: own piece alone between the king and an enemy slider, it may move only along that line
+        pinned: int = 0
+        pins: dict[int, int] = {}
+        for slider in squares_of((ROOK_REACH[king] & enemy_rooks) | (BISHOP_REACH[king] & enemy_bishops)):
+            between: int = BETWEEN[king][slider]
+            blockers: int = between & occupied
+            if blockers & (blockers - 1) == 0 and blockers & boards[color | 7]:
+                pinned |= blockers
+                pins[blockers.bit_length() - 1] = between | (1 << slider)
+
+        # Knights (a pinned knight can not move)
+        for square in squares_of(boards[3 | color] & ~pinned):
+            targets = KNIGHT_ATTACKS[square] & allowed
+            if targets:
+                result.append((square, targets))
+        # Sliders
+        for pieces, lookups in ((boards[2 | color], (ROOK_LOOKUP,)), (boards[4 | color], (BISHOP_LOOKUP,)),
+                                (boards[5 | color], (ROOK_LOOKUP, BISHOP_LOOKUP))):
+            for square in squares_of(pieces):
+                targets = 0
+                for lookup in lookups:
+                    first_mask, first_attacks, second_mask, second_attacks = lookup[square]
+                    targets |= first_attacks[occupied & first_mask] | second_attacks[occupied & second_mask]
+                targets &= allowed
+                if pinned >> square & 1:
+                    targets &= pins[square]
+                if targets:
+                    result.append((square, targets))
+        # Pawns
+        push: int = 8 if white else -8
+        captures: int = boards[enemy | 7] & allowed
+        pawn_attacks: list[int] = PAWN_ATTACKS[white]
+        for square in squares_of(boards[1 | color]):
+            targets = 0
+            forward: int = square + push
+            if not occupied >> forward & 1:
+                targets = 1 << forward
+                # double push from the second (seventh) rank
+                if (square < 16 if white else square >= 48) and not occupied >> (forward + push) & 1:
+                    targets |= 1 << (forward + push)
+            targets = (targets & allowed) | (pawn_attacks[square] & captures)
+            if pinned >> square & 1:
+                targets &= pins[square]
+            if en_passant is not None and pawn_attacks[square] >> en_passant & 1:
+                # both pawns leave their squares, which can uncover a check along the rank (or a diagonal)
+                captured: int = en_passant - push
+                after: int = occupied ^ (1 << square) ^ (1 << captured) ^ (1 << en_passant)
+                if not (rook_attacks(king, after) & enemy_rooks or bishop_attacks(king, after) & enemy_bishops or
+                        KNIGHT_ATTACKS[king] & boards[3 | enemy] or 
+                        pawn_attacks[king] & boards[1 | enemy] & ~(1 << captured)):
+                    targets |= 1 << en_passant
+            if targets:
+                result.append((square, targets))
+        return result
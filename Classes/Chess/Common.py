@@ -2,6 +2,10 @@
 
 Authors: WK-K
 """
+# standard modules
+import random
+import struct
+
 # DICTIONARIES:
 piece_character2number = {'empty': 0,
                           'p': 1, 'r': 2,  'n': 3,  'b': 4,  'q': 5,  'k': 6,
@@ -57,6 +61,206 @@ dictionary assosiating file-rank string with place in array:
 """
 del all_possible_files, all_possible_ranks, temp_value
 
+# MATERIAL:
+piece_values: list[int] = [0, 100, 500, 320, 330, 900, 20000, 0]
+"""
+Value of a piece in centipawns indexed by piece type (piece & 7, colour bit removed):
+0 - empty, 1 - pawn, 2 - rook, 3 - knight, 4 - bishop, 5 - queen, 6 - king (more than all other pieces together)
+"""
+
+# EVALUATION TABLES:
+# material and piece-square values for the middlegame and the endgame (PeSTO tables),
+# piece-square tables are written from white's point of view with rank 8 in the first row
+_pst_mg: dict[int, list[int]] = {
+    1: [  0,   0,   0,   0,   0,   0,   0,   0,
+         98, 134,  61,  95,  68, 126,  34, -11,
+         -6,   7,  26,  31,  65,  56,  25, -20,
+        -14,  13,   6,  21,  23,  12,  17, -23,
+        -27,  -2,  -5,  12,  17,   6,  10, -25,
+        -26,  -4,  -4, -10,   3,   3,  33, -12,
+        -35,  -1, -20, -23, -15,  24,  38, -22,
+          0,   0,   0,   0,   0,   0,   0,   0],
+    2: [ 32,  42,  32,  51,  63,   9,  31,  43,
+         27,  32,  58,  62,  80,  67,  26,  44,
+         -5,  19,  26,  36,  17,  45,  61,  16,
+        -24, -11,   7,  26,  24,  35,  -8, -20,
+        -36, -26, -12,  -1,   9,  -7,   6, -23,
+        -45, -25, -16, -17,   3,   0,  -5, -33,
+        -44, -16, -20,  -9,  -1,  11,  -6, -71,
+        -19, -13,   1,  17,  16,   7, -37, -26],
+    3: [-167, -89, -34, -49,  61, -97, -15, -107,
+        -73, -41,  72,  36,  23,  62,   7, -17,
+        -47,  60,  37,  65,  84, 129,  73,  44,
+         -9,  17,  19,  53,  37,  69,  18,  22,
+        -13,   4,  16,  13,  28,  19,  21,  -8,
+        -23,  -9,  12,  10,  19,  17,  25, -16,
+        -29, -53, -12,  -3,  -1,  18, -14, -19,
+        -105, -21, -58, -33, -17, -28, -19, -23],
+    4: [-29,   4, -82, -37, -25, -42,   7,  -8,
+        -26,  16, -18, -13,  30,  59,  18, -47,
+        -16,  37,  43,  40,  35,  50,  37,  -2,
+         -4,   5,  19,  50,  37,  37,   7,  -2,
+         -6,  13,  13,  26,  34,  12,  10,   4,
+          0,  15,  15,  15,  14,  27,  18,  10,
+          4,  15,  16,   0,   7,  21,  33,   1,
+        -33,  -3, -14, -21, -13, -12, -39, -21],
+    5: [-28,   0,  29,  12,  59,  44,  43,  45,
+        -24, -39,  -5,   1, -16,  57,  28,  54,
+        -13, -17,   7,   8,  29,  56,  47,  57,
+        -27, -27, -16, -16,  -1,  17,  -2,   1,
+         -9, -26,  -9, -10,  -2,  -4,   3,  -3,
+        -14,   2, -11,  -2,  -5,   2,  14,   5,
+        -35,  -8,  11,   2,   8,  15,  -3,   1,
+         -1, -18,  -9,  10, -15, -25, -31, -50],
+    6: [-65,  23,  16, -15, -56, -34,   2,  13,
+         29,  -1, -20,  -7,  -8,  -4, -38, -29,
+         -9,  24,   2, -16, -20,   6,  22, -22,
+        -17, -20, -12, -27, -30, -25, -14, -36,
+        -49,  -1, -27, -39, -46, -44, -33, -51,
+        -14, -14, -22, -46, -44, -30, -15, -27,
+          1,   7,  -8, -64, -43, -16,   9,   8,
+        -15,  36,  12, -54,   8, -28,  24,  14],
+}
+_pst_eg: dict[int, list[int]] = {
+    1: [  0,   0,   0,   0,   0,   0,   0,   0,
+        178, 173, 158, 134, 147, 132, 165, 187,
+         94, 100,  85,  67,  56,  53,  82,  84,
+         32,  24,  13,   5,  -2,   4,  17,  17,
+         13,   9,  -3,  -7,  -7,  -8,   3,  -1,
+          4,   7,  -6,   1,   0,  -5,  -1,  -8,
+         13,   8,   8,  10,  13,   0,   2,  -7,
+          0,   0,   0,   0,   0,   0,   0,   0],
+    2: [ 13,  10,  18,  15,  12,  12,   8,   5,
+         11,  13,  13,  11,  -3,   3,   8,   3,
+          7,   7,   7,   5,   4,  -3,  -5,  -3,
+          4,   3,  13,   1,   2,   1,  -1,   2,
+          3,   5,   8,   4,  -5,  -6,  -8, -11,
+         -4,   0,  -5,  -1,  -7, -12,  -8, -16,
+         -6,  -6,   0,   2,  -9,  -9, -11,  -3,
+         -9,   2,   3,  -1,  -5, -13,   4, -20],
+    3: [-58, -38, -13, -28, -31, -27, -63, -99,
+        -25,  -8, -25,  -2,  -9, -25, -24, -52,
+        -24, -20,  10,   9,  -1,  -9, -19, -41,
+        -17,   3,  22,  22,  22,  11,   8, -18,
+        -18,  -6,  16,  25,  16,  17,   4, -18,
+        -23,  -3,  -1,  15,  10,  -3, -20, -22,
+        -42, -20, -10,  -5,  -2, -20, -23, -44,
+        -29, -51, -23, -15, -22, -18, -50, -64],
+    4: [-14, -21, -11,  -8,  -7,  -9, -17, -24,
+         -8,  -4,   7, -12,  -3, -13,  -4, -14,
+          2,  -8,   0,  -1,  -2,   6,   0,   4,
+         -3,   9,  12,   9,  14,  10,   3,   2,
+         -6,   3,  13,  19,   7,  10,  -3,  -9,
+        -12,  -3,   8,  10,  13,   3,  -7, -15,
+        -14, -18,  -7,  -1,   4,  -9, -15, -27,
+        -23,  -9, -23,  -5,  -9, -16,  -5, -17],
+    5: [ -9,  22,  22,  27,  27,  19,  10,  20,
+        -17,  20,  32,  41,  58,  25,  30,   0,
+        -20,   6,   9,  49,  47,  35,  19,   9,
+          3,  22,  24,  45,  57,  40,  57,  36,
+        -18,  28,  19,  47,  31,  34,  39,  23,
+        -16, -27,  15,   6,   9,  17,  10,   5,
+        -22, -23, -30, -16, -16, -23, -36, -32,
+        -33, -28, -22, -43,  -5, -32, -20, -41],
+    6: [-74, -35, -18, -18, -11,  15,   4, -17,
+        -12,  17,  14,  17,  17,  38,  23,  11,
+         10,  17,  23,  15,  20,  45,  44,  13,
+         -8,  22,  24,  27,  26,  33,  26,   3,
+        -18,  -4,  21,  24,  27,  23,   9, -11,
+        -19,  -3,  11,  21,  23,  16,   7,  -9,
+        -27, -11,   4,  13,  14,   4,  -5, -17,
+        -53, -34, -21, -11, -28, -14, -24, -43],
+}
+_material_mg: list[int] = [0, 82, 477, 337, 365, 1025, 0]
+_material_eg: list[int] = [0, 94, 512, 281, 297, 936, 0]
+
+def _evaluation_table(pst: dict[int, list[int]], material: list[int]) -> list[list[int]]:
+    """
+    Returns [piece][square] table of material + piece-square value, positive for white and negative for black pieces.
+    White square a1 (index 0) is the first element of the last row of `pst`, black pieces use the mirrored square.
+    """
+    table: list[list[int]] = [[0] * 64 for _ in range(15)]
+    for piece_type, values in pst.items():
+        for index in range(64):
+            table[piece_type | 8][index] = material[piece_type] + values[index ^ 56]
+            table[piece_type][index] = -(material[piece_type] + values[index])
+    return table
+
+eval_mg: list[list[int]] = _evaluation_table(_pst_mg, _material_mg)
+"""Middlegame value of a piece (as in fields array) on a square, positive for white, negative for black."""
+eval_eg: list[list[int]] = _evaluation_table(_pst_eg, _material_eg)
+"""Endgame value of a piece (as in fields array) on a square, positive for white, negative for black."""
+phase_weights: list[int] = [0, 0, 2, 1, 1, 4, 0, 0]
+"""Game phase weight of a piece type (piece & 7), the starting position has MAX_PHASE."""
+MAX_PHASE: int = 24
+del _pst_mg, _pst_eg, _material_mg, _material_eg
+
+# ZOBRIST KEYS:
+# generator is seeded with a constant, so keys (and position hashes) are the same in every process and run
+zobrist_random = random.Random(0x5A5A5A5A)
+zobrist_pieces: list[list[int]] = [[zobrist_random.getrandbits(64) for _ in range(64)] for _ in range(15)]
+"""
+64-bit random keys indexed by [piece][square] (piece numbers as in fields array, empty and 7, 8 are unused).
+"""
+zobrist_black_to_move: int = zobrist_random.getrandbits(64)
+"""64-bit random key xored into the hash when black is to move."""
+zobrist_castling: list[int] = [zobrist_random.getrandbits(64) for _ in range(4)]
+"""64-bit random keys of castling availability (K, Q, k, q)."""
+zobrist_en_passant: list[int] = [zobrist_random.getrandbits(64) for _ in range(8)]
+"""64-bit random keys of en passant square, indexed by its file (0 = a, ..., 7 = h)."""
+del zobrist_random
+
+# MOVE TABLES:
+# built once at import, for every square (0 = a1, ..., 63 = h8) of the fields array
+def _square_after_offset(index: int, row_offset: int, col_offset: int) -> int | None:
+    """Returns index of the square at (row, column) offset from a given one or None if it is off the board."""
+    row, col = divmod(index, 8)
+    row, col = row + row_offset, col + col_offset
+    return row * 8 + col if 0 <= row < 8 and 0 <= col < 8 else None
+
+def _ray(index: int, direction: tuple[int, int]) -> tuple[int, ...]:
+    """Returns squares from a given one (excluded) to the edge of the board in a direction, nearest first."""
+    ray: list[int] = []
+    temp_index: int | None = _square_after_offset(index, *direction)
+    while temp_index is not None:
+        ray.append(temp_index)
+        temp_index = _square_after_offset(temp_index, *direction)
+    return tuple(ray)
+
+ROOK_DIRECTIONS: list[tuple[int, int]] = [(1, 0), (-1, 0), (0, 1), (0, -1)]
+BISHOP_DIRECTIONS: list[tuple[int, int]] = [(1, 1), (-1, -1), (1, -1), (-1, 1)]
+KNIGHT_OFFSETS: list[tuple[int, int]] = [(-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1)]
+
+direction_rays: list[dict[tuple[int, int], tuple[int, ...]]] = \
+    [{direction: _ray(index, direction) for direction in ROOK_DIRECTIONS + BISHOP_DIRECTIONS} for index in range(64)]
+"""Rays (squares nearest first) indexed by [square][(row_offset, col_offset)] for all 8 directions."""
+rook_rays: list[tuple[tuple[int, ...], ...]] = \
+    [tuple(ray for ray in (_ray(index, d) for d in ROOK_DIRECTIONS) if ray) for index in range(64)]
+"""Non-empty orthogonal rays of every square (squares nearest first)."""
+bishop_rays: list[tuple[tuple[int, ...], ...]] = \
+    [tuple(ray for ray in (_ray(index, d) for d in BISHOP_DIRECTIONS) if ray) for index in range(64)]
+"""Non-empty diagonal rays of every square (squares nearest first)."""
+queen_rays: list[tuple[tuple[int, ...], ...]] = [rook_rays[index] + bishop_rays[index] for index in range(64)]
+"""Non-empty rays in all 8 directions of every square."""
+knight_targets: list[tuple[int, ...]] = \
+    [tuple(t for t in (_square_after_offset(index, *o) for o in KNIGHT_OFFSETS) if t is not None) for index in range(64)]
+"""Squares a knight can jump to from every square."""
+king_targets: list[tuple[int, ...]] = \
+    [tuple(t for t in (_square_after_offset(index, *o) for o in ROOK_DIRECTIONS + BISHOP_DIRECTIONS) if t is not None)
+     for index in range(64)]
+"""Squares a king can step to from every square (castling excluded)."""
+pawn_captures: list[list[tuple[int, ...]]] = \
+    [[tuple(t for t in (_square_after_offset(index, row_offset, -1), _square_after_offset(index, row_offset, 1))
+            if t is not None) for index in range(64)] for row_offset in (-1, 1)]
+"""
+Squares a pawn attacks diagonally, indexed by [colour][square] (colour: 0 - black, 1 - white).
+Because of symmetry pawns of a colour attacking a square stand on `pawn_captures[other colour][square]`.
+"""
+offset_targets: list[dict[tuple[int, int], int]] = \
+    [{o: t for o in KNIGHT_OFFSETS + ROOK_DIRECTIONS + BISHOP_DIRECTIONS 
+      if (t := _square_after_offset(index, *o)) is not None} for index in range(64)]
+"""Square at a given knight or king (row_offset, col_offset) from every square, indexed by [square][offset]."""
+
 # FUNCTIONS:
 # -- FEN --
 def fen2piece_count(fen: str) -> int:
@@ -88,12 +292,104 @@ def fen2array_of_fields(fen: str) -> list[int]:
     return arr
 
 def fen2castling_arr(fen: str) -> list[bool]:
-    """Returns boolian array size 4 with castling abilities based on FEN string, that is: K, Q, k, q."""
+    """
+    Returns boolian array size 4 with castling abilities based on FEN string, that is: K, Q, k, q.
+    Accepts both standard FEN (e.g. `Kq`, `-`) and the padded form written by Layout (e.g. `K--q`).
+    """
     fen: str = fen.split(' ')[2] # Extracting castling abilities part of fen
-    arr: list = [True]*4
-    for index, char in enumerate(fen):
-        if char == '-': arr[index] = False
-    return arr
+    return [char in fen for char in 'KQkq']
+
+_fen_squares: dict[str, int] = {str(digit): -digit for digit in range(1, 9)}
+_fen_squares.update({char: number for char, number in piece_character2number.items() if char != 'empty'})
+"""Character of a FEN piece placement to a piece number, digits (runs of empty squares) are negative."""
+
+def fen2position(fen: str) -> tuple[list[int], bool, list[bool], int | None, int, int]:
+    """
+    Parses FEN (or EPD) in a single pass, splitting the string once, and returns
+    fields, white moves, castling, en passant, clock and moves made.
+    EPD lines have only the first four fields (operations after them are ignored), clock is then 0 and moves made 1.
+
+    Raises:
+    - ValueError: When the string is not a valid FEN / EPD.
+    """
+    parts: list[str] = fen.split()
+    if len(parts) < 4:
+        raise ValueError(f"FEN has {len(parts)} of at least 4 fields: {fen!r}")
+    placement, colour, castling_part, en_passant_part = parts[0], parts[1], parts[2], parts[3]
+
+    fields: list[int] = [0] * 64
+    index: int = 56 # a8, ranks are written from the 8th one
+    rank_end: int = 64
+    for char in placement:
+        piece: int | None = _fen_squares.get(char)
+        if piece is None:
+            if char != '/' or index != rank_end or index == 8:
+                raise ValueError(f"Wrong piece placement in FEN: {fen!r}")
+            index -= 16
+            rank_end -= 8
+        elif piece < 0:
+            index -= piece
+        elif index < rank_end:
+            fields[index] = piece
+            index += 1
+        else:
+            raise ValueError(f"Wrong piece placement in FEN: {fen!r}")
+    if index != 8 or rank_end != 8:
+        raise ValueError(f"Wrong piece placement in FEN: {fen!r}")
+    if fields.count(6) != 1 or fields.count(14) != 1:
+        raise ValueError(f"FEN has to have exactly one king of each colour: {fen!r}")
+
+    if colour != 'w' and colour != 'b':
+        raise ValueError(f"Wrong side to move in FEN: {fen!r}")
+    if castling_part.strip('KQkq-'):
+        raise ValueError(f"Wrong castling rights in FEN: {fen!r}")
+    castling: list[bool] = ['K' in castling_part, 'Q' in castling_part, 'k' in castling_part, 'q' in castling_part]
+    if en_passant_part == '-':
+        en_passant: int | None = None
+    else:
+        en_passant: int | None = file_rank_string2board_index.get(en_passant_part)
+        if en_passant is None:
+            raise ValueError(f"Wrong en passant square in FEN: {fen!r}")
+    # clock and move number are optional (EPD)
+    if len(parts) >= 6 and parts[4].isdigit() and parts[5].isdigit():
+        clock, moves_made = int(parts[4]), int(parts[5])
+    else:
+        clock, moves_made = 0, 1
+    return fields, colour == 'w', castling, en_passant, clock, moves_made
+
+# -- ZOBRIST --
+def en_passant_capturable(fields: list[int], white_moves: bool, en_passant: int | None) -> bool:
+    """
+    Whether a pawn of the side to move stands next to the pawn that just moved two squares,
+    so the en passant square can actually be used. Only then the en passant file is part
+    of the Zobrist key, otherwise positions after a double push could never repeat
+    the same position reached without it.
+    """
+    if en_passant is None:
+        return False
+    pawn: int = 9 if white_moves else 1
+    behind: int = en_passant - 8 if white_moves else en_passant + 8 # square of the pushed pawn
+    file: int = en_passant % 8
+    return (file > 0 and fields[behind - 1] == pawn) or (file < 7 and fields[behind + 1] == pawn)
+
+def zobrist_key(fields: list[int], white_moves: bool, castling: list[bool], en_passant: int | None) -> int:
+    """
+    Returns 64-bit Zobrist hash of a position computed from scratch 
+    (Layout keeps it updated incrementally after that).
+    En passant file is hashed only when the capture is possible (see en_passant_capturable()).
+    """
+    key: int = 0
+    for index, piece in enumerate(fields):
+        if piece:
+            key ^= zobrist_pieces[piece][index]
+    if not white_moves:
+        key ^= zobrist_black_to_move
+    for index in range(4):
+        if castling[index]:
+            key ^= zobrist_castling[index]
+    if en_passant_capturable(fields, white_moves, en_passant):
+        key ^= zobrist_en_passant[en_passant % 8]
+    return key
 
 def array_of_fields2fen(arr: list[int]) -> str:
     """
@@ -135,6 +431,59 @@ def array_of_fields2fen(arr: list[int]) -> str:
 
     return fen
 
+# -- BINARY --
+# fixed-width record of a position (little-endian, PACKED_SIZE bytes):
+#   - occupancy (8 bytes): bit i set if square i (0 = a1, ..., 63 = h8) is occupied,
+#   - pieces (16 bytes): numbers of pieces (as in fields) on occupied squares in ascending square order,
+#     two per byte (lower nibble first), unused nibbles are 0,
+#   - flags (1 byte): bit 0 - white moves, bits 1-4 - castling (K, Q, k, q),
+#   - en passant (1 byte): square index or 255 if there is none,
+#   - clock (2 bytes), moves made (2 bytes).
+_packed_struct: struct.Struct = struct.Struct("<Q16sBBHH")
+PACKED_SIZE: int = _packed_struct.size
+"""Size in bytes of a packed position record (30)."""
+_byte2nibbles: list[tuple[int, int]] = [(byte & 15, byte >> 4) for byte in range(256)]
+
+def position2bytes(fields: list[int], white_moves: bool, castling: list[bool], 
+                   en_passant: int | None, clock: int, moves_made: int) -> bytes:
+    """
+    Returns a position packed into a fixed-width record of PACKED_SIZE bytes (see the record layout above).
+
+    Raises:
+    - ValueError: When there are more than 32 pieces on the board.
+    - struct.error: When clock or moves made do not fit in 16 bits.
+    """
+    occupancy: int = 0
+    pieces: list[int] = []
+    for index, piece in enumerate(fields):
+        if piece:
+            occupancy |= 1 << index
+            pieces.append(piece)
+    if len(pieces) > 32:
+        raise ValueError(f"Position with more than 32 pieces can not be packed: {len(pieces)}")
+    pieces += [0] * (32 - len(pieces))
+    flags: int = white_moves | castling[0] << 1 | castling[1] << 2 | castling[2] << 3 | castling[3] << 4
+    return _packed_struct.pack(occupancy, bytes([pieces[i] | pieces[i + 1] << 4 for i in range(0, 32, 2)]), flags,
+                               255 if en_passant is None else en_passant, clock, moves_made)
+
+def bytes2position(data: bytes) -> tuple[list[int], bool, list[bool], int | None, int, int]:
+    """
+    Returns position unpacked from a record written by position2bytes() 
+    (bytes, bytearray or memoryview of exactly PACKED_SIZE bytes):
+    fields, white moves, castling, en passant, clock and moves made.
+    """
+    occupancy, packed_pieces, flags, en_passant, clock, moves_made = _packed_struct.unpack(data)
+    pieces: list[int] = [nibble for byte in packed_pieces for nibble in _byte2nibbles[byte]]
+    fields: list[int] = [0] * 64
+    count: int = 0
+    while occupancy:
+        lowest: int = occupancy & -occupancy
+        fields[lowest.bit_length() - 1] = pieces[count]
+        count += 1
+        occupancy ^= lowest
+    castling: list[bool] = [bool(flags & 2), bool(flags & 4), bool(flags & 8), bool(flags & 16)]
+    return fields, bool(flags & 1), castling, None if en_passant == 255 else en_passant, clock, moves_made
+
 
 
 
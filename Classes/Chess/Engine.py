@@ -0,0 +1,441 @@
+"""
+This module defines the `Engine` class, a procedural opponent that searches `Layout` positions for the best move.
+
+Search is a negamax alpha-beta with iterative deepening and quiescence search (captures and check evasions).
+Moves are ordered by MVV-LVA for captures (most valuable victim, least valuable attacker),
+then by killer moves (quiet moves that caused a cutoff at the same ply) and by the history table.
+Positions repeated in the search path (or in the game before it) and the 50-move rule are scored as draws.
+Search stops at a depth, node or time budget, whichever comes first, and the best move of the deepest
+finished iteration is returned together with score, reached depth, visited nodes and nodes per second.
+
+The search can run either:
+    - blocking: `Engine.search(layout)`,
+    - spread across frames of the UI loop: `Engine.start(layout)` once and then `Engine.step(budget_s)` every frame,
+      which lets the search run for at most `budget_s` seconds and returns a SearchResult when it is finished.
+
+Usage (from the root catalogue of the repository):
+    python -m Classes.Chess.Engine --depth 5
+    python -m Classes.Chess.Engine --fen "<FEN>" --time 2
+
+Classes:
+    - SearchResult: Best move found by the search with statistics (depth, nodes, time, nodes per second).
+    - Engine: Alpha-beta search with depth, node and time budget.
+
+Functions:
+    - evaluate(layout: Layout) -> int: Static evaluation in centipawns from the side to move's point of view.
+    - main(argv: list[str] | None=None) -> int: Command line entry point.
+
+Author: WK-K
+"""
+
+# standard modules
+import argparse
+import sys
+import threading
+import time
+# project modules
+from Classes.Chess.Common import piece_values
+from Classes.Chess.Layout import Layout
+from Classes.Chess.Move import MoveList, EN_PASSANT, code2promotion_piece, move2uci
+
+# CONSTANTS:
+ATTACKER_RANKS: list[int] = [0, 1, 4, 2, 3, 5, 6, 0]
+"""Order of attacking piece types for MVV-LVA (least valuable attacker first)."""
+MATE_SCORE: int = 100000
+"""Score of a checkmate at the root, a mate in `ply` plies is scored MATE_SCORE - ply."""
+INFINITY: int = MATE_SCORE + 1
+MAX_DEPTH: int = 64
+MAX_PLY: int = 128
+"""Maximal distance from the root (including quiescence search)."""
+CHECK_INTERVAL: int = 255
+"""Budgets are checked every CHECK_INTERVAL + 1 nodes (a power of two minus one, used as a mask)."""
+# move ordering scores
+CAPTURE_ORDER: int = 1 << 20
+PROMOTION_ORDER: int = 1 << 19
+KILLER_ORDER: int = 1 << 18
+
+# FUNCTIONS:
+def evaluate(layout: Layout) -> int:
+    """
+    Returns static evaluation in centipawns from the point of view of the side to move
+    (tapered material + piece-square score kept incrementally by Layout, see Layout.evaluation()).
+    """
+    return layout.evaluation()
+
+# CLASSES:
+class _SearchAborted(Exception):
+    """Raised inside the search tree when the node or time budget is spent or the search is stopped."""
+
+class SearchResult:
+    """
+    Result of a search.
+
+    ATTRIBUTES:
+        - move (int | None): Best move (packed, see Classes.Chess.Move) or None when there are no legal moves.
+        - score (int): Score of the move in centipawns from the side to move's point of view
+            (mate in n plies is MATE_SCORE - n).
+        - depth (int): Depth of the deepest finished iteration.
+        - nodes (int): Number of visited nodes (including quiescence search).
+        - time (float): Time spent searching in seconds (time between frames is not counted).
+        - nps (float): Nodes per second.
+    """
+    __slots__ = ("move", "score", "depth", "nodes", "time")
+    def __init__(self, move: int | None, score: int, depth: int, nodes: int, time: float) -> None:
+        """Initializes the result."""
+        self.move: int | None = move
+        self.score: int = score
+        self.depth: int = depth
+        self.nodes: int = nodes
+        self.time: float = time
+    @property
+    def nps(self) -> float:
+        """Nodes per second."""
+        return self.nodes / max(self.time, 1e-9)
+    def __repr__(self) -> str:
+        """Returns one line summary of the search (in a style of UCI info line)."""
+        move: str = move2uci(self.move) if self.move is not None else "(none)"
+        return f"depth {self.depth} score {self.score} nodes {self.nodes} nps {self.nps:.0f} " + \
+            f"time {self.time:.2f} s bestmove {move}"
+
+class Engine:
+    """
+    Procedural opponent: alpha-beta search over `Layout` positions.
+
+    Searched layout is always a copy, so the game layout can be drawn (and read) while the search runs.
+
+    ATTRIBUTES:
+        - max_depth (int), max_nodes (int | None), time_limit (float | None): Default search budget.
+        - evaluate (Callable[[Layout], int]): Static evaluation used at the leaves (side to move's point of view).
+        - result (SearchResult | None): Result of the last (or current, after every finished iteration) search.
+        - nodes (int): Nodes visited by the current search.
+
+    METHODS:
+        - search(layout: Layout, ...) -> SearchResult: Searches a position and returns the best move (blocking).
+        - start(layout: Layout, ...) -> None: Prepares a search that is run in slices by step().
+        - step(budget_s: float) -> SearchResult | None: Runs started search for at most `budget_s` seconds,
+            returns the result when the search is finished.
+        - stop() -> SearchResult | None: Stops started search and returns the best move found so far.
+        - is_searching (bool): Whether a search is started and not finished.
+    """
+    def __init__(self, max_depth: int=MAX_DEPTH, max_nodes: int | None=None, time_limit: float | None=1.0,
+                 evaluate=evaluate) -> None:
+        """
+        Initializes the engine with its default budget.
+
+        Arguments:
+        - max_depth (int): Maximal depth of iterative deepening (in plies, 0 for quiescence search only).
+        - max_nodes (int | None): Maximal number of visited nodes (None for no limit).
+        - time_limit (float | None): Maximal search time in seconds (None for no limit).
+        - evaluate (Callable[[Layout], int]): Static evaluation function.
+        """
+        self.max_depth: int = max_depth
+        self.max_nodes: int | None = max_nodes
+        self.time_limit: float | None = time_limit
+        self.evaluate = evaluate
+        self.result: SearchResult | None = None
+        self.nodes: int = 0
+        # move ordering
+        self._killers: list[list[int]] = [[0, 0] for _ in range(MAX_PLY + 1)]
+        self._history: list[int] = [0] * 4096 # indexed by old_field | new_field << 6 (lower 12 bits of a move)
+        self._move_lists: list[MoveList] = [MoveList() for _ in range(MAX_PLY + 1)]
+        # current search
+        self._layout: Layout | None = None
+        self._depth_limit: int = max_depth
+        self._node_limit: int | None = max_nodes
+        self._time_limit: float | None = time_limit
+        self._active_time: float = 0.0
+        self._resumed_at: float = 0.0
+        self._stop: bool = False
+        self._root_best: int | None = None
+        self._root_score: int = -INFINITY
+        # searching in slices (a worker thread that runs only while step() waits for it)
+        self._thread: threading.Thread | None = None
+        self._resume: threading.Event = threading.Event()
+        self._paused: threading.Event = threading.Event()
+        self._slice_end: float = float("inf")
+        self._finished: bool = False
+
+    # Public interface
+    def search(self, layout: Layout, max_depth: int | None=None, max_nodes: int | None=None,
+               time_limit: float | None=None) -> SearchResult:
+        """
+        Searches a position and returns the best move (blocks until the budget is spent).
+
+        Arguments:
+        - layout (Layout): Position to search (it is not changed).
+        - max_depth, max_nodes, time_limit: Budget of this search (defaults of the engine are used if None).
+        """
+        self.stop()
+        self._prepare(layout, max_depth, max_nodes, time_limit)
+        self._slice_end = float("inf")
+        self._resumed_at = time.perf_counter()
+        self._run()
+        return self.result
+    def start(self, layout: Layout, max_depth: int | None=None, max_nodes: int | None=None,
+              time_limit: float | None=None) -> None:
+        """
+        Prepares a search of a position that is run in slices by step() (e.g. one slice per UI frame).
+        Time limit counts only time spent searching.
+
+        Arguments are the same as in search().
+        """
+        self.stop()
+        self._prepare(layout, max_depth, max_nodes, time_limit)
+        self._resume.clear()
+        self._thread = threading.Thread(target=self._run_in_slices, daemon=True)
+        self._thread.start()
+    def step(self, budget_s: float) -> SearchResult | None:
+        """
+        Runs started search for at most `budget_s` seconds (plus time of at most CHECK_INTERVAL nodes).
+
+        Returns:
+        - SearchResult | None: Result when the search is finished, None when it needs more steps.
+        """
+        if self._thread is None:
+            return self.result
+        self._slice_end = time.perf_counter() + budget_s
+        self._paused.clear()
+        self._resume.set()
+        self._paused.wait()
+        if self._finished:
+            self._thread.join()
+            self._thread = None
+            return self.result
+        return None
+    def stop(self) -> SearchResult | None:
+        """Stops started search and returns the best move found so far (None if nothing was searched)."""
+        if self._thread is not None:
+            self._stop = True
+            self._resume.set()
+            self._thread.join()
+            self._thread = None
+        return self.result
+    @property
+    def is_searching(self) -> bool:
+        """Whether a search is started with start() and not finished."""
+        return self._thread is not None
+
+    # Search control
+    def _prepare(self, layout: Layout, max_depth: int | None, max_nodes: int | None,
+                 time_limit: float | None) -> None:
+        """Sets up the budget and state of a new search."""
+        self._layout = layout.copy()
+        self._depth_limit = self.max_depth if max_depth is None else max_depth
+        self._node_limit = self.max_nodes if max_nodes is None else max_nodes
+        self._time_limit = self.time_limit if time_limit is None else time_limit
+        self._active_time = 0.0
+        self._stop = False
+        self._finished = False
+        self.nodes = 0
+        self.result = None
+        for killers in self._killers:
+            killers[0] = killers[1] = 0
+        # history is aged rather than cleared, so it still helps the next search
+        history: list[int] = self._history
+        for index in range(4096):
+            history[index] >>= 3
+    def _run_in_slices(self) -> None:
+        """Target of the worker thread: waits for the first step() and runs the search."""
+        self._resume.wait()
+        self._resumed_at = time.perf_counter()
+        self._run()
+    def _run(self) -> None:
+        """Runs iterative deepening and marks the search as finished."""
+        try:
+            self._iterative_deepening()
+        finally:
+            self._active_time += time.perf_counter() - self._resumed_at
+            if self.result is not None:
+                self.result.time = self._active_time
+            self._layout = None
+            self._finished = True
+            self._paused.set()
+    def _checkpoint(self) -> None:
+        """
+        Called every CHECK_INTERVAL + 1 nodes, aborts the search when the budget is spent
+        and pauses it when the current slice (step()) is over.
+        """
+        now: float = time.perf_counter()
+        if self._stop or \
+            (self._node_limit is not None and self.nodes >= self._node_limit) or \
+            (self._time_limit is not None and self._active_time + now - self._resumed_at >= self._time_limit):
+            raise _SearchAborted()
+        if now >= self._slice_end:
+            self._active_time += now - self._resumed_at
+            self._resume.clear()
+            self._paused.set()
+            self._resume.wait()
+            self._resumed_at = time.perf_counter()
+            if self._stop:
+                raise _SearchAborted()
+    def _iterative_deepening(self) -> None:
+        """Searches with growing depth, keeping the result of the deepest finished (or useful partial) iteration."""
+        layout: Layout = self._layout
+        root_moves: list[int] = list(layout.generate_moves(self._move_lists[0]))
+        if not root_moves:
+            score: int = -MATE_SCORE if layout.is_king_in_check(layout.white_moves) else 0
+            self.result = SearchResult(None, score, 0, 0, 0.0)
+            return
+        self.result = SearchResult(root_moves[0], 0, 0, 0, 0.0)
+        if self._depth_limit < 1:
+            # depth 0: score of the position after quiescence search only (move is not searched)
+            try:
+                self.result.score = self._quiescence(layout, -INFINITY, INFINITY, 0)
+            except _SearchAborted:
+                pass
+        for depth in range(1, self._depth_limit + 1):
+            try:
+                move, score = self._search_root(layout, depth, root_moves)
+            except _SearchAborted:
+                # root moves are searched best first, so a move that beat the previous best
+                # within the unfinished iteration is better than it
+                if self._root_best is not None:
+                    self.result = SearchResult(self._root_best, self._root_score, depth - 1, self.nodes, 0.0)
+                break
+            self.result = SearchResult(move, score, depth, self.nodes, 0.0)
+            # best move is searched first in the next iteration
+            root_moves.remove(move)
+            root_moves.insert(0, move)
+            if abs(score) >= MATE_SCORE - MAX_PLY:
+                break # forced mate found
+        self.result.nodes = self.nodes
+
+    # Search
+    def _search_root(self, layout: Layout, depth: int, root_moves: list[int]) -> tuple[int, int]:
+        """Returns best root move and its score at a given depth."""
+        self._root_best = None
+        self._root_score = -INFINITY
+        alpha: int = -INFINITY
+        for move in root_moves:
+            undo = layout.make_move(move & 63, (move >> 6) & 63, code2promotion_piece[move >> 12])
+            score: int = -self._negamax(layout, depth - 1, -INFINITY, -alpha, 1)
+            layout.unmake_move(undo)
+            if score > alpha:
+                alpha = score
+                self._root_best, self._root_score = move, score
+        return self._root_best, self._root_score
+    def _negamax(self, layout: Layout, depth: int, alpha: int, beta: int, ply: int) -> int:
+        """Returns score of the position (side to move's point of view) with fail-soft alpha-beta."""
+        self.nodes += 1
+        if not self.nodes & CHECK_INTERVAL:
+            self._checkpoint()
+        # a position seen before (in the search path or in the game) is scored as a draw,
+        # a repetition needs at least 4 plies without a capture or a pawn move
+        if layout.clock >= 4 and layout.repetitions():
+            return 0
+        if depth <= 0 or ply >= MAX_PLY:
+            return self._quiescence(layout, alpha, beta, ply)
+
+        moves: MoveList = layout.generate_moves(self._move_lists[ply])
+        if not moves.count:
+            return -MATE_SCORE + ply if layout.is_king_in_check(layout.white_moves) else 0
+        if layout.clock >= 100:
+            return 0 # 50-move rule (checkmate delivered on the 100th half-move still counts, see above)
+
+        fields: list[int] = layout.fields
+        killers: list[int] = self._killers[ply]
+        best: int = -INFINITY
+        for move in self._ordered(fields, moves, killers):
+            undo = layout.make_move(move & 63, (move >> 6) & 63, code2promotion_piece[move >> 12])
+            score: int = -self._negamax(layout, depth - 1, -beta, -alpha, ply + 1)
+            layout.unmake_move(undo)
+            if score > best:
+                best = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        # quiet move that caused a cutoff becomes a killer and gains history
+                        if not fields[(move >> 6) & 63] and move >> 12 != EN_PASSANT and move >> 12 < 4:
+                            if killers[0] != move:
+                                killers[1] = killers[0]
+                                killers[0] = move
+                            self._history[move & 4095] += depth * depth
+                        break
+        return best
+    def _quiescence(self, layout: Layout, alpha: int, beta: int, ply: int) -> int:
+        """
+        Searches only captures and promotions until the position is quiet (stand pat on static evaluation),
+        captures losing material by static exchange evaluation are skipped.
+        In check there is no stand pat and all evasions are searched, so mates at the horizon are seen.
+        """
+        self.nodes += 1
+        if not self.nodes & CHECK_INTERVAL:
+            self._checkpoint()
+        in_check: bool = layout.is_king_in_check(layout.white_moves)
+        if in_check:
+            best: int = -INFINITY
+        else:
+            best: int = self.evaluate(layout)
+            if best >= beta or ply >= MAX_PLY:
+                return best
+            if best > alpha:
+                alpha = best
+
+        moves: MoveList = layout.generate_moves(self._move_lists[ply])
+        if not moves.count:
+            return -MATE_SCORE + ply if in_check else 0
+        if ply >= MAX_PLY:
+            return self.evaluate(layout)
+
+        fields: list[int] = layout.fields
+        for move in self._ordered(fields, moves, None):
+            if not in_check and not fields[(move >> 6) & 63] and move >> 12 != EN_PASSANT and move >> 12 < 4:
+                break # captures and promotions are ordered first
+            if not in_check and layout.see(move) < 0:
+                continue # losing capture (static exchange evaluation)
+            undo = layout.make_move(move & 63, (move >> 6) & 63, code2promotion_piece[move >> 12])
+            score: int = -self._quiescence(layout, -beta, -alpha, ply + 1)
+            layout.unmake_move(undo)
+            if score > best:
+                best = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+        return best
+    def _ordered(self, fields: list[int], moves: MoveList, killers: list[int] | None) -> list[int]:
+        """
+        Returns moves ordered for the search:
+        captures by MVV-LVA, promotions, killer moves and quiet moves by history score.
+        """
+        history: list[int] = self._history
+        first_killer, second_killer = killers if killers is not None else (0, 0)
+        scored: list[tuple[int, int]] = []
+        for move in moves:
+            code: int = move >> 12
+            victim: int = fields[(move >> 6) & 63]
+            if victim or code == EN_PASSANT:
+                score: int = CAPTURE_ORDER + (piece_values[victim & 7] if victim else 100) * 8 - \
+                    ATTACKER_RANKS[fields[move & 63] & 7]
+                if code >= 4:
+                    score += code
+            elif code >= 4:
+                score: int = PROMOTION_ORDER + code
+            elif move == first_killer:
+                score: int = KILLER_ORDER + 1
+            elif move == second_killer:
+                score: int = KILLER_ORDER
+            else:
+                score: int = history[move & 4095]
+            scored.append((score, move))
+        scored.sort(reverse=True)
+        return [move for _, move in scored]
+
+def main(argv: list[str] | None=None) -> int:
+    """Command line entry point: searches a position and prints the result."""
+    parser = argparse.ArgumentParser(prog="python -m Classes.Chess.Engine",
+                                     description="Search a position with the alpha-beta engine.")
+    parser.add_argument("--fen", default=None, help="position to search (defaults to the start position)")
+    parser.add_argument("--depth", type=int, default=MAX_DEPTH, help="maximal depth in plies")
+    parser.add_argument("--nodes", type=int, default=None, help="maximal number of nodes")
+    parser.add_argument("--time", type=float, default=None, help="maximal time in seconds")
+    args = parser.parse_args(argv)
+
+    # without any limit search runs for 1 s
+    time_limit: float | None = args.time if args.time is not None or args.depth != MAX_DEPTH or args.nodes else 1.0
+    engine = Engine(args.depth, args.nodes, time_limit)
+    print(engine.search(Layout(args.fen)))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
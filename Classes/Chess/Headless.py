@@ -0,0 +1,189 @@
+"""
+This module drives the rules engine without the UI: positions come in as FEN (and moves), moves and analysis go out,
+one command per line on standard input / output (a subset of the UCI protocol, so chess GUIs can use it as well).
+
+Only `Classes.Chess` modules are imported (no pygame, psutil or `Classes.UI`), so short-lived worker processes
+on machines without a display start quickly; `--check-startup` compares the startup time with STARTUP_BUDGET_S.
+
+Usage (from the root catalogue of the repository):
+    python main.py --headless
+    python -m Classes.Chess.Headless --check-startup      # exit code 1 when over budget or a UI module was imported
+    printf "position startpos moves e2e4\\ngo depth 4\\n" | python -m Classes.Chess.Headless
+
+Commands:
+    - uci, isready, ucinewgame, quit: Protocol handshake (`uciok`, `readyok`) and control.
+    - position (startpos | fen <FEN>) [moves <move> ...]: Sets the position (moves in UCI notation, e.g. e2e4, e7e8q).
+    - go [depth <plies>] [nodes <count>] [movetime <ms>]: Searches the position, prints `info ...` and `bestmove <move>`.
+    - fen, legal, draw: Prints FEN of the position, its legal moves or the reason it is drawn (`none` if it is not).
+    - analyse [depth <plies>] [workers <count>]: Scores all legal moves (see Classes.Chess.Analysis).
+
+Classes:
+    - Session: State of a headless session (position and engine) and command handling.
+
+Functions:
+    - startup_report(started: float) -> tuple[float, list[str]]: Startup time and imported UI modules.
+    - main(argv: list[str] | None=None, started: float | None=None) -> int: Command loop entry point.
+
+Author: WK-K
+"""
+
+# standard modules
+import time
+_imported_at: float = time.perf_counter() # startup is measured from here when not given by the launcher
+import argparse
+import sys
+from typing import TextIO
+# project modules
+from Classes.Chess.Layout import Layout
+from Classes.Chess.Engine import Engine, SearchResult, MATE_SCORE, MAX_DEPTH, MAX_PLY
+from Classes.Chess.Move import MoveList, decode_move, move2uci, uci2move
+
+# CONSTANTS:
+STARTUP_BUDGET_S: float = 0.25
+"""Time from the start of the launcher to reading the first command (interpreter startup not included)."""
+UI_MODULES: tuple[str, ...] = ("pygame", "psutil", "Classes.UI", "Classes.Game")
+"""Modules (and packages) that must not be imported in headless mode."""
+
+# CLASSES:
+class Session:
+    """
+    State of a headless session and handling of its commands.
+
+    ATTRIBUTES:
+        - layout (Layout): Current position.
+        - engine (Engine): Engine searching the position (its tables are kept between searches).
+        - output (TextIO): Stream answers are written to.
+
+    METHODS:
+        - handle(line: str) -> bool: Executes one command, returns False after `quit`.
+    """
+    def __init__(self, output: TextIO=sys.stdout) -> None:
+        """Initializes session with the starting position."""
+        self.layout: Layout = Layout()
+        self.engine: Engine = Engine(time_limit=None)
+        self.output: TextIO = output
+    def _print(self, text: str) -> None:
+        """Writes one answer line (flushed at once, the other side waits for it)."""
+        self.output.write(text + "\n")
+        self.output.flush()
+    def handle(self, line: str) -> bool:
+        """
+        Executes one command line (see module description), unknown and wrong commands are reported
+        with `info string` lines and do not stop the session.
+
+        Returns:
+        - bool: False after `quit`, True otherwise.
+        """
+        tokens: list[str] = line.split()
+        if not tokens:
+            return True
+        command, arguments = tokens[0], tokens[1:]
+        try:
+            if command == "quit":
+                return False
+            elif command == "uci":
+                self._print("id name Chess (WK-K)\nid author WK-K\nuciok")
+            elif command == "isready":
+                self._print("readyok")
+            elif command == "ucinewgame":
+                self.layout = Layout()
+                self.engine = Engine(time_limit=None)
+            elif command == "position":
+                self._position(arguments)
+            elif command == "go":
+                self._go(arguments)
+            elif command == "fen":
+                self._print(self.layout.layout2fen())
+            elif command == "legal":
+                self._print(" ".join(move2uci(move) for move in self.layout.generate_moves(MoveList())))
+            elif command == "draw":
+                self._print(self.layout.draw_reason() or "none")
+            elif command == "analyse":
+                self._analyse(arguments)
+            else:
+                self._print(f"info string Unknown command: {command}")
+        except ValueError as error:
+            self._print(f"info string {error}")
+        return True
+    def _position(self, arguments: list[str]) -> None:
+        """
+        `position (startpos | fen <FEN>) [moves ...]`, the position is changed only if all moves are legal.
+
+        Raises:
+        - ValueError: When FEN or any move is wrong.
+        """
+        moves_at: int = arguments.index("moves") if "moves" in arguments else len(arguments)
+        if arguments[:1] == ["startpos"]:
+            layout = Layout()
+        elif arguments[:1] == ["fen"]:
+            layout = Layout(" ".join(arguments[1:moves_at]))
+        else:
+            raise ValueError("Expected: position (startpos | fen <FEN>) [moves <move> ...]")
+        move_list: MoveList = MoveList()
+        for uci in arguments[moves_at + 1:]:
+            move: int = uci2move(layout, uci)
+            if move not in layout.generate_moves(move_list):
+                raise ValueError(f"Illegal move: {uci}")
+            layout.update(*decode_move(move))
+        self.layout = layout
+    def _go(self, arguments: list[str]) -> None:
+        """`go [depth <plies>] [nodes <count>] [movetime <ms>]` (1 s if no limit is given)."""
+        limits: dict[str, int] = {name: int(value) for name, value in zip(arguments[::2], arguments[1::2])}
+        depth: int = limits.get("depth", MAX_DEPTH)
+        nodes: int | None = limits.get("nodes")
+        time_limit: float | None = limits["movetime"] / 1000 if "movetime" in limits else None
+        if depth == MAX_DEPTH and nodes is None and time_limit is None:
+            time_limit = 1.0
+        result: SearchResult = self.engine.search(self.layout, depth, nodes, time_limit)
+        if abs(result.score) >= MATE_SCORE - MAX_PLY:
+            plies: int = MATE_SCORE - abs(result.score)
+            score: str = f"mate {(plies + 1) // 2 if result.score > 0 else -((plies + 1) // 2)}"
+        else:
+            score: str = f"cp {result.score}"
+        self._print(f"info depth {result.depth} score {score} nodes {result.nodes} nps {result.nps:.0f} " +
+                    f"time {result.time * 1000:.0f}")
+        self._print(f"bestmove {move2uci(result.move) if result.move is not None else '0000'}")
+    def _analyse(self, arguments: list[str]) -> None:
+        """`analyse [depth <plies>] [workers <count>]`, one line per legal move, best first."""
+        from Classes.Chess.Analysis import analyse # process pool is imported only when needed
+        options: dict[str, int] = {name: int(value) for name, value in zip(arguments[::2], arguments[1::2])}
+        for move_score in analyse(self.layout.layout2fen(), options.get("depth", 3), options.get("workers")):
+            self._print(f"{move_score.move} {move_score.score} {move_score.nodes}")
+        self._print("analysisdone")
+
+# FUNCTIONS:
+def startup_report(started: float) -> tuple[float, list[str]]:
+    """Returns seconds since `started` (a time.perf_counter() value) and UI modules imported so far."""
+    elapsed: float = time.perf_counter() - started
+    loaded: list[str] = sorted(name for name in sys.modules
+                               if any(name == module or name.startswith(module + ".") for module in UI_MODULES))
+    return elapsed, loaded
+
+def main(argv: list[str] | None=None, started: float | None=None) -> int:
+    """
+    Command loop entry point: reads commands from standard input until `quit` or the end of input.
+
+    Arguments:
+    - argv (list[str] | None): Command line arguments (sys.argv[1:] if None).
+    - started (float | None): time.perf_counter() value at the start of the launcher (import of this module if None).
+    """
+    parser = argparse.ArgumentParser(prog="python -m Classes.Chess.Headless",
+                                     description="Drive the rules engine over standard input / output (no UI).")
+    parser.add_argument("--check-startup", action="store_true",
+                        help=f"print startup time, fail if it exceeds {STARTUP_BUDGET_S * 1000:.0f} ms " +
+                             "or any UI module was imported")
+    args = parser.parse_args(argv)
+
+    session = Session()
+    if args.check_startup:
+        elapsed, loaded = startup_report(_imported_at if started is None else started)
+        print(f"Startup: {elapsed * 1000:.1f} ms (budget {STARTUP_BUDGET_S * 1000:.0f} ms)")
+        print(f"UI modules: {', '.join(loaded) if loaded else 'none'}")
+        return 0 if elapsed <= STARTUP_BUDGET_S and not loaded else 1
+    for line in sys.stdin:
+        if not session.handle(line):
+            break
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
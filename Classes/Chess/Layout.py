@@ -11,6 +11,8 @@ Author: WK-K
 """
 
 from Classes.Chess.Common import *
+from Classes.Chess.Bitboard import Bitboards, squares_of
+from Classes.Chess.Move import MoveList, DOUBLE_PUSH, CASTLING, EN_PASSANT
 
 class Layout:
     '''
@@ -32,14 +34,37 @@ class Layout:
         - castling (list(bool)): Castling availability (as in FEN notation, i.e. [K, Q, k, q]).
         - en_passan (int | None): Index of the square over which a pawn has passed by moving two squares forward (None if different move was done).
         - clock (int): Number of moves made since the last capture or pawn advance (used in the 50-move rule)
+        - zobrist_key (int): 64-bit Zobrist hash of the position (pieces, side to move, castling and
+            en passant file when the capture is possible),
+            computed once on initialization and then updated incrementally by update() and castling_update()
+        - piece_squares (list[set[int]]): Board indices of pieces of each colour ([black, white]),
+            kept in sync by update() so pieces can be enumerated without scanning all 64 fields
+        - king_squares (list[int]): Board indices of both kings ([black, white])
+        - material_counts (list[int]): Number of pieces of every piece number (as in fields, 16 entries),
+            kept in sync by update(), so insufficient material is known without looking at the board
+        - key_history (list[int]): Zobrist keys of earlier positions since the last capture or pawn move (oldest first),
+            pushed by update() (which starts a new list on irreversible moves) and restored by unmake_move(),
+            so copy() and repetitions() only deal with at most `clock` keys
+        - eval_mg (int), eval_eg (int): Middlegame and endgame material + piece-square score (white positive),
+            kept in sync by update() with per-move deltas (see `eval_mg`, `eval_eg` tables in Common.py)
+        - phase (int): Game phase from piece weights (MAX_PHASE = 24 in the starting position, 0 with pawns and kings)
+        - bitboards (Bitboards | None): Bitboard representation used for move generation with the "bitboard" backend
+            (None with the default "list" backend). `fields` is then kept in sync as a derived view of the board.
+        - accumulator (object | None): First layer of a neural network evaluator kept in sync by update() 
+            (see Classes.Chess.NNUE, attached with NNUE.attach(), None otherwise). 
+            Like Bitboards it is told about every piece with add(square, piece) and remove(square, piece).
     
     METHODS:
-        - __init__(fen: str | None=None) -> None: 
-            Initializes the layout instance from FEN (If 'fen' is None, initializes with the default layout).
+        - __init__(fen: str | bytes | None=None, backend: str="list") -> None: 
+            Initializes the layout instance from FEN or a packed record (If 'fen' is None, initializes with the default layout)
+            with a given board representation for move generation ("list" or "bitboard").
         
         - _init_default() -> None: 
             Initializes the layout with the default piece positions.
         
+        - copy() -> Layout: 
+            Returns an independent copy of the layout (also used by copy.copy() and copy.deepcopy()).
+        
         - __str__() -> str: 
             Returns string representation of the current layout instance (multiline).
         
@@ -49,25 +74,61 @@ class Layout:
         - layout2fen() -> str: 
             Returns the FEN notation representation of the layout.
         
+        - bytes2layout(data: bytes) -> None, layout2bytes() -> bytes:
+            Same as above for fixed-width binary records (see `position2bytes()` in Common.py).
+        
         - update(old_field: int, new_field: int) -> None: 
             Updates layout attributes based on a move from old_field to new_field.
         
         - castling_update(old_piece: int, old_field: int, new_field: int) -> None: 
             Handles the castling logic when updating the layout.
         
+        - make_move(old_field: int, new_field: int, promotion: int | None=None) -> tuple:
+            Makes a move in place and returns an undo record for unmake_move().
+        
+        - unmake_move(undo: tuple) -> None:
+            Takes back a move made with make_move() using its undo record.
+        
         - all_possible_moves_for_piece(index: int, with_castling_bool: bool=True) -> tuple[list[int], list[int]]:
             Calculates all possible moves for a specific piece at the given index, including special handling for castling 
             and en passant, and returns a tuple containing lists of possible non-capturing and capturing moves.
+        
+        - all_possible_moves() -> list[tuple[int, int]] / legal_moves_iter():
+            Legal moves of the side to move as (old_field, new_field) tuples (list or generator).
+        
+        - generate_moves(move_list: MoveList | None=None) -> MoveList:
+            Fills a reusable move list with packed 16-bit legal moves (see Classes.Chess.Move).
+        
+        - evaluation() -> int:
+            Tapered material + piece-square evaluation of the side to move (kept incrementally).
+        
+        - see(move: int) -> int:
+            Static exchange evaluation of a capture (material won or lost on the target square).
+        
+        - repetitions() -> int, is_insufficient_material() -> bool, draw_reason(claim: bool=True) -> str | None:
+            Draw detection (repetition, 50 / 75-move rules, insufficient material, stalemate).
     '''
     
-    # ATRIBUTES
-    piece_count: int = 0
-    fields: list[int] = [] * 64 # Array of fields on the board (0 = a1, 1 = a2, ..., 63 = h8) with numbers indicating occupation
-    white_moves: bool = True
-    moves_made: int = 0
-    castling: list[bool] = [True] * 4 # Castling availability as in FEN notation, that is: K, Q, k, q.
-    en_passant: int = None # fields array index of squere over whitch a pawn has passed by moving two squeres forward
-    clock: int = 0 # number of moves made since last capture or pawn advance used in 50-move rule
+    # ATRIBUTES (all owned by the instance, set in _init_default() or fen2layout())
+    __slots__ = (
+        "piece_count",
+        "fields", # Array of fields on the board (0 = a1, 1 = a2, ..., 63 = h8) with numbers indicating occupation
+        "white_moves",
+        "moves_made",
+        "castling", # Castling availability as in FEN notation, that is: K, Q, k, q.
+        "en_passant", # fields array index of squere over whitch a pawn has passed by moving two squeres forward
+        "clock", # number of moves made since last capture or pawn advance used in 50-move rule
+        "zobrist_key", # 64-bit Zobrist hash of the position
+        "piece_squares", # indices of black and white pieces
+        "king_squares", # indices of black and white king
+        "material_counts", # number of pieces of every piece number
+        "key_history", # zobrist keys of earlier positions since the last capture or pawn move (repetition detection)
+        "eval_mg", # middlegame score (white positive)
+        "eval_eg", # endgame score (white positive)
+        "phase", # game phase used to taper eval_mg and eval_eg
+        "bitboards", # bitboard representation (only with "bitboard" backend)
+        "accumulator", # neural network accumulator (only when attached to an evaluator)
+    )
     # constants
     ROOK_MOVEMENT_DIRECTIONS: list[tuple[int, int]] =      [(1, 0), (-1, 0), (0, 1), (0, -1)]
     KNIGHT_MOVEMENT_OFFSET: list[tuple[int, int]] =        [(-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1)]
@@ -76,15 +137,33 @@ class Layout:
 
     # METHODS
     # magic methods
-    def __init__(self, fen: str | None=None) -> None:
+    def __init__(self, fen: str | bytes | None=None, backend: str="list") -> None:
         '''
-        Initializes the layout instance from FEN.
+        Initializes the layout instance from FEN 
+        or from a binary record of PACKED_SIZE bytes (bytes, bytearray or memoryview, see `bytes2layout()`).
         If 'fen' is None, initializes with the default layout).
+
+        Backend chooses board representation used for move generation:
+        - "list": 64 element `fields` array (default)
+        - "bitboard": piece bitboards with precomputed attack tables (`fields` is kept as a derived view)
+
+        Raises:
+        - ValueError: When backend is not one of the above.
         '''
         if fen is None: 
             self._init_default()
-        else: 
+        elif isinstance(fen, str): 
             self.fen2layout(fen) 
+        else:
+            self.bytes2layout(fen)
+
+        if backend == "bitboard":
+            self.bitboards: Bitboards | None = Bitboards(self.fields)
+        elif backend == "list":
+            self.bitboards: Bitboards | None = None
+        else:
+            raise ValueError(f"Unknown backend: {backend}")
+        self.accumulator = None
     def _init_default(self) -> None:
         '''Initializes layout with standard arrangement of pieces'''
         self.piece_count: int = 32
@@ -96,6 +175,68 @@ class Layout:
                                 0, 0, 0, 0, 0, 0, 0, 0,
                                 1, 1, 1, 1, 1, 1, 1, 1,
                                 2, 3, 4, 5, 6, 4, 3, 2]
+        self.white_moves: bool = True
+        self.moves_made: int = 0
+        self.castling: list[bool] = [True] * 4
+        self.en_passant: int | None = None
+        self.clock: int = 0
+        self.key_history: list[int] = []
+        self.zobrist_key: int = zobrist_key(self.fields, self.white_moves, self.castling, self.en_passant)
+        self._init_piece_squares()
+        self._init_evaluation()
+    def _init_piece_squares(self) -> None:
+        '''Builds piece_squares, king_squares and material_counts from fields (later they are updated incrementally).'''
+        self.piece_squares: list[set[int]] = [set(), set()]
+        self.king_squares: list[int] = [-1, -1]
+        self.material_counts: list[int] = [0] * 16
+        for index, piece in enumerate(self.fields):
+            if piece:
+                self.piece_squares[piece >> 3].add(index)
+                self.material_counts[piece] += 1
+                if piece & 7 == 6:
+                    self.king_squares[piece >> 3] = index
+    def _init_evaluation(self) -> None:
+        '''Computes eval_mg, eval_eg and phase from fields (later they are updated incrementally).'''
+        self.eval_mg: int = 0
+        self.eval_eg: int = 0
+        self.phase: int = 0
+        for index, piece in enumerate(self.fields):
+            if piece:
+                self.eval_mg += eval_mg[piece][index]
+                self.eval_eg += eval_eg[piece][index]
+                self.phase += phase_weights[piece & 7]
+    def copy(self) -> "Layout":
+        '''
+        Returns an independent copy of the layout (same backend).
+
+        Attributes are copied directly (lists sliced, bitboards copied as a list of integers),
+        which is much cheaper than `copy.deepcopy()` or a FEN round-trip.
+        '''
+        new: Layout = Layout.__new__(Layout)
+        new.piece_count = self.piece_count
+        new.fields = self.fields[:]
+        new.white_moves = self.white_moves
+        new.moves_made = self.moves_made
+        new.castling = self.castling[:]
+        new.en_passant = self.en_passant
+        new.clock = self.clock
+        new.zobrist_key = self.zobrist_key
+        new.piece_squares = [self.piece_squares[0].copy(), self.piece_squares[1].copy()]
+        new.king_squares = self.king_squares[:]
+        new.material_counts = self.material_counts[:]
+        new.key_history = self.key_history[:]
+        new.eval_mg = self.eval_mg
+        new.eval_eg = self.eval_eg
+        new.phase = self.phase
+        new.bitboards = None if self.bitboards is None else self.bitboards.copy()
+        new.accumulator = None if self.accumulator is None else self.accumulator.copy()
+        return new
+    def __copy__(self) -> "Layout":
+        '''Support for `copy.copy()`, same as copy() (a shallow copy would share the fields list).'''
+        return self.copy()
+    def __deepcopy__(self, memo: dict) -> "Layout":
+        '''Support for `copy.deepcopy()`, same as copy().'''
+        return self.copy()
     def __str__(self) -> str:
         ''''Return string representation of all atributes'''
         if self.en_passant == None: 
@@ -142,23 +283,19 @@ black queen: {cq}\n
             clock = self.clock) 
     # fen operations
     def fen2layout(self, fen: str) -> None:
-        ''''Sets layout atributes to coresponding to FEN string'''
-        # piece count
-        self.piece_count: int = fen2piece_count(fen)
-        # fields
-        self.fields: list[int] = fen2array_of_fields(fen)
-        # white moves
-        if fen.split(' ')[1] == 'b': 
-            self.white_moves: bool = False
-        # moves made
-        self.moves_made: int = int(fen.split(' ')[5])
-        # castling
-        self.castling: list[bool] = fen2castling_arr(fen)
-        # en passant
-        if fen.split(' ')[3] != '-': 
-            self.en_passant: int = file_rank_string2board_index[fen.split(' ')[3]]
-        # clock
-        self.clock: int = int(fen.split(' ')[4])
+        '''
+        Sets layout atributes to coresponding to FEN (or EPD) string (parsed in a single pass, see `fen2position()`).
+
+        Raises:
+        - ValueError: When the string is not a valid FEN.
+        '''
+        self.fields, self.white_moves, self.castling, self.en_passant, self.clock, self.moves_made = \
+            fen2position(fen)
+        self.key_history = [] # moves before the position are not known
+        self.piece_count = 64 - self.fields.count(0)
+        self.zobrist_key = zobrist_key(self.fields, self.white_moves, self.castling, self.en_passant)
+        self._init_piece_squares()
+        self._init_evaluation()
     def layout2fen(self) -> str:
         '''Returns FEN notation string corresponding to layout atributes.'''
         # white moves
@@ -184,16 +321,28 @@ black queen: {cq}\n
         str(self.moves_made)
 
         return fen   
+    def bytes2layout(self, data: bytes) -> None:
+        '''Sets layout atributes to coresponding to a binary record (see `position2bytes()` in Common.py).'''
+        self.fields, self.white_moves, self.castling, self.en_passant, self.clock, self.moves_made = \
+            bytes2position(data)
+        self.key_history = []
+        self.piece_count = 64 - self.fields.count(0)
+        self.zobrist_key = zobrist_key(self.fields, self.white_moves, self.castling, self.en_passant)
+        self._init_piece_squares()
+        self._init_evaluation()
+    def layout2bytes(self) -> bytes:
+        '''Returns fixed-width binary record (PACKED_SIZE bytes) corresponding to layout atributes.'''
+        return position2bytes(self.fields, self.white_moves, self.castling, self.en_passant, self.clock, self.moves_made)
     # updating layout
-    def update(self, old_field: int, new_field: int) -> None:
+    def update(self, old_field: int, new_field: int, promotion: int | None=None) -> None:
         '''
         Updates all atributes based on a given move.
 
         Arguments:
         - old_field (int), new_field (int): made move from old_field to new_field
-
-        Note:
-        Promotion functionality not finnished.
+        - promotion (int | None): piece type (2-5) a pawn reaching the last rank turns into,
+            colour is taken from the pawn. If None pawn is promoted to a queen 
+            (the UI does not let the user choose the piece).
         '''
         old_piece = self.fields[old_field]
         new_piece = self.fields[new_field]
@@ -204,13 +353,61 @@ black queen: {cq}\n
         # if capture happend
         capture_bool = new_piece != 0 or en_passant_happened
 
+        # if en passant file is in the zobrist key (decided on the board before the move)
+        en_passant_hashed = en_passant_capturable(self.fields, self.white_moves, self.en_passant)
+
         # piece_count
         if capture_bool: 
             self.piece_count -=1 # one piece captured
+        if new_piece:
+            self.material_counts[new_piece] -= 1
+
+        # key history (position before the move), positions before a capture or pawn move can not repeat
+        if capture_bool or old_piece in (1, 9):
+            self.key_history = []
+        else:
+            self.key_history.append(self.zobrist_key)
 
         # fields
         self.fields[new_field] = old_piece # piece from prvious field on new field
         self.fields[old_field] = 0 # old field to empty 
+        # zobrist key (side to move, pieces, en passant; castling is handled in castling_update())
+        key: int = self.zobrist_key ^ zobrist_black_to_move ^ \
+            zobrist_pieces[old_piece][old_field] ^ zobrist_pieces[old_piece][new_field]
+        if new_piece:
+            key ^= zobrist_pieces[new_piece][new_field]
+        if en_passant_hashed:
+            key ^= zobrist_en_passant[self.en_passant % 8]
+        self.zobrist_key = key
+        # evaluation (moved piece and captured piece)
+        self.eval_mg += eval_mg[old_piece][new_field] - eval_mg[old_piece][old_field]
+        self.eval_eg += eval_eg[old_piece][new_field] - eval_eg[old_piece][old_field]
+        if new_piece:
+            self.eval_mg -= eval_mg[new_piece][new_field]
+            self.eval_eg -= eval_eg[new_piece][new_field]
+            self.phase -= phase_weights[new_piece & 7]
+        # piece squares
+        color: int = old_piece >> 3
+        own_squares: set[int] = self.piece_squares[color]
+        own_squares.discard(old_field)
+        own_squares.add(new_field)
+        if new_piece:
+            self.piece_squares[color ^ 1].discard(new_field)
+        if old_piece & 7 == 6:
+            self.king_squares[color] = new_field
+        # bitboards
+        bitboards = self.bitboards
+        if bitboards is not None:
+            bitboards.remove(old_field, old_piece)
+            if new_piece:
+                bitboards.remove(new_field, new_piece)
+            bitboards.add(new_field, old_piece)
+        accumulator = self.accumulator
+        if accumulator is not None:
+            accumulator.remove(old_field, old_piece)
+            if new_piece:
+                accumulator.remove(new_field, new_piece)
+            accumulator.add(new_field, old_piece)
 
         # white_moves
         self.white_moves = not self.white_moves
@@ -226,10 +423,20 @@ black queen: {cq}\n
         if en_passant_happened:
             # black capturing (moves are reveresed earlier)
             if self.white_moves: 
-                self.fields[new_field + 8] = 0
+                captured_field: int = new_field + 8
             # white capturing (moves are reversed earlier)
             else: 
-                self.fields[new_field - 8] = 0
+                captured_field: int = new_field - 8
+            if bitboards is not None:
+                bitboards.remove(captured_field, self.fields[captured_field])
+            if accumulator is not None:
+                accumulator.remove(captured_field, self.fields[captured_field])
+            self.zobrist_key ^= zobrist_pieces[self.fields[captured_field]][captured_field]
+            self.eval_mg -= eval_mg[self.fields[captured_field]][captured_field]
+            self.eval_eg -= eval_eg[self.fields[captured_field]][captured_field]
+            self.piece_squares[color ^ 1].discard(captured_field)
+            self.material_counts[self.fields[captured_field]] -= 1
+            self.fields[captured_field] = 0
         self.en_passant = None
         # en passant capture not happend
         # white pawn moved two spaces
@@ -238,32 +445,50 @@ black queen: {cq}\n
         # black pawn moved two spaces
         if old_piece == 1 and old_field - new_field == 16: 
             self.en_passant = old_field - 8
+        if en_passant_capturable(self.fields, self.white_moves, self.en_passant):
+            self.zobrist_key ^= zobrist_en_passant[self.en_passant % 8]
 
         # clock
         self.clock = 0 if capture_bool or old_piece in (1, 9) else self.clock + 1
 
         # Promotion
-        # white
-        if old_piece == 9 and new_field > 55:
-            self.fields[new_field] = 13
-            try:
-                raise NotImplementedError("Promotion changes pawn to a queen, does not let user choose otherwise.")
-            except NotImplementedError as e:
-                import traceback
-                traceback.print_exc()
-                print(f"Handled {e}")
-        # black
-        if old_piece == 1 and new_field < 8:
-            self.fields[new_field] = 5
-            try:
-                raise NotImplementedError("Promotion changes pawn to a queen, does not let user choose otherwise.")
-            except NotImplementedError as e:
-                import traceback
-                traceback.print_exc()
-                print(f"Handled {e}")
+        if (old_piece == 9 and new_field > 55) or (old_piece == 1 and new_field < 8):
+            if promotion is None:
+                promotion = 5 # queen
+            self.fields[new_field] = promotion | (old_piece & 8)
+            self.material_counts[old_piece] -= 1
+            self.material_counts[self.fields[new_field]] += 1
+            self.zobrist_key ^= zobrist_pieces[old_piece][new_field] ^ zobrist_pieces[self.fields[new_field]][new_field]
+            self.eval_mg += eval_mg[self.fields[new_field]][new_field] - eval_mg[old_piece][new_field]
+            self.eval_eg += eval_eg[self.fields[new_field]][new_field] - eval_eg[old_piece][new_field]
+            self.phase += phase_weights[promotion]
+            if bitboards is not None:
+                bitboards.remove(new_field, old_piece)
+                bitboards.add(new_field, self.fields[new_field])
+            if accumulator is not None:
+                accumulator.remove(new_field, old_piece)
+                accumulator.add(new_field, self.fields[new_field])
     def castling_update(self, old_piece: int, old_field: int, new_field: int) -> None:
         '''Part of update() that meneges castling, etracted for more readability'''
         offset: int = old_field - new_field
+        old_castling: tuple[bool, ...] = tuple(self.castling)
+
+        # rook jumps over the king
+        if old_piece in (14, 6) and offset in (2, -2):
+            rook: int = old_piece - 4
+            rook_from, rook_to = (old_field - 4, old_field - 1) if offset == 2 else (old_field + 3, old_field + 1)
+            self.zobrist_key ^= zobrist_pieces[rook][rook_from] ^ zobrist_pieces[rook][rook_to]
+            self.eval_mg += eval_mg[rook][rook_to] - eval_mg[rook][rook_from]
+            self.eval_eg += eval_eg[rook][rook_to] - eval_eg[rook][rook_from]
+            rook_squares: set[int] = self.piece_squares[rook >> 3]
+            rook_squares.discard(rook_from)
+            rook_squares.add(rook_to)
+            if self.bitboards is not None:
+                self.bitboards.remove(rook_from, rook)
+                self.bitboards.add(rook_to, rook)
+            if self.accumulator is not None:
+                self.accumulator.remove(rook_from, rook)
+                self.accumulator.add(rook_to, rook)
 
         # king moved
         # white king castling possibility
@@ -288,19 +513,110 @@ black queen: {cq}\n
             if offset == -2:
                 self.fields[61] = 2 # rook to king jump
                 self.fields[63] = 0 # old rook's field to empty
-        # rook moved
+        # rook moved or captured on its starting field
         # white king's rook castling possibility     
-        if old_field == 7:
+        if old_field == 7 or new_field == 7:
             self.castling[0] = False
         # white queen's rook castling possibility
-        if old_field == 0:
+        if old_field == 0 or new_field == 0:
             self.castling[1] = False
         # black king's rook castling possibility
-        if old_field == 63:
+        if old_field == 63 or new_field == 63:
             self.castling[2] = False
         # black queen's rook castling possibility
-        if old_field == 56:
+        if old_field == 56 or new_field == 56:
             self.castling[3] = False
+
+        # zobrist key of castling rights lost with this move
+        for index in range(4):
+            if old_castling[index] != self.castling[index]:
+                self.zobrist_key ^= zobrist_castling[index]
+    def make_move(self, old_field: int, new_field: int, promotion: int | None=None) -> tuple:
+        '''
+        Makes a move in place (through update()) and returns an undo record for unmake_move().
+
+        Undo record is a tuple of everything update() overwrites that can not be derived back from the board:
+        (old_field, new_field, moved piece, captured piece, castling, en_passant, clock, piece_count, zobrist_key,
+        bitboards snapshot, (eval_mg, eval_eg, phase), accumulator snapshot, key_history).
+
+        Arguments:
+        - old_field (int), new_field (int): move from old_field to new_field
+        - promotion (int | None): piece type for promotion (see update())
+        '''
+        undo: tuple = (old_field, new_field, self.fields[old_field], self.fields[new_field],
+                       tuple(self.castling), self.en_passant, self.clock, self.piece_count, self.zobrist_key,
+                       None if self.bitboards is None else self.bitboards.snapshot(),
+                       (self.eval_mg, self.eval_eg, self.phase),
+                       None if self.accumulator is None else self.accumulator.snapshot(),
+                       self.key_history)
+        self.update(old_field, new_field, promotion)
+        return undo
+    def unmake_move(self, undo: tuple) -> None:
+        '''
+        Takes back a move made with make_move(), including castling rook hops, 
+        en passant captures and promotions.
+
+        Arguments:
+        - undo (tuple): record returned by make_move() for the move being taken back
+        '''
+        old_field, new_field, old_piece, new_piece, castling, en_passant, clock, piece_count, key, bitboards, \
+            evaluation, accumulator, key_history = undo
+
+        # material counts (promotion, capture)
+        material_counts: list[int] = self.material_counts
+        promoted: int = self.fields[new_field]
+        if promoted != old_piece:
+            material_counts[promoted] -= 1
+            material_counts[old_piece] += 1
+        if new_piece:
+            material_counts[new_piece] += 1
+
+        # fields (also reverts promotion, as the pawn itself is put back) and piece squares
+        color: int = old_piece >> 3
+        own_squares: set[int] = self.piece_squares[color]
+        self.fields[old_field] = old_piece
+        self.fields[new_field] = new_piece
+        own_squares.discard(new_field)
+        own_squares.add(old_field)
+        if new_piece:
+            self.piece_squares[color ^ 1].add(new_field)
+        # castling rook hop
+        if old_piece in (14, 6):
+            self.king_squares[color] = old_field
+            if (old_field - new_field) in (2, -2):
+                rook: int = old_piece - 4
+                if new_field > old_field: # king's rook
+                    rook_from, rook_to = old_field + 3, old_field + 1
+                else: # queen's rook
+                    rook_from, rook_to = old_field - 4, old_field - 1
+                self.fields[rook_from] = rook
+                self.fields[rook_to] = 0
+                own_squares.discard(rook_to)
+                own_squares.add(rook_from)
+        # en passant capture (captured pawn stands behind the en passant square)
+        if old_piece in (1, 9) and new_field == en_passant:
+            captured_field: int = new_field - 8 if old_piece == 9 else new_field + 8
+            self.fields[captured_field] = 10 - old_piece
+            self.piece_squares[color ^ 1].add(captured_field)
+            material_counts[10 - old_piece] += 1
+
+        # remaining atributes
+        if bitboards is not None:
+            self.bitboards.restore(bitboards)
+        if accumulator is not None:
+            self.accumulator.restore(accumulator)
+        self.castling[:] = castling
+        self.en_passant = en_passant
+        self.clock = clock
+        self.piece_count = piece_count
+        self.zobrist_key = key
+        if key_history is self.key_history:
+            key_history.pop()
+        else: # update() started a new history
+            self.key_history = key_history
+        self.eval_mg, self.eval_eg, self.phase = evaluation
+        self.white_moves = not self.white_moves
+        self.moves_made -= 1
     def all_possible_moves_for_piece(self, 
                                      index: int, 
                                      with_castling_bool: bool=True) -> tuple[list[int], list[int]]:
@@ -332,13 +648,17 @@ black queen: {cq}\n
 
         Notes:
         - The method first determines the type of piece at the given index and whose turn it is to move.
-        - Depending on the piece type, it uses helper methods (`get_moves_at_offsets`, `get_moves_in_directions`) 
-        to generate potential moves.
+        - Depending on the piece type, it uses helper methods (`get_moves_to_targets`, `get_moves_along_rays`) 
+        to generate potential moves from per-square tables precomputed in Common.py.
         - Special handling is included for pawns (considering forward movement, diagonal captures, and en passant) 
         and kings (considering standard movement and castling).
         - The method does not check for move legality in terms of leaving the king in check.
+        - With the "bitboard" backend moves are read from `Bitboards.targets()` masks instead.
         """
         piece = self.fields[index]
+        if self.bitboards is not None:
+            quiet, captures = self.bitboards.targets(index, piece, self.en_passant, self.castling, with_castling_bool)
+            return list(squares_of(quiet)), list(squares_of(captures))
         possible_moves, capturing_moves = [], []
 
         # Pawn moves
@@ -347,23 +667,23 @@ black queen: {cq}\n
         # Rook moves
         elif piece in (10, 2):  
             possible_moves, capturing_moves = \
-                self.get_moves_in_directions(index, self.ROOK_MOVEMENT_DIRECTIONS)
+                self.get_moves_along_rays(rook_rays[index], piece)
         # Knight moves
         elif piece in (11, 3):  
             possible_moves, capturing_moves = \
-                self.get_moves_at_offsets(index, self.KNIGHT_MOVEMENT_OFFSET)
+                self.get_moves_to_targets(knight_targets[index], piece)
         # Bishop moves
         elif piece in (12, 4):  
             possible_moves, capturing_moves = \
-                self.get_moves_in_directions(index, self.BISHOP_MOVEMENT_DIRECTIONS)
+                self.get_moves_along_rays(bishop_rays[index], piece)
         # Queen moves
         elif piece in (13, 5):  
             possible_moves, capturing_moves = \
-                self.get_moves_in_directions(index, self.QUEEN_MOVEMENT_DIRECTIONS)
+                self.get_moves_along_rays(queen_rays[index], piece)
         # King moves
         elif piece in (14, 6):  
             possible_moves, capturing_moves = \
-                self.get_moves_at_offsets(index, self.QUEEN_MOVEMENT_DIRECTIONS) # should work as offset
+                self.get_moves_to_targets(king_targets[index], piece)
             if with_castling_bool:
                 self.handle_castling_moves(index, possible_moves)
 
@@ -377,16 +697,12 @@ black queen: {cq}\n
         """
         offset = 8 if piece == 9 else -8
         start_row = 1 if piece == 9 else 6
-        left_capture, right_capture = index + offset - 1, index + offset + 1
+        color_bit = piece & 8 # only pieces with the other colour bit can be captured
 
-        if index % 8 != 0 and \
-            (self.fields[left_capture] not in (0, piece) or \
-            left_capture == self.en_passant):
-            capturing_moves.append(left_capture)
-        if index % 8 != 7 and \
-            (self.fields[right_capture] not in (0, piece) or \
-             right_capture == self.en_passant):
-            capturing_moves.append(right_capture)
+        for capture in pawn_captures[color_bit >> 3][index]:
+            target = self.fields[capture]
+            if (target != 0 and target & 8 != color_bit) or capture == self.en_passant:
+                capturing_moves.append(capture)
 
         if self.fields[index + offset] == 0:
             possible_moves.append(index + offset)
@@ -410,101 +726,119 @@ black queen: {cq}\n
         - Index 2: Black kingside castling.
         - Index 3: Black queenside castling.
         - The `self.fields` array represents the board state, where each element is a piece or empty square.
+        - King may not castle out of, through or into check and the rook has to stand on its square.
         """
         
-        if self.white_moves():
+        if self.white_moves:
             # White king's castling options
             if index == 4:  # Ensure the piece is actually a white king on e1
                 # Kingside castling for white
                 if self.castling[0] and \
+                    self.fields[7] == 10 and \
                     self.fields[5] == 0 and \
-                    self.fields[6] == 0:
+                    self.fields[6] == 0 and \
+                    not self.any_square_attacked((4, 5, 6), False):
                     possible_moves.append(6)
                 # Queenside castling for white
                 if self.castling[1] and \
+                    self.fields[0] == 10 and \
                     self.fields[1] == 0 and \
                     self.fields[2] == 0 and \
-                    self.fields[3] == 0:
+                    self.fields[3] == 0 and \
+                    not self.any_square_attacked((4, 3, 2), False):
                     possible_moves.append(2)
         
-        elif not self.white_moves():
+        else:
             # Black king's castling options
             if index == 60:  # Ensure the piece is actually a black king on e8
                 # Kingside castling for black
                 if self.castling[2] and \
+                    self.fields[63] == 2 and \
                     self.fields[61] == 0 and \
-                    self.fields[62] == 0:
+                    self.fields[62] == 0 and \
+                    not self.any_square_attacked((60, 61, 62), True):
                     possible_moves.append(62)
                 # Queenside castling for black
                 if self.castling[3] and \
+                    self.fields[56] == 2 and \
                     self.fields[57] == 0 and \
                     self.fields[58] == 0 and \
-                    self.fields[59] == 0:
+                    self.fields[59] == 0 and \
+                    not self.any_square_attacked((60, 59, 58), True):
                     possible_moves.append(58)
-    def get_moves_in_directions(self, index: int, directions: list[tuple[int, int]]) -> tuple[list[int], list[int]]:
+    def get_moves_along_rays(self, rays: tuple[tuple[int, ...], ...], piece: int) -> tuple[list[int], list[int]]:
         """
-        Calculate all possible moves in specified directions for a piece on the board.
-
-        Given the board `index` of a piece and a list of movement `directions`, this method returns a tuple containing:
-        - A list of indices representing possible non-capturing moves.
-        - A list of indices representing capturing moves.
+        Calculate all possible moves of a sliding piece along precomputed rays (see `rook_rays`, `bishop_rays`,
+        `queen_rays` in Common.py).
 
         Arguments:
-        - index (int): The board index (0-63) of the piece for which to calculate possible moves.
-        - directions (list[tuple[int, int]]): A list of tuples representing the movement directions 
-            (e.g., [(1, 0), (0, 1)] for rook movements).
+        - rays (tuple[tuple[int, ...], ...]): Rays of the piece's square, every ray lists squares nearest first.
+        - piece (int): The moving piece (its colour decides which pieces can be captured).
 
         Returns:
         - tuple[list[int], list[int]]: 
-            - The first list contains indices of all valid non-capturing moves in the given directions.
-            - The second list contains indices of all valid capturing moves in the given directions.
+            - The first list contains indices of all valid non-capturing moves along the rays.
+            - The second list contains indices of all valid capturing moves along the rays.
 
         Process flow:
-        - For each direction, the method iteratively checks squares in that direction.
-        - If a square is empty, it is added to the possible non-capturing moves.
-        - If a square contains a piece of the opposite color, it is added to the capturing moves.
-        - The iteration in a given direction stops upon encountering a non-empty square.
-        - The method ensures that moves remain within the bounds of the board.
+        - Every ray is walked from the piece outwards, empty squares are non-capturing moves.
+        - The first occupied square ends the ray and is a capture if it holds a piece of the opposite colour.
         """
-        possible_moves = []
-        capturing_moves = []
-
-        # loop through each direction
-        for direction in directions:
-            row, col = divmod(index, 8) # returns quotient and reminder
-            row_offset, col_offset = direction
-
-            # loop in a specific direction
-            while True:
-                row += row_offset
-                col += col_offset
-
-                # check if the new position is within the bounds of the board
-                if not (0 <= row < 8 and 0 <= col < 8): break
-
-                # setting current index
-                temp_index = row * 8 + col
-
-                # if the target square is empty, add it to the possible_moves array
-                if self.fields[temp_index] == 0:
+        fields: list[int] = self.fields
+        color_bit: int = piece & 8
+        possible_moves: list[int] = []
+        capturing_moves: list[int] = []
+        for ray in rays:
+            for temp_index in ray:
+                target: int = fields[temp_index]
+                if target == 0:
                     possible_moves.append(temp_index)
-
                 else:
-                    # if the target square is occupied, check if the piece belongs to the opposite color
-                    # using bitwise operations to check the 4th bit (color bit) of the piece
-                    if bool((self.fields[temp_index] >> 3) & 1) != self.white_moves:
-                        # If the colors are different, it means a capture is possible, so add it to capturing moves
+                    # colour is the 4th bit of the piece
+                    if target & 8 != color_bit:
                         capturing_moves.append(temp_index)
                     break
+        return possible_moves, capturing_moves
+    def get_moves_to_targets(self, targets: tuple[int, ...], piece: int) -> tuple[list[int], list[int]]:
+        """
+        Calculate all possible moves of a leaping piece (knight, king) to precomputed target squares
+        (see `knight_targets`, `king_targets` in Common.py).
 
+        Returns:
+        - tuple[list[int], list[int]]: Non-capturing moves (empty targets) and captures (targets with enemy pieces).
+        """
+        fields: list[int] = self.fields
+        color_bit: int = piece & 8
+        possible_moves: list[int] = []
+        capturing_moves: list[int] = []
+        for temp_index in targets:
+            target: int = fields[temp_index]
+            if target == 0:
+                possible_moves.append(temp_index)
+            elif target & 8 != color_bit:
+                capturing_moves.append(temp_index)
         return possible_moves, capturing_moves
-    def get_moves_at_offsets(self, index, offsets) -> tuple[list[int], list[int]]:
+    def get_moves_in_directions(self, index: int, directions: list[tuple[int, int]]) -> tuple[list[int], list[int]]:
         """
-        Calculate all possible moves based on specific offsets for a piece on the board.
+        Calculate all possible moves in specified directions for a piece on the board.
+
+        Arguments:
+        - index (int): The board index (0-63) of the piece for which to calculate possible moves.
+        - directions (list[tuple[int, int]]): A list of tuples representing the movement directions 
+            (e.g., [(1, 0), (0, 1)] for rook movements).
 
-        Given the board `index` of a piece and a list of movement `offsets`, this method returns a tuple containing:
-        - A list of indices representing possible non-capturing moves.
-        - A list of indices representing capturing moves.
+        Returns:
+        - tuple[list[int], list[int]]: Non-capturing and capturing moves in the given directions.
+
+        Note:
+        Rays are taken from `direction_rays` table (Common.py), see get_moves_along_rays().
+        Colour of the moving side is taken from the piece at `index`.
+        """
+        rays: dict[tuple[int, int], tuple[int, ...]] = direction_rays[index]
+        return self.get_moves_along_rays(tuple(rays[direction] for direction in directions), self.fields[index])
+    def get_moves_at_offsets(self, index, offsets) -> tuple[list[int], list[int]]:
+        """
+        Calculate all possible moves based on specific (knight or king) offsets for a piece on the board.
 
         Arguments:
         - index (int): The board index (0-63) of the piece for which to calculate possible moves.
@@ -512,70 +846,466 @@ black queen: {cq}\n
         (e.g., [(2, 1), (1, 2)] for knight movements).
 
         Returns:
-        - tuple[list[int], list[int]]: 
-            - The first list contains indices of all valid non-capturing moves at the given offsets.
-            - The second list contains indices of all valid capturing moves at the given offsets.
+        - tuple[list[int], list[int]]: Non-capturing and capturing moves at the given offsets.
 
-        Process flow:
-        - For each offset, the method calculates the target square by adding the offset to the current piece's position.
-        - If the target square is empty, it is added to the possible non-capturing moves.
-        - If the target square contains a piece of the opposite color, it is added to the capturing moves.
-        - The method ensures that the calculated moves are within the bounds of the board.
+        Note:
+        Target squares are taken from `offset_targets` table (Common.py), see get_moves_to_targets().
+        """
+        targets: dict[tuple[int, int], int] = offset_targets[index]
+        return self.get_moves_to_targets(tuple(targets[offset] for offset in offsets if offset in targets),
+                                         self.fields[index])
+    def is_square_attacked(self, index: int, by_white: bool) -> bool:
         """
-        possible_moves = []
-        possible_captures = []
+        Checks whether the square at `index` is attacked by pieces of a given colour.
 
-        # iterate over each offset to calculate potential moves.
-        for offset in offsets:
-            row, col = divmod(index, 8)  # divmod returns the quotient and remainder of the division.
-            row_offset, col_offset = offset
+        Looks outward from the target square instead of generating moves of enemy pieces:
+        knight and king targets, pawn diagonals and rook/bishop rays up to the first blocker
+        (all taken from per-square tables in Common.py).
+        Returns as soon as any attacker is found and allocates no lists.
 
-            # update the row and column positions with the offset values.
-            row += row_offset
-            col += col_offset
+        Arguments:
+        - index (int): The board index (0-63) of the square.
+        - by_white (bool): Colour of attacking pieces.
+        """
+        if self.bitboards is not None:
+            return self.bitboards.is_square_attacked(index, by_white)
+        fields: list[int] = self.fields
+        color: int = 8 if by_white else 0
 
-            # check if the new position is within the board boundaries (0-7 for both row and column).
-            if 0 <= row < 8 and 0 <= col < 8:
-                temp_index = row * 8 + col
+        # pawns (attacking pawns stand where a pawn of the other colour on the square would capture)
+        pawn: int = 1 | color
+        for temp_index in pawn_captures[not by_white][index]:
+            if fields[temp_index] == pawn: return True
+        # knights
+        knight: int = 3 | color
+        for temp_index in knight_targets[index]:
+            if fields[temp_index] == knight: return True
+        # king
+        king: int = 6 | color
+        for temp_index in king_targets[index]:
+            if fields[temp_index] == king: return True
+        # sliders (first piece met on a ray decides)
+        queen: int = 5 | color
+        for rays, slider in ((rook_rays[index], 2 | color), (bishop_rays[index], 4 | color)):
+            for ray in rays:
+                for temp_index in ray:
+                    piece: int = fields[temp_index]
+                    if piece:
+                        if piece == slider or piece == queen: return True
+                        break
+        return False
+    def attackers(self, index: int, by_white: bool) -> list[int]:
+        """
+        Returns board indices of all pieces of a given colour that attack the square at `index`
+        (e.g. pieces giving check when called for the king's square).
 
-                # if the board position is empty, it's a possible move.
-                if self.fields[temp_index] == 0: possible_moves.append(temp_index)
-                else:
-                    # if there's a piece at the position, check if it's an opponent's piece (different color).
-                    # the bitwise operations check the fourth bit of the piece value to determine the color.
-                    if bool((self.fields[temp_index] >> 3) & 1) != self.white_moves: possible_captures.append(temp_index)
+        Same reverse lookup as is_square_attacked(), but collects every attacker instead of stopping at the first.
+        """
+        if self.bitboards is not None:
+            return list(squares_of(self.bitboards.attackers(index, by_white)))
+        fields: list[int] = self.fields
+        color: int = 8 if by_white else 0
+        found: list[int] = []
 
-        return possible_moves, possible_captures
-    def is_square_attacked(self, index: int, by_white: bool) -> bool:
+        # pawns, knights and king
+        for targets, leaper in ((pawn_captures[not by_white][index], 1 | color),
+                                (knight_targets[index], 3 | color),
+                                (king_targets[index], 6 | color)):
+            for temp_index in targets:
+                if fields[temp_index] == leaper: found.append(temp_index)
+        # sliders
+        queen: int = 5 | color
+        for rays, slider in ((rook_rays[index], 2 | color), (bishop_rays[index], 4 | color)):
+            for ray in rays:
+                for temp_index in ray:
+                    piece: int = fields[temp_index]
+                    if piece:
+                        if piece == slider or piece == queen: found.append(temp_index)
+                        break
+        return found
+    def evaluation(self) -> int:
+        """
+        Returns static evaluation in centipawns from the point of view of the side to move:
+        material + piece-square score tapered between middlegame and endgame by game phase.
+
+        Scores are kept up to date by update(), so this is O(1) (no scan of fields).
+        """
+        phase: int = self.phase if self.phase < MAX_PHASE else MAX_PHASE
+        score: int = (self.eval_mg * phase + self.eval_eg * (MAX_PHASE - phase)) // MAX_PHASE
+        return score if self.white_moves else -score
+    def least_valuable_attacker(self, index: int, by_white: bool, occupied: int) -> int:
         """
+        Returns board index of the least valuable piece of a given colour attacking the square at `index`
+        on a board reduced to `occupied` squares (or -1 if there is none).
+
+        Pieces outside `occupied` are treated as removed, so sliders behind them (x-rays) are found.
+
+        Arguments:
+        - index (int): The board index (0-63) of the square.
+        - by_white (bool): Colour of attacking pieces.
+        - occupied (int): 64-bit mask of squares still on the board.
         """
-        for i in range(64):
-            if (self.fields[i] > 8) == by_white:
-                _, captures = self.all_possible_moves_for_piece(i, False)
-                if index in captures:
-                    return True
+        fields: list[int] = self.fields
+        color: int = 8 if by_white else 0
+        # pawns, knights
+        for targets, leaper in ((pawn_captures[not by_white][index], 1 | color), (knight_targets[index], 3 | color)):
+            for temp_index in targets:
+                if fields[temp_index] == leaper and occupied >> temp_index & 1:
+                    return temp_index
+        # sliders: first occupied square of every ray, bishops before rooks before queens
+        found: list[int] = [-1, -1, -1] # bishop, rook, queen
+        for rays, slider in ((bishop_rays[index], 4 | color), (rook_rays[index], 2 | color)):
+            for ray in rays:
+                for temp_index in ray:
+                    if occupied >> temp_index & 1:
+                        piece: int = fields[temp_index]
+                        if piece == slider:
+                            found[slider == (2 | color)] = temp_index
+                        elif piece == 5 | color:
+                            found[2] = temp_index
+                        break
+        for temp_index in found:
+            if temp_index >= 0:
+                return temp_index
+        # king
+        for temp_index in king_targets[index]:
+            if fields[temp_index] == 6 | color and occupied >> temp_index & 1:
+                return temp_index
+        return -1
+    def see(self, move: int) -> int:
+        """
+        Static exchange evaluation: net material outcome (in centipawns, for the moving side) of a capture
+        followed by the best sequence of recaptures on the target square, without making moves.
+
+        Attackers join the exchange least valuable first, including sliders behind pieces that already
+        captured (x-rays). Pins are not taken into account.
+
+        Arguments:
+        - move (int): Packed move (see Classes.Chess.Move), for a non-capture it is the loss 
+            of the moved piece if it can be captured (0 or less).
+
+        Returns:
+        - int: Material won (positive) or lost (negative) by the exchange.
+        """
+        fields: list[int] = self.fields
+        old_field, new_field = move & 63, (move >> 6) & 63
+        piece: int = fields[old_field]
+        occupied: int = 0
+        for pieces in self.piece_squares:
+            for index in pieces:
+                occupied |= 1 << index
+        occupied &= ~(1 << old_field)
+
+        # first capture
+        if fields[new_field]:
+            gains: list[int] = [piece_values[fields[new_field] & 7]]
+        elif piece & 7 == 1 and new_field == self.en_passant:
+            gains: list[int] = [piece_values[1]]
+            occupied &= ~(1 << (new_field - 8 if piece & 8 else new_field + 8))
+        else:
+            gains: list[int] = [0]
+        on_square: int = piece_values[piece & 7]
+        if piece & 7 == 1 and (new_field > 55 or new_field < 8): # promotion (to a queen)
+            gains[0] += piece_values[5] - piece_values[1]
+            on_square = piece_values[5]
+
+        # recaptures, sides alternate
+        white: bool = not piece & 8
+        while True:
+            attacker: int = self.least_valuable_attacker(new_field, white, occupied)
+            if attacker < 0:
+                break
+            if fields[attacker] & 7 == 6 and \
+                self.least_valuable_attacker(new_field, not white, occupied & ~(1 << attacker)) >= 0:
+                break # king can not capture a defended piece
+            gains.append(on_square - gains[-1])
+            on_square = piece_values[fields[attacker] & 7]
+            occupied &= ~(1 << attacker)
+            white = not white
+
+        # every side may stop capturing when it would lose more
+        while len(gains) > 1:
+            last: int = gains.pop()
+            gains[-1] = -max(-gains[-1], last)
+        return gains[0]
+    def any_square_attacked(self, indices: tuple[int, ...], by_white: bool) -> bool:
+        """Whether any of given squares is attacked by pieces of a given colour."""
+        for index in indices:
+            if self.is_square_attacked(index, by_white):
+                return True
         return False
+    def king_index(self, white: bool) -> int:
+        """Returns board index of the king of a given colour."""
+        return self.king_squares[white]
+    def checkers(self) -> list[int]:
+        """Returns board indices of pieces giving check to the king of the side to move."""
+        return self.attackers(self.king_index(self.white_moves), not self.white_moves)
     def is_king_in_check(self, by_white: bool) -> bool:
+        """Whether king of a given colour (white if `by_white`) is attacked."""
+        return self.is_square_attacked(self.king_index(by_white), not by_white)
+    def all_possible_moves(self) -> list[tuple[int, int]]:
+        """
+        Returns list of all legal moves (as (old_field, new_field) tuples) for the side to move.
+
+        Moves come from legal_moves_iter(), so no layout copies are made.
         """
+        return list(self.legal_moves_iter())
+    def legal_move_masks(self) -> tuple[int, list[int], int, dict[int, int]]:
         """
-        king_index = self.fields.index(14 if by_white else 6)
-        return self.is_square_attacked(king_index, not by_white)
-    def all_possible_moves(self) -> list[str]:
+        Computes (once per position) everything legal move generation needs to know about the king of the side to move.
+
+        Returns:
+        - tuple[int, list[int], int, dict[int, int]]:
+            - board index of the king
+            - board indices of pieces giving check
+            - check mask: 64-bit mask of squares other pieces have to move to
+              (all squares when not in check, checker and squares between it and the king in single check, 
+              no squares in double check)
+            - pins: pinned pieces (board index) mapped to masks of squares they may move to 
+              (the pin ray from the king up to and including the pinning piece)
+        """
+        white: bool = self.white_moves
+        color: int = 8 if white else 0
+        enemy: int = color ^ 8
+        fields: list[int] = self.fields
+        king: int = self.king_index(white)
+        checkers: list[int] = self.attackers(king, not white)
+
+        # check mask
+        if not checkers:
+            check_mask: int = 0xFFFFFFFFFFFFFFFF
+        elif len(checkers) == 1:
+            checker: int = checkers[0]
+            check_mask: int = 1 << checker
+            # squares between the king and a sliding checker block the check
+            if fields[checker] & 7 in (2, 4, 5):
+                for ray in queen_rays[king]:
+                    if checker in ray:
+                        for temp_index in ray[:ray.index(checker)]:
+                            check_mask |= 1 << temp_index
+                        break
+        else:
+            check_mask: int = 0
+
+        # pins (own piece followed by enemy slider moving along the ray)
+        pins: dict[int, int] = {}
+        enemy_queen: int = 5 | enemy
+        for rays, slider in ((rook_rays[king], 2 | enemy), (bishop_rays[king], 4 | enemy)):
+            for ray in rays:
+                ray_mask: int = 0
+                pinned: int | None = None
+                for temp_index in ray:
+                    ray_mask |= 1 << temp_index
+                    piece: int = fields[temp_index]
+                    if piece:
+                        if pinned is None:
+                            if (piece & 8) != color:
+                                break # enemy piece first - checker or nothing
+                            pinned = temp_index
+                        else:
+                            if piece == slider or piece == enemy_queen:
+                                pins[pinned] = ray_mask
+                            break
+
+        return king, checkers, check_mask, pins
+    def legal_moves_for_piece(self, index: int) -> tuple[list[int], list[int]]:
+        """
+        Same as all_possible_moves_for_piece(), but returns only legal moves 
+        (ones that do not leave own king in check) of a piece of the side to move.
+
+        Returns:
+        - tuple[list[int], list[int]]: Legal non-capturing and capturing moves (empty for pieces of the other side).
+        """
+        piece: int = self.fields[index]
+        if piece == 0 or (piece > 8) != self.white_moves:
+            return [], []
+        if self.bitboards is not None:
+            for square, targets in self.bitboards.legal_targets(self.white_moves, self.en_passant, self.castling):
+                if square == index:
+                    captures: int = targets & (self.bitboards.boards[0] | 
+                                               (1 << self.en_passant if self.en_passant is not None and
+                                                piece in (1, 9) else 0))
+                    return list(squares_of(targets ^ captures)), list(squares_of(captures))
+            return [], []
+        masks = self.legal_move_masks()
+        possible_moves, capturing_moves = [], []
+        for move in self._legal_targets(index, piece, *masks):
+            if self.fields[move] != 0 or (move == self.en_passant and piece in (1, 9)):
+                capturing_moves.append(move)
+            else:
+                possible_moves.append(move)
+        return possible_moves, capturing_moves
+    def legal_moves_iter(self):
+        """
+        Generator yielding legal moves (as (old_field, new_field) tuples) for the side to move one at a time.
+
+        Checkers, pinned pieces and check mask are computed once (legal_move_masks()) and pseudo-legal moves 
+        are filtered with them, so no move has to be played to test it. Only exceptions are king moves 
+        (target squares are tested for attacks with the king lifted off the board) 
+        and en passant captures, which are played and taken back as they can uncover a check along the rank.
+        Pawns reaching the last rank are yielded once (legality does not depend on the promotion piece).
+        With the "bitboard" backend moves come from `Bitboards.legal_targets()` (same masks computed on bitboards).
+        """
+        if self.bitboards is not None:
+            for square, targets in self.bitboards.legal_targets(self.white_moves, self.en_passant, self.castling):
+                while targets:
+                    low_bit: int = targets & -targets
+                    yield (square, low_bit.bit_length() - 1)
+                    targets ^= low_bit
+            return
+        king, checkers, check_mask, pins = self.legal_move_masks()
+        fields: list[int] = self.fields
+        for move in self._legal_targets(king, fields[king], king, checkers, check_mask, pins):
+            yield (king, move)
+        # in double check only the king can move
+        if not check_mask:
+            return
+        # copied, as en passant test makes and unmakes a move which changes the set
+        for i in tuple(self.piece_squares[self.white_moves]):
+            if i != king:
+                for move in self._legal_targets(i, fields[i], king, checkers, check_mask, pins):
+                    yield (i, move)
+    def _legal_targets(self, index: int, piece: int, king: int, checkers: list[int], 
+                       check_mask: int, pins: dict[int, int]):
+        """
+        Generator yielding legal target squares of a piece of the side to move (masks from legal_move_masks()),
+        used by the "list" backend.
+        """
+        white: bool = self.white_moves
+        fields: list[int] = self.fields
+
+        # King: target must not be attacked once the king is lifted off (it can not hide behind itself)
+        if index == king:
+            possible_moves, capturing_moves = self.all_possible_moves_for_piece(index, not checkers)
+            fields[king] = 0
+            legal: list[int] = [move for moves in (possible_moves, capturing_moves) for move in moves
+                                if not self.is_square_attacked(move, not white)]
+            fields[king] = piece
+            yield from legal
+            return
+
+        allowed: int = check_mask & pins.get(index, 0xFFFFFFFFFFFFFFFF)
+        en_passant: int | None = self.en_passant if piece in (1, 9) else None
+        possible_moves, capturing_moves = self.all_possible_moves_for_piece(index, False)
+        for move in (move for moves in (possible_moves, capturing_moves) for move in moves):
+            if move == en_passant:
+                # en passant can uncover a check (e.g. both pawns between king and rook on a rank), so it is played
+                undo = self.make_move(index, move)
+                in_check: bool = self.is_king_in_check(white)
+                self.unmake_move(undo)
+                if not in_check:
+                    yield move
+            elif (allowed >> move) & 1:
+                yield move
+    def generate_moves(self, move_list: MoveList | None=None) -> MoveList:
         """
+        Fills a move list with packed (16-bit) legal moves of the side to move (see Classes.Chess.Move),
+        with promotions listed once for every piece.
+
+        Arguments:
+        - move_list (MoveList | None): List to be cleared and refilled (a new one is created if None),
+            passing the same list again avoids allocating a new buffer at every node.
+
+        Returns:
+        - MoveList: The filled move list.
         """
-        moves = []
-        for i in range(64):
-            if self.fields[i] != 0 and (self.fields[i] > 8) == self.white_moves:
-                possible_moves, capturing_moves = self.all_possible_moves_for_piece(i)
-                for move in possible_moves + capturing_moves:
-                    backup_layout = Layout(self.layout2fen())
-                    backup_layout.update(i, move)
-                    if not backup_layout.is_king_in_check(not self.white_moves):
-                        moves.append((i, move))
-        return moves
+        if move_list is None:
+            move_list = MoveList()
+        move_list.clear()
+        fields: list[int] = self.fields
+        en_passant: int | None = self.en_passant
+        if self.bitboards is not None:
+            move_list.extend(self.bitboards.legal_moves(self.white_moves, self.en_passant, self.castling))
+            return move_list
+        append = move_list.append
+        # move codes are set inline (see encode_move() and special_move_code()), this runs for every generated move
+        for old_field, new_field in self.legal_moves_iter():
+            piece: int = fields[old_field]
+            move: int = old_field | (new_field << 6)
+            if piece == 9 or piece == 1:
+                if new_field > 55 or new_field < 8:
+                    for code in (7, 6, 5, 4): # queen, rook, bishop, knight
+                        append(move | (code << 12))
+                    continue
+                if new_field == en_passant:
+                    move |= EN_PASSANT << 12
+                elif old_field - new_field in (16, -16):
+                    move |= DOUBLE_PUSH << 12
+            elif (piece == 14 or piece == 6) and old_field - new_field in (2, -2):
+                move |= CASTLING << 12
+            append(move)
+        return move_list
+    def has_legal_move(self) -> bool:
+        """Whether side to move has at least one legal move (stops at the first one found)."""
+        for _ in self.legal_moves_iter():
+            return True
+        return False
     def is_checkmate(self) -> bool:
-        """"""
-        return self.is_king_in_check(not self.white_moves) and not self.all_possible_moves()
+        """Whether side to move is checkmated."""
+        return self.is_king_in_check(self.white_moves) and not self.has_legal_move()
     def is_stalemate(self) -> bool:
-        """"""
-        return not self.is_king_in_check(not self.white_moves) and not self.all_possible_moves()
+        """Whether side to move is stalemated."""
+        return not self.is_king_in_check(self.white_moves) and not self.has_legal_move()
+    # draws
+    def repetitions(self) -> int:
+        """
+        Returns how many times the current position occurred before (same pieces, side to move, castling rights
+        and en passant square). key_history only holds positions since the last capture or pawn move,
+        so at most clock / 2 keys are compared.
+        """
+        history: list[int] = self.key_history
+        key: int = self.zobrist_key
+        count: int = 0
+        # same side to move every second ply
+        for index in range(len(history) - 2, -1, -2):
+            if history[index] == key:
+                count += 1
+        return count
+    def is_insufficient_material(self) -> bool:
+        """
+        Whether neither side can checkmate: king against king with at most one knight or bishop,
+        or kings with any number of bishops all standing on squares of the same colour.
+        Decided from material_counts, only in the last case squares of bishops are checked.
+        """
+        counts: list[int] = self.material_counts
+        # pawns, rooks or queens
+        if counts[1] or counts[2] or counts[5] or counts[9] or counts[10] or counts[13]:
+            return False
+        knights: int = counts[3] + counts[11]
+        bishops: int = counts[4] + counts[12]
+        if knights + bishops <= 1:
+            return True
+        if knights:
+            return False
+        # only bishops, all on squares of the same colour
+        fields: list[int] = self.fields
+        square_colours: set[int] = {(index // 8 + index) % 2 for pieces in self.piece_squares 
+                                    for index in pieces if fields[index] & 7 == 4}
+        return len(square_colours) == 1
+    def draw_reason(self, claim: bool=True) -> str | None:
+        """
+        Returns why the game is drawn in this position or None if it is not.
+
+        Arguments:
+        - claim (bool): Whether draws a player has to claim count as well (threefold repetition, 50-move rule),
+            otherwise only automatic ones do (stalemate, fivefold repetition, 75-move rule, insufficient material).
+
+        Returns:
+        - str | None: "stalemate", "insufficient material", "fivefold repetition", "75-move rule",
+            "threefold repetition", "50-move rule" or None.
+        """
+        if not self.has_legal_move():
+            return None if self.is_king_in_check(self.white_moves) else "stalemate"
+        if self.is_insufficient_material():
+            return "insufficient material"
+        repetitions: int = self.repetitions()
+        if repetitions >= 4:
+            return "fivefold repetition"
+        if self.clock >= 150:
+            return "75-move rule"
+        if claim:
+            if repetitions >= 2:
+                return "threefold repetition"
+            if self.clock >= 100:
+                return "50-move rule"
+        return None
@@ -0,0 +1,392 @@
+"""
+This module plays matches between two players without the UI (self-play) to measure changes of the engine.
+
+A player is any callable taking a `Layout` (the position to move in, which it must leave unchanged) and returning
+a packed move (see Classes.Chess.Move) or an object with `move` and `nodes` attributes (e.g. `SearchResult`).
+Games start from a set of opening positions varied by a few random plies (seeded, so a match can be repeated),
+each one is played twice with colours swapped, and are run
+in parallel by worker processes of a `concurrent.futures.ProcessPoolExecutor`, so players have to be picklable
+(module level functions or objects like `EnginePlayer`). Finished games are written as PGN.
+
+Usage (from the root catalogue of the repository):
+    python -m Classes.Chess.Match --games 100 --a time=0.05 --b depth=2 --pgn match.pgn
+    python -m Classes.Chess.Match --games 1000 --a depth=3 --b random --openings openings.epd --workers 32
+    python -m Classes.Chess.Match --games 200 --a depth=3 --b depth=2 --random-plies 4 --seed 7
+
+Classes:
+    - EnginePlayer: Player searching with `Engine` (picklable, the engine is created in the process using it).
+    - MatchResult: Score of a match with speed statistics and Elo difference.
+
+Functions:
+    - random_player(layout: Layout) -> int: Player choosing a random legal move.
+    - play_game(white, black, fen: str=START_FEN, max_plies: int=400) -> tuple[PGNGame, list[int], list[float]]:
+        Plays one game.
+    - run_match(player_a, player_b, games: int, ...) -> MatchResult: Plays a match on worker processes.
+    - elo_difference(wins: int, draws: int, losses: int) -> tuple[float, float]: Elo difference and 95% error
+        (a bound with infinite error at 0% or 100%).
+    - main(argv: list[str] | None=None) -> int: Command line entry point.
+
+Author: WK-K
+"""
+
+# standard modules
+import argparse
+import math
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, TextIO
+# project modules
+from Classes.Chess.Common import fen2position
+from Classes.Chess.Layout import Layout
+from Classes.Chess.Engine import Engine, MAX_DEPTH
+from Classes.Chess.Move import MoveList, decode_move
+from Classes.Chess.PGN import PGNGame, START_FEN, write_games
+
+# CONSTANTS:
+OPENINGS: list[str] = [
+    START_FEN,
+    "rnbqkbnr/pppp1ppp/8/4p3/4P3/8/PPPP1PPP/RNBQKBNR w KQkq - 0 2",   # 1. e4 e5
+    "rnbqkbnr/pp1ppppp/8/2p5/4P3/8/PPPP1PPP/RNBQKBNR w KQkq - 0 2",   # 1. e4 c5
+    "rnbqkbnr/pppp1ppp/4p3/8/4P3/8/PPPP1PPP/RNBQKBNR w KQkq - 0 2",   # 1. e4 e6
+    "rnbqkbnr/ppp1pppp/8/3p4/3P4/8/PPP1PPPP/RNBQKBNR w KQkq - 0 2",   # 1. d4 d5
+    "rnbqkb1r/pppppppp/5n2/8/3P4/8/PPP1PPPP/RNBQKBNR w KQkq - 1 2",   # 1. d4 Nf6
+    "rnbqkbnr/pppp1ppp/8/4p3/2P5/8/PP1PPPPP/RNBQKBNR w KQkq - 0 2",   # 1. c4 e5
+    "rnbqkbnr/ppp1pppp/8/3p4/8/5N2/PPPPPPPP/RNBQKB1R w KQkq - 0 2",   # 1. Nf3 d5
+]
+"""Default opening positions (every one is played with both colours)."""
+
+Player = Callable[[Layout], object]
+"""Callable returning a packed move (or an object with `move` and `nodes` attributes) for a layout."""
+
+# PLAYERS:
+def random_player(layout: Layout) -> int:
+    """Player choosing a random legal move (a baseline, it does not search)."""
+    return random.choice(list(layout.generate_moves(MoveList())))
+
+class EnginePlayer:
+    """
+    Player searching with `Engine` within a fixed budget per move.
+    Only the budget is pickled, the engine (and its move ordering tables) is created in the process using it.
+
+    ATTRIBUTES:
+        - max_depth (int), max_nodes (int | None), time_limit (float | None): Budget of every move.
+    """
+    def __init__(self, max_depth: int=MAX_DEPTH, max_nodes: int | None=None, time_limit: float | None=0.1) -> None:
+        """Initializes the player with a search budget per move."""
+        self.max_depth: int = max_depth
+        self.max_nodes: int | None = max_nodes
+        self.time_limit: float | None = time_limit
+        self._engine: Engine | None = None
+    def __call__(self, layout: Layout) -> object:
+        """Returns SearchResult of the position (best move and number of nodes)."""
+        if self._engine is None:
+            self._engine = Engine(self.max_depth, self.max_nodes, self.time_limit)
+        return self._engine.search(layout)
+    def __getstate__(self) -> tuple:
+        """Pickles the budget only."""
+        return self.max_depth, self.max_nodes, self.time_limit
+    def __setstate__(self, state: tuple) -> None:
+        """Restores the budget, engine is created on the first move."""
+        self.max_depth, self.max_nodes, self.time_limit = state
+        self._engine = None
+    def __repr__(self) -> str:
+        """Returns description of the budget (used as player name in PGN)."""
+        budget: list[str] = []
+        if self.max_depth != MAX_DEPTH:
+            budget.append(f"depth={self.max_depth}")
+        if self.max_nodes is not None:
+            budget.append(f"nodes={self.max_nodes}")
+        if self.time_limit is not None:
+            budget.append(f"time={self.time_limit:g}")
+        return f"Engine({', '.join(budget)})"
+
+# FUNCTIONS:
+def _player_name(player: Player) -> str:
+    """Returns name of a player for PGN headers."""
+    return getattr(player, "__name__", None) or repr(player)
+
+def play_game(white: Player, black: Player, fen: str=START_FEN,
+              max_plies: int=400) -> tuple[PGNGame, list[int], list[float]]:
+    """
+    Plays one game until checkmate, a draw (stalemate, insufficient material, threefold repetition, 50-move rule),
+    an illegal move (which loses) or `max_plies` plies (adjudicated as a draw).
+
+    Arguments:
+    - white (Player), black (Player): Players of both colours.
+    - fen (str): Starting position.
+    - max_plies (int): Number of plies after which the game is stopped as a draw.
+
+    Returns:
+    - tuple[PGNGame, list[int], list[float]]: The game (with "Termination" header),
+        nodes searched and seconds spent by both players ([black, white]).
+    """
+    layout = Layout(fen)
+    moves: list[int] = []
+    nodes: list[int] = [0, 0]
+    seconds: list[float] = [0.0, 0.0]
+    move_list: MoveList = MoveList()
+    while True:
+        side: int = 1 if layout.white_moves else 0
+        legal_moves: MoveList = layout.generate_moves(move_list)
+        if not legal_moves:
+            if layout.is_king_in_check(layout.white_moves):
+                result, termination = ("0-1" if side else "1-0"), "checkmate"
+            else:
+                result, termination = "1/2-1/2", "stalemate"
+            break
+        draw: str | None = layout.draw_reason(claim=True)
+        if draw is not None:
+            result, termination = "1/2-1/2", draw
+            break
+        if len(moves) >= max_plies:
+            result, termination = "1/2-1/2", f"adjudicated after {max_plies} plies"
+            break
+
+        start: float = time.perf_counter()
+        answer = (white if side else black)(layout)
+        seconds[side] += time.perf_counter() - start
+        move: int | None = getattr(answer, "move", answer)
+        nodes[side] += getattr(answer, "nodes", 0)
+        if move is None or move not in legal_moves:
+            result, termination = ("0-1" if side else "1-0"), f"illegal move: {move}"
+            break
+        moves.append(move)
+        layout.update(*decode_move(move))
+
+    headers: dict[str, str] = {"White": _player_name(white), "Black": _player_name(black), "Termination": termination}
+    if fen != START_FEN:
+        headers.update({"SetUp": "1", "FEN": fen})
+    return PGNGame(headers, moves, result), nodes, seconds
+
+def _vary_opening(fen: str, plies: int, rng: random.Random) -> str:
+    """
+    Returns FEN of the position after `plies` random legal moves from `fen` (fewer if the game would end),
+    so deterministic players do not replay the same game whenever an opening is repeated.
+    """
+    layout = Layout(fen)
+    for _ in range(plies):
+        moves: list[int] = [move for move in layout.generate_moves(MoveList())
+                            if _keeps_game_going(layout, move)]
+        if not moves:
+            break
+        layout.update(*decode_move(rng.choice(moves)))
+    return layout.layout2fen()
+
+def _keeps_game_going(layout: Layout, move: int) -> bool:
+    """Whether the opponent has a legal move after `move` (random plies must not end the game)."""
+    undo: tuple = layout.make_move(*decode_move(move))
+    has_move: bool = layout.has_legal_move()
+    layout.unmake_move(undo)
+    return has_move
+
+def _play_pairing(player_a: Player, player_b: Player, fen: str, a_white: bool,
+                  max_plies: int) -> tuple[PGNGame, list[int], list[float]]:
+    """Worker task: plays one game, nodes and seconds are returned for [player_a, player_b]."""
+    if a_white:
+        game, nodes, seconds = play_game(player_a, player_b, fen, max_plies)
+        return game, [nodes[1], nodes[0]], [seconds[1], seconds[0]]
+    return play_game(player_b, player_a, fen, max_plies)
+
+def elo_difference(wins: int, draws: int, losses: int) -> tuple[float, float]:
+    """
+    Returns Elo difference implied by a score and its 95% error margin
+    (from the standard deviation of game results). A score of 0% or 100% does not determine the difference,
+    then the Elo of a score half a game less extreme is returned as a bound with infinite margin.
+    """
+    games: int = wins + draws + losses
+    if games == 0:
+        return 0.0, math.inf
+    def elo(score: float) -> float:
+        if score <= 0:
+            return -math.inf
+        if score >= 1:
+            return math.inf
+        return 400 * math.log10(score / (1 - score))
+    score: float = (wins + draws / 2) / games
+    if score in (0, 1):
+        return elo(abs(score - 0.5 / games)), math.inf
+    variance: float = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / games
+    margin: float = 1.96 * math.sqrt(variance / games)
+    return elo(score), (elo(score + margin) - elo(score - margin)) / 2
+
+# CLASSES:
+class MatchResult:
+    """
+    Score of a match (from the point of view of player A) with speed statistics.
+
+    ATTRIBUTES:
+        - wins (int), draws (int), losses (int): Results of player A.
+        - nodes (list[int]), seconds (list[float]): Nodes searched and time spent thinking by [player A, player B].
+        - elapsed (float): Wall time of the match in seconds.
+
+    METHODS:
+        - games -> int, games_per_minute -> float, nps -> list[float]: Statistics.
+        - elo() -> tuple[float, float]: Elo difference of player A and its 95% error margin.
+    """
+    __slots__ = ("wins", "draws", "losses", "nodes", "seconds", "elapsed")
+    def __init__(self) -> None:
+        """Initializes an empty score."""
+        self.wins: int = 0
+        self.draws: int = 0
+        self.losses: int = 0
+        self.nodes: list[int] = [0, 0]
+        self.seconds: list[float] = [0.0, 0.0]
+        self.elapsed: float = 0.0
+    @property
+    def games(self) -> int:
+        """Number of played games."""
+        return self.wins + self.draws + self.losses
+    @property
+    def games_per_minute(self) -> float:
+        """Number of games finished per minute of wall time."""
+        return self.games * 60 / max(self.elapsed, 1e-9)
+    @property
+    def nps(self) -> list[float]:
+        """Nodes per second of thinking time of [player A, player B]."""
+        return [nodes / max(seconds, 1e-9) for nodes, seconds in zip(self.nodes, self.seconds)]
+    def elo(self) -> tuple[float, float]:
+        """Returns Elo difference of player A (positive if A is stronger) and its 95% error margin."""
+        return elo_difference(self.wins, self.draws, self.losses)
+    def __str__(self) -> str:
+        """Returns multiline report."""
+        elo, margin = self.elo()
+        nps_a, nps_b = self.nps
+        if math.isinf(margin) and self.games:
+            elo_text: str = f"> {elo:+.1f} (lower bound, every game won)" if elo > 0 else \
+                            f"< {elo:+.1f} (upper bound, every game lost)"
+        else:
+            elo_text: str = f"{elo:+.1f} +/- {margin:.1f}"
+        return f"Games: {self.games} (+{self.wins} ={self.draws} -{self.losses})\n" + \
+               f"Score: {(self.wins + self.draws / 2) / max(self.games, 1):.1%}\n" + \
+               f"Elo difference: {elo_text}\n" + \
+               f"Games per minute: {self.games_per_minute:.1f}\n" + \
+               f"NPS: A {nps_a:.0f}, B {nps_b:.0f}\n" + \
+               f"Time: {self.elapsed:.1f} s"
+
+def run_match(player_a: Player, player_b: Player, games: int, openings: list[str] | None=None,
+              workers: int | None=None, max_plies: int=400, pgn: TextIO | None=None,
+              random_plies: int=2, seed: int=0) -> MatchResult:
+    """
+    Plays a match between two players on worker processes.
+
+    Games 2k and 2k + 1 start from opening k (openings are repeated if there are fewer than games / 2 of them)
+    followed by `random_plies` random moves chosen for that pair, player A has white pieces in even games
+    and black pieces in odd ones. Random plies make repeated openings (and deterministic players) give
+    different games, so they can be counted as independent in the Elo error margin.
+
+    Arguments:
+    - player_a (Player), player_b (Player): Picklable players (see module description).
+    - games (int): Number of games.
+    - openings (list[str] | None): FEN of starting positions (OPENINGS if None).
+    - workers (int | None): Number of worker processes (number of CPUs if None, 1 plays in this process).
+    - max_plies (int): Number of plies after which a game is stopped as a draw.
+    - pgn (TextIO | None): Stream finished games are written to as PGN (in order of finishing).
+    - random_plies (int): Number of random plies played from every opening (0 plays openings as given).
+    - seed (int): Seed of the random plies (the same seed gives the same starting positions).
+
+    Returns:
+    - MatchResult: Score of player A with speed statistics.
+    """
+    openings = openings or OPENINGS
+    rng = random.Random(seed)
+    starts: list[str] = [_vary_opening(openings[pair % len(openings)], random_plies, rng)
+                         for pair in range((games + 1) // 2)]
+    pairings: list[tuple[str, bool]] = [(starts[index // 2], index % 2 == 0) for index in range(games)]
+    match = MatchResult()
+    start: float = time.perf_counter()
+
+    def record(index: int, game: PGNGame, nodes: list[int], seconds: list[float]) -> None:
+        a_white: bool = pairings[index][1]
+        if game.result == "1/2-1/2":
+            match.draws += 1
+        elif (game.result == "1-0") == a_white:
+            match.wins += 1
+        else:
+            match.losses += 1
+        for player in (0, 1):
+            match.nodes[player] += nodes[player]
+            match.seconds[player] += seconds[player]
+        if pgn is not None:
+            game.headers.update({"Event": "Self-play match", "Site": "?", "Date": time.strftime("%Y.%m.%d"),
+                                 "Round": str(index + 1)})
+            write_games(pgn, [game])
+
+    if workers == 1:
+        for index, (fen, a_white) in enumerate(pairings):
+            record(index, *_play_pairing(player_a, player_b, fen, a_white, max_plies))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(_play_pairing, player_a, player_b, fen, a_white, max_plies): index
+                       for index, (fen, a_white) in enumerate(pairings)}
+            for future in as_completed(futures):
+                record(futures[future], *future.result())
+    match.elapsed = time.perf_counter() - start
+    return match
+
+def _parse_player(spec: str) -> Player:
+    """Returns player described on the command line: `random` or engine budget like `depth=3,time=0.1`."""
+    if spec == "random":
+        return random_player
+    budget: dict[str, str] = dict(item.split("=", 1) for item in spec.split(",") if item)
+    unknown: set[str] = set(budget) - {"depth", "nodes", "time"}
+    if unknown:
+        raise ValueError(f"Unknown engine budget: {', '.join(sorted(unknown))} (use depth, nodes, time)")
+    if not budget:
+        raise ValueError(f"Engine needs a budget (depth, nodes or time): {spec!r}")
+    return EnginePlayer(int(budget.get("depth", MAX_DEPTH)),
+                        int(budget["nodes"]) if "nodes" in budget else None,
+                        float(budget["time"]) if "time" in budget else None)
+
+def _read_openings(path: str) -> list[str]:
+    """Returns FEN of correct lines of an EPD / FEN file (with clock and move number), reports malformed ones."""
+    openings: list[str] = []
+    with open(path, encoding="utf-8") as file:
+        for number, line in enumerate(file, 1):
+            line = line.strip()
+            if not line or line[0] == '#':
+                continue
+            try:
+                _, _, _, _, clock, moves_made = fen2position(line)
+            except ValueError as error:
+                print(f"Line {number}: {error}", file=sys.stderr)
+                continue
+            openings.append(" ".join(line.split()[:4]) + f" {clock} {moves_made}")
+    return openings
+
+def main(argv: list[str] | None=None) -> int:
+    """Command line entry point: plays a match and prints its score, speed and Elo difference."""
+    parser = argparse.ArgumentParser(prog="python -m Classes.Chess.Match",
+                                     description="Play a self-play match between two players on all CPU cores.")
+    parser.add_argument("--games", type=int, default=100, help="number of games (default: 100)")
+    parser.add_argument("--a", default="time=0.05",
+                        help="player A: 'random' or engine budget, e.g. 'depth=3,nodes=20000,time=0.1' (default: time=0.05)")
+    parser.add_argument("--b", default="depth=1", help="player B, same format as --a (default: depth=1)")
+    parser.add_argument("--openings", default=None, help="EPD / FEN file of starting positions (default: built-in)")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes (default: number of CPUs)")
+    parser.add_argument("--max-plies", type=int, default=400, help="plies after which a game is a draw (default: 400)")
+    parser.add_argument("--pgn", default=None, help="file the games are written to")
+    parser.add_argument("--random-plies", type=int, default=2,
+                        help="random plies played from every opening, both colours get the same ones (default: 2)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the random plies (default: 0)")
+    args = parser.parse_args(argv)
+
+    try:
+        player_a, player_b = _parse_player(args.a), _parse_player(args.b)
+    except ValueError as error:
+        parser.error(str(error))
+    openings: list[str] | None = _read_openings(args.openings) if args.openings else None
+    print(f"A: {_player_name(player_a)}\nB: {_player_name(player_b)}")
+    if args.pgn:
+        with open(args.pgn, "w", encoding="utf-8") as pgn:
+            match: MatchResult = run_match(player_a, player_b, args.games, openings, args.workers, args.max_plies, pgn,
+                                           args.random_plies, args.seed)
+    else:
+        match: MatchResult = run_match(player_a, player_b, args.games, openings, args.workers, args.max_plies,
+                                       random_plies=args.random_plies, seed=args.seed)
+    print(match)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,229 @@
+"""
+This module defines the `MateSolver` class, which finds forced mates ("mate in N" puzzles) in `Layout` positions.
+
+Search alternates attacker nodes (any move that mates is enough) and defender nodes (every reply has to lose).
+Mate in 1, 2, ... N moves is tried in turn, so the shortest mate is found. Results of attacker nodes are kept in
+a `TranspositionTable` of a fixed memory cap, so transpositions (and positions shared by puzzles solved with
+the same solver) are not searched again, and memory does not grow with depth or number of positions.
+
+Usage (from the root catalogue of the repository):
+    python -m Classes.Chess.Mate --fen "<FEN>" --moves 3
+    python -m Classes.Chess.Mate --file puzzles.txt --moves 2 --hash-mb 64   # one FEN per line
+
+Classes:
+    - MateResult: Mating line (or None) and number of visited nodes.
+    - MateSolver: Forced mate search with a transposition table.
+
+Functions:
+    - main(argv: list[str] | None=None) -> int: Command line entry point.
+
+Author: WK-K
+"""
+
+# standard modules
+import argparse
+import sys
+import time
+# project modules
+from Classes.Chess.Layout import Layout
+from Classes.Chess.Move import MoveList, code2promotion_piece, move2uci
+from Classes.Chess.Transposition import TranspositionTable
+
+# CONSTANTS:
+MATE_FOUND: int = 1
+"""Table flag: attacker mates in at most `depth` moves (with the stored move)."""
+NO_MATE: int = 2
+"""Table flag: attacker does not mate in `depth` moves."""
+BLACK_ATTACKER_KEY: int = 0x9E3779B97F4A7C15
+"""Mixed into keys when black is the attacker, as table results depend on which side is mating."""
+
+class _NodeLimitReached(Exception):
+    """Raised inside the search tree when the node budget is spent."""
+
+class MateResult:
+    """
+    Result of a mate search.
+
+    ATTRIBUTES:
+        - mate_in (int | None): Number of attacker moves of the shortest forced mate (None if there is none).
+        - line (list[int]): Mating line as packed moves (attacker moves, defender's longest resistance).
+        - nodes (int): Number of visited nodes.
+        - time (float): Search time in seconds.
+        - complete (bool): False when the node budget was spent before the search ended.
+    """
+    __slots__ = ("mate_in", "line", "nodes", "time", "complete")
+    def __init__(self, mate_in: int | None, line: list[int], nodes: int, time: float, complete: bool=True) -> None:
+        """Initializes the result."""
+        self.mate_in: int | None = mate_in
+        self.line: list[int] = line
+        self.nodes: int = nodes
+        self.time: float = time
+        self.complete: bool = complete
+    def uci_line(self) -> list[str]:
+        """Returns mating line in UCI notation."""
+        return [move2uci(move) for move in self.line]
+    def __repr__(self) -> str:
+        """Returns one line summary of the result."""
+        found: str = f"mate in {self.mate_in}: {' '.join(self.uci_line())}" if self.mate_in is not None else \
+            "no mate" if self.complete else "node limit reached"
+        return f"{found} (nodes {self.nodes}, time {self.time:.2f} s)"
+
+class MateSolver:
+    """
+    Forced mate solver.
+
+    ATTRIBUTES:
+        - table (TranspositionTable): Results of attacker nodes, shared by all solve() calls.
+        - nodes (int): Nodes visited by the last solve().
+
+    METHODS:
+        - solve(layout: Layout, moves: int, max_nodes: int | None=None) -> MateResult:
+            Finds the shortest forced mate of the side to move in at most `moves` moves.
+    """
+    def __init__(self, hash_mb: float=16) -> None:
+        """
+        Arguments:
+        - hash_mb (float): Memory cap of the transposition table in MB.
+        """
+        self.table: TranspositionTable = TranspositionTable(hash_mb)
+        self.nodes: int = 0
+        self._node_limit: int | None = None
+        self._key_mix: int = 0
+        self._move_lists: list[MoveList] = []
+    def solve(self, layout: Layout, moves: int, max_nodes: int | None=None) -> MateResult:
+        """
+        Finds the shortest forced mate of the side to move in at most `moves` moves.
+
+        Arguments:
+        - layout (Layout): Position of the puzzle (it is not changed).
+        - moves (int): Maximal number of attacker moves.
+        - max_nodes (int | None): Node budget (None for no limit).
+
+        Returns:
+        - MateResult: Mating line with the defender's longest resistance, or no mate.
+        """
+        start: float = time.perf_counter()
+        layout = layout.copy()
+        self.nodes = 0
+        self._node_limit = max_nodes
+        self._key_mix = 0 if layout.white_moves else BLACK_ATTACKER_KEY
+        # one move list per ply, so memory of the search is bounded by the depth
+        while len(self._move_lists) < 2 * moves + 1:
+            self._move_lists.append(MoveList())
+        self.table.new_generation()
+
+        try:
+            for depth in range(1, moves + 1):
+                if self._attacker_mates(layout, depth, 0):
+                    line: list[int] = self._mating_line(layout, depth)
+                    return MateResult(depth, line, self.nodes, time.perf_counter() - start)
+        except _NodeLimitReached:
+            return MateResult(None, [], self.nodes, time.perf_counter() - start, False)
+        return MateResult(None, [], self.nodes, time.perf_counter() - start)
+
+    # Search
+    def _attacker_mates(self, layout: Layout, depth: int, ply: int) -> int:
+        """Returns a move that mates in at most `depth` moves or 0 if there is none."""
+        self.nodes += 1
+        if self._node_limit is not None and self.nodes > self._node_limit:
+            raise _NodeLimitReached()
+        table: TranspositionTable = self.table
+        key: int = layout.zobrist_key ^ self._key_mix
+        slot: int = table.probe(key)
+        if slot >= 0:
+            if table.flags[slot] == MATE_FOUND and table.depths[slot] <= depth:
+                return table.moves[slot]
+            if table.flags[slot] == NO_MATE and table.depths[slot] >= depth:
+                return 0
+
+        for move in layout.generate_moves(self._move_lists[ply]):
+            undo = layout.make_move(move & 63, (move >> 6) & 63, code2promotion_piece[move >> 12])
+            # with the last move only checks can mate
+            if (depth > 1 or layout.is_king_in_check(layout.white_moves)) and \
+                self._defender_loses(layout, depth, ply + 1):
+                layout.unmake_move(undo)
+                table.store(key, depth, MATE_FOUND, move)
+                return move
+            layout.unmake_move(undo)
+        table.store(key, depth, NO_MATE)
+        return 0
+    def _defender_loses(self, layout: Layout, depth: int, ply: int) -> bool:
+        """Whether every defender move leads to a mate in at most `depth` - 1 further attacker moves."""
+        self.nodes += 1
+        replies: MoveList = layout.generate_moves(self._move_lists[ply])
+        if not replies.count:
+            return layout.is_king_in_check(layout.white_moves) # mate (not stalemate)
+        if depth == 1:
+            return False
+        for move in replies:
+            undo = layout.make_move(move & 63, (move >> 6) & 63, code2promotion_piece[move >> 12])
+            mates: int = self._attacker_mates(layout, depth - 1, ply + 1)
+            layout.unmake_move(undo)
+            if not mates:
+                return False
+        return True
+    def _mating_line(self, layout: Layout, depth: int) -> list[int]:
+        """
+        Returns the mating line from a position with a proven mate in `depth` moves:
+        attacker moves come from the table, the defender always picks the reply that delays mate longest.
+        """
+        line: list[int] = []
+        undos: list[tuple] = []
+        while True:
+            move: int = self._attacker_mates(layout, depth, 0)
+            undos.append(layout.make_move(move & 63, (move >> 6) & 63, code2promotion_piece[move >> 12]))
+            line.append(move)
+            replies: list[int] = list(layout.generate_moves(MoveList()))
+            if not replies:
+                break
+            best_reply, best_depth = replies[0], 0
+            for reply in replies:
+                undo = layout.make_move(reply & 63, (reply >> 6) & 63, code2promotion_piece[reply >> 12])
+                # shortest mate after the reply (found quickly with the table)
+                for mate_depth in range(1, depth):
+                    if self._attacker_mates(layout, mate_depth, 0):
+                        break
+                layout.unmake_move(undo)
+                if mate_depth > best_depth:
+                    best_reply, best_depth = reply, mate_depth
+            undos.append(layout.make_move(best_reply & 63, (best_reply >> 6) & 63,
+                                          code2promotion_piece[best_reply >> 12]))
+            line.append(best_reply)
+            depth = best_depth
+        for undo in reversed(undos):
+            layout.unmake_move(undo)
+        return line
+
+def main(argv: list[str] | None=None) -> int:
+    """Command line entry point, returns exit code (1 when any of the positions has no mate)."""
+    parser = argparse.ArgumentParser(prog="python -m Classes.Chess.Mate",
+                                     description="Find forced mates in N moves.")
+    parser.add_argument("--fen", default=None, help="position to solve")
+    parser.add_argument("--file", default=None, help="file with one FEN per line")
+    parser.add_argument("--moves", type=int, default=2, help="maximal number of attacker moves (default: 2)")
+    parser.add_argument("--hash-mb", type=float, default=16, help="transposition table memory cap (default: 16)")
+    parser.add_argument("--max-nodes", type=int, default=None, help="node budget per position")
+    args = parser.parse_args(argv)
+
+    if args.file is not None:
+        with open(args.file) as file:
+            fens: list[str] = [line.strip() for line in file if line.strip()]
+    else:
+        fens: list[str] = [args.fen] if args.fen else [Layout().layout2fen()]
+
+    solver = MateSolver(args.hash_mb)
+    all_solved: bool = True
+    total_nodes: int = 0
+    start: float = time.perf_counter()
+    for fen in fens:
+        result: MateResult = solver.solve(Layout(fen), args.moves, args.max_nodes)
+        total_nodes += result.nodes
+        all_solved = all_solved and result.mate_in is not None
+        print(f"{fen}: {result}")
+    elapsed: float = time.perf_counter() - start
+    print(f"\nPositions: {len(fens)}\nNodes: {total_nodes}\nTime: {elapsed:.2f} s\n" +
+          f"Table: {solver.table}, {solver.table.usage():.1%} used")
+    return 0 if all_solved else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+"""
+This module defines compact integer encoding of chess moves and an array backed move list.
+
+A move is packed into 16 bits (fits `array('H')` and two bytes of a game record):
+    bits 0-5   - old_field (0-63, board index as in `Layout.fields`)
+    bits 6-11  - new_field (0-63)
+    bits 12-15 - move code:
+        0 - normal move or capture
+        1 - pawn double push
+        2 - castling
+        3 - en passant capture
+        4 - promotion to knight
+        5 - promotion to bishop
+        6 - promotion to rook
+        7 - promotion to queen
+
+Classes:
+    - MoveList: Reusable buffer of packed moves backed by `array('H')`.
+
+Functions:
+    - encode_move(old_field: int, new_field: int, promotion: int | None=None, code: int=NORMAL) -> int
+    - decode_move(move: int) -> tuple[int, int, int | None]: (old_field, new_field, promotion piece type)
+    - move_code(move: int) -> int: Move code (see above).
+    - move2uci(move: int) -> str: Move in UCI notation (e.g. `e2e4`, `e7e8q`).
+    - uci2move(layout: Layout, uci: str) -> int: Packed move from UCI notation in a given position.
+
+Author: WK-K
+"""
+
+# standard modules
+from array import array
+# project modules
+from Classes.Chess.Common import board_index2file_rank_string, file_rank_string2board_index
+
+# CONSTANTS:
+NORMAL: int = 0
+DOUBLE_PUSH: int = 1
+CASTLING: int = 2
+EN_PASSANT: int = 3
+promotion_piece2code: dict[int, int] = {3: 4, 4: 5, 2: 6, 5: 7}
+"""Piece type (as in `Layout.fields` without colour) a pawn is promoted to -> move code."""
+code2promotion_piece: list[int | None] = [None, None, None, None, 3, 4, 2, 5, None, None, None, None, None, None, None, None]
+"""Move code -> piece type a pawn is promoted to (None for other codes)."""
+promotion_piece2character: dict[int, str] = {5: 'q', 2: 'r', 4: 'b', 3: 'n'}
+character2promotion_piece: dict[str, int] = {v: k for k, v in promotion_piece2character.items()}
+
+# FUNCTIONS:
+def encode_move(old_field: int, new_field: int, promotion: int | None=None, code: int=NORMAL) -> int:
+    """
+    Returns move packed into 16 bits.
+
+    Arguments:
+    - old_field (int), new_field (int): move from old_field to new_field
+    - promotion (int | None): piece type a pawn is promoted to (overrides code)
+    - code (int): NORMAL, DOUBLE_PUSH, CASTLING or EN_PASSANT
+    """
+    if promotion is not None:
+        code = promotion_piece2code[promotion]
+    return old_field | (new_field << 6) | (code << 12)
+
+def decode_move(move: int) -> tuple[int, int, int | None]:
+    """Returns (old_field, new_field, promotion) of a packed move, in the form accepted by `Layout.make_move()`."""
+    return move & 63, (move >> 6) & 63, code2promotion_piece[move >> 12]
+
+def move_code(move: int) -> int:
+    """Returns move code of a packed move."""
+    return move >> 12
+
+def move2uci(move: int) -> str:
+    """Returns packed move in UCI notation (e.g. `e2e4`, `e7e8q`)."""
+    promotion: int | None = code2promotion_piece[move >> 12]
+    return board_index2file_rank_string[move & 63] + board_index2file_rank_string[(move >> 6) & 63] + \
+        (promotion_piece2character[promotion] if promotion else '')
+
+def uci2move(layout, uci: str) -> int:
+    """
+    Returns packed move from UCI notation (e.g. `e2e4`, `e7e8q`),
+    move code is taken from the position in which the move is played.
+
+    Raises:
+    - ValueError: When the string is not a move in UCI notation, a pawn reaches the last rank without 
+        a promotion letter or a promotion letter follows a move that is not a promotion.
+    """
+    try:
+        old_field: int = file_rank_string2board_index[uci[0:2]]
+        new_field: int = file_rank_string2board_index[uci[2:4]]
+        promotion: int | None = character2promotion_piece[uci[4]] if len(uci) == 5 else None
+    except (KeyError, IndexError):
+        raise ValueError(f"Not a move in UCI notation: {uci}")
+    if len(uci) > 5:
+        raise ValueError(f"Not a move in UCI notation: {uci}")
+    piece: int = layout.fields[old_field]
+    if piece in (1, 9) and (new_field > 55 or new_field < 8):
+        if promotion is None:
+            raise ValueError(f"Promotion piece missing in {uci}")
+    elif promotion is not None:
+        raise ValueError(f"Not a promotion: {uci}")
+    return encode_move(old_field, new_field, promotion,
+                       special_move_code(piece, old_field, new_field, layout.en_passant))
+
+def special_move_code(piece: int, old_field: int, new_field: int, en_passant: int | None) -> int:
+    """Returns DOUBLE_PUSH, CASTLING, EN_PASSANT or NORMAL code of a move of `piece` (promotions are not detected)."""
+    if piece in (1, 9):
+        if new_field == en_passant:
+            return EN_PASSANT
+        if old_field - new_field in (16, -16):
+            return DOUBLE_PUSH
+    elif piece in (6, 14) and old_field - new_field in (2, -2):
+        return CASTLING
+    return NORMAL
+
+# CLASSES:
+class MoveList:
+    """
+    Reusable buffer of packed moves backed by `array('H')`.
+
+    Buffer is allocated once and `clear()` only resets the length,
+    so one MoveList per search depth can be reused for every node.
+
+    ATTRIBUTES:
+        - moves (array): Buffer of packed moves (only the first `count` are valid).
+        - count (int): Number of moves in the list.
+
+    METHODS:
+        - append(move: int) -> None: Adds a packed move (the buffer grows if it is full).
+        - extend(moves: list[int]) -> None: Adds packed moves at once.
+        - clear() -> None: Empties the list without freeing the buffer.
+        - __len__, __iter__, __getitem__: Sequence access to valid moves.
+        - to_uci() -> list[str]: Moves in UCI notation.
+    """
+    def __init__(self, capacity: int=256) -> None:
+        """
+        Allocates the buffer (256 is more than the number of legal moves in any chess position).
+
+        Raises:
+        - ValueError: When capacity is smaller than 1 (the buffer grows by doubling).
+        """
+        if capacity < 1:
+            raise ValueError(f"Move list needs a capacity of at least one move: {capacity}")
+        self.moves: array = array('H', bytes(2 * capacity))
+        self.count: int = 0
+    def append(self, move: int) -> None:
+        """Adds a packed move at the end of the list."""
+        if self.count == len(self.moves):
+            self.moves.extend(array('H', bytes(2 * len(self.moves))))
+        self.moves[self.count] = move
+        self.count += 1
+    def extend(self, moves: list[int]) -> None:
+        """Adds packed moves at the end of the list (one slice assignment instead of an append per move)."""
+        end: int = self.count + len(moves)
+        if end > len(self.moves):
+            self.moves.extend(array('H', bytes(2 * max(len(self.moves), end - len(self.moves)))))
+        self.moves[self.count:end] = array('H', moves)
+        self.count = end
+    def clear(self) -> None:
+        """Empties the list (buffer is kept for reuse)."""
+        self.count = 0
+    def __len__(self) -> int:
+        """Returns number of moves in the list."""
+        return self.count
+    def __iter__(self):
+        """Iterates over valid packed moves."""
+        moves: array = self.moves
+        for i in range(self.count):
+            yield moves[i]
+    def __getitem__(self, index: int) -> int:
+        """Returns packed move at a given index."""
+        if not -self.count <= index < self.count:
+            raise IndexError("MoveList index out of range")
+        return self.moves[index % self.count]
+    def to_uci(self) -> list[str]:
+        """Returns moves in UCI notation."""
+        return [move2uci(move) for move in self]
+    def __repr__(self) -> str:
+        """Returns one line representation with moves in UCI notation."""
+        return f"MoveList({' '.join(self.to_uci())})"
@@ -0,0 +1,138 @@
+"""
+This module defines `MoveCache`, a bounded LRU cache of legal moves of whole positions for the UI.
+
+Legal moves of a position are generated once (one pass of `Layout.legal_moves_iter()`), grouped by piece
+and stored under the position's Zobrist key, so grabbing a piece, hovering and checking for the end of the game
+are dictionary lookups afterwards. Every move changes the key (`Layout.update()` keeps it updated),
+so entries of previous positions are never returned for the current one and nothing has to be cleared on a move;
+a position that appears again (e.g. after a repetition) is found in the cache.
+
+Classes:
+    - MoveCache: Bounded LRU cache of legal moves keyed by position.
+
+Author: WK-K
+"""
+
+# standard modules
+import threading
+from collections import OrderedDict
+# project modules
+from Classes.Chess.Layout import Layout
+
+class MoveCache:
+    """
+    Bounded LRU cache of legal moves keyed by position (Zobrist key).
+
+    ATTRIBUTES:
+        - max_positions (int): Number of positions kept, least recently used ones are dropped first.
+        - hits (int), misses (int): Number of lookups answered from the cache and ones that generated moves.
+
+    METHODS:
+        - legal_moves(layout: Layout) -> dict[int, tuple[list[int], list[int]]]:
+            Legal non-capturing and capturing target squares of every movable piece of the side to move.
+        - moves_for_piece(layout: Layout, index: int) -> tuple[list[int], list[int]]:
+            Same as Layout.legal_moves_for_piece(), from the cache.
+        - has_legal_move(layout: Layout) -> bool, is_checkmate(layout: Layout) -> bool,
+          is_stalemate(layout: Layout) -> bool: End of the game checks.
+        - warm(layout: Layout, background: bool=False) -> None: Fills the cache for a position in advance.
+        - clear() -> None: Removes all positions.
+    """
+    def __init__(self, max_positions: int=256) -> None:
+        """
+        Initializes an empty cache.
+
+        Raises:
+        - ValueError: When max_positions is smaller than 1.
+        """
+        if max_positions < 1:
+            raise ValueError(f"Move cache has to keep at least one position: {max_positions}")
+        self.max_positions: int = max_positions
+        self.hits: int = 0
+        self.misses: int = 0
+        self._entries: OrderedDict[int, dict[int, tuple[list[int], list[int]]]] = OrderedDict()
+        self._lock: threading.Lock = threading.Lock() # warm(background=True) fills the cache from another thread
+    def __len__(self) -> int:
+        """Returns number of cached positions."""
+        return len(self._entries)
+    def __repr__(self) -> str:
+        """Returns one line summary."""
+        return f"MoveCache({len(self._entries)}/{self.max_positions} positions, {self.hits} hits, {self.misses} misses)"
+
+    # Lookups
+    def legal_moves(self, layout: Layout) -> dict[int, tuple[list[int], list[int]]]:
+        """
+        Returns legal moves of the side to move grouped by piece: board index of a piece mapped to
+        its non-capturing and capturing target squares (pieces without moves are left out).
+        Generated on the first lookup of a position, returned lists must not be modified.
+        """
+        key: int = layout.zobrist_key
+        with self._lock:
+            entry: dict[int, tuple[list[int], list[int]]] | None = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+        entry = self._generate(layout)
+        self._store(key, entry)
+        return entry
+    def moves_for_piece(self, layout: Layout, index: int) -> tuple[list[int], list[int]]:
+        """
+        Returns legal non-capturing and capturing moves of a piece (as Layout.legal_moves_for_piece(),
+        empty for empty squares and pieces of the other side).
+        """
+        return self.legal_moves(layout).get(index, ([], []))
+    def has_legal_move(self, layout: Layout) -> bool:
+        """Whether side to move has at least one legal move."""
+        return bool(self.legal_moves(layout))
+    def is_checkmate(self, layout: Layout) -> bool:
+        """Whether side to move is checkmated."""
+        return not self.legal_moves(layout) and layout.is_king_in_check(layout.white_moves)
+    def is_stalemate(self, layout: Layout) -> bool:
+        """Whether side to move is stalemated."""
+        return not self.legal_moves(layout) and not layout.is_king_in_check(layout.white_moves)
+
+    # Filling
+    def warm(self, layout: Layout, background: bool=False) -> None:
+        """
+        Generates legal moves of a position unless they are already cached
+        (e.g. right after a move, so the first piece grabbed in it does not wait for the generation).
+
+        Arguments:
+        - layout (Layout): Position to fill the cache for.
+        - background (bool): Whether moves are generated in a daemon thread (on a copy of the layout,
+            so the layout can be used in the meantime).
+        """
+        with self._lock:
+            if layout.zobrist_key in self._entries:
+                return
+        if background:
+            copy: Layout = layout.copy()
+            threading.Thread(target=lambda: self._store(copy.zobrist_key, self._generate(copy)), daemon=True).start()
+        else:
+            self._store(layout.zobrist_key, self._generate(layout))
+    def clear(self) -> None:
+        """Removes all positions (statistics are kept)."""
+        with self._lock:
+            self._entries.clear()
+    def _generate(self, layout: Layout) -> dict[int, tuple[list[int], list[int]]]:
+        """Returns legal moves of a position grouped by piece (see legal_moves())."""
+        fields: list[int] = layout.fields
+        en_passant: int | None = layout.en_passant
+        entry: dict[int, tuple[list[int], list[int]]] = {}
+        for old_field, new_field in layout.legal_moves_iter():
+            moves: tuple[list[int], list[int]] | None = entry.get(old_field)
+            if moves is None:
+                moves = entry[old_field] = ([], [])
+            if fields[new_field] != 0 or (new_field == en_passant and fields[old_field] in (1, 9)):
+                moves[1].append(new_field)
+            else:
+                moves[0].append(new_field)
+        return entry
+    def _store(self, key: int, entry: dict[int, tuple[list[int], list[int]]]) -> None:
+        """Stores moves of a position and drops least recently used positions above the limit."""
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_positions:
+                self._entries.popitem(last=False)
@@ -0,0 +1,203 @@
+"""
+This module defines a small NNUE-style (efficiently updatable neural network) position evaluator in NumPy.
+
+Network:
+    - input: 768 binary features, one for every (piece, square) pair, seen from the perspective of each colour
+      (for black the board is mirrored vertically and colours are swapped)
+    - first layer (768 -> HIDDEN): one accumulator per colour, a sum of weight rows of features present on the board
+    - output: clipped ReLU of [accumulator of the side to move, accumulator of the other side] -> 1 score
+
+Evaluation is available in two ways:
+    - incremental: `NNUE.attach(layout)` gives the layout an `Accumulator`, which `Layout.update()` keeps in sync
+      by adding and subtracting weight rows of moved, captured and promoted pieces,
+      so `NNUE.evaluate(layout)` only runs the small output layer,
+    - batched: `NNUE.evaluate_batch(features, white_to_move)` scores an (N, 768) feature matrix
+      of many positions with one matrix multiply per layer (see `features()`).
+
+NumPy is required by this module only (optional dependency of the project).
+
+Classes:
+    - NNUE: Network weights with incremental and batched evaluation.
+    - Accumulator: First layer outputs of both colours for one layout.
+
+Functions:
+    - feature_index(perspective: int, piece: int, square: int) -> int: Input feature of a piece on a square.
+    - features(layouts: list[Layout]) -> np.ndarray: (N, 768) feature matrix of layouts (white perspective).
+
+Author: WK-K
+"""
+
+# standard modules
+from __future__ import annotations
+# external modules
+import numpy as np
+# project modules
+from Classes.Chess.Layout import Layout
+
+# CONSTANTS:
+FEATURES: int = 768
+"""12 piece planes (white pawn, rook, knight, bishop, queen, king, then black ones) x 64 squares."""
+HIDDEN: int = 128
+"""Size of the accumulator (first layer output) of one colour."""
+OUTPUT_SCALE: float = 400.0
+"""Network output is multiplied by OUTPUT_SCALE to get centipawns."""
+
+# FUNCTIONS:
+def feature_index(perspective: int, piece: int, square: int) -> int:
+    """
+    Returns input feature of a piece (as in `Layout.fields`) on a square seen from a colour (0 - black, 1 - white).
+    From black's perspective colours are swapped and the board is mirrored, so both accumulators share weights.
+    """
+    own: bool = (piece >> 3) == perspective
+    plane: int = (piece & 7) - 1 + (0 if own else 6)
+    return plane * 64 + (square if perspective else square ^ 56)
+
+_feature_table: list[list[list[int]]] = \
+    [[[feature_index(perspective, piece, square) if piece & 7 else 0 for square in range(64)]
+      for piece in range(15)] for perspective in (0, 1)]
+"""Feature index by [perspective][piece][square]."""
+_black_perspective: np.ndarray = np.array([feature_index(0, piece, square)
+                                           for piece in (9, 10, 11, 12, 13, 14, 1, 2, 3, 4, 5, 6)
+                                           for square in range(64)], dtype=np.intp)
+"""Column permutation turning white perspective features into black perspective features (an involution)."""
+
+def features(layouts: list[Layout]) -> np.ndarray:
+    """Returns (N, FEATURES) float32 matrix of white perspective input features of given layouts."""
+    matrix: np.ndarray = np.zeros((len(layouts), FEATURES), dtype=np.float32)
+    table: list[list[int]] = _feature_table[1]
+    for row, layout in enumerate(layouts):
+        fields: list[int] = layout.fields
+        for pieces in layout.piece_squares:
+            for square in pieces:
+                matrix[row, table[fields[square]][square]] = 1.0
+    return matrix
+
+# CLASSES:
+class Accumulator:
+    """
+    First layer outputs (accumulators) of both colours for one layout, updated by Layout.update().
+
+    ATTRIBUTES:
+        - weights (np.ndarray): (FEATURES, HIDDEN) first layer weights of the network.
+        - values (np.ndarray): (2, HIDDEN) accumulators ([black perspective, white perspective]).
+
+    METHODS:
+        - add(square: int, piece: int) -> None, remove(square: int, piece: int) -> None:
+            Add / subtract weight rows of a piece (same interface as Bitboards).
+        - copy() -> Accumulator, snapshot() -> np.ndarray, restore(snapshot: np.ndarray) -> None:
+            Support for Layout.copy() and make_move() / unmake_move().
+    """
+    __slots__ = ("weights", "values")
+    def __init__(self, weights: np.ndarray, values: np.ndarray) -> None:
+        """Initializes accumulator with given values (see NNUE.attach())."""
+        self.weights: np.ndarray = weights
+        self.values: np.ndarray = values
+    def add(self, square: int, piece: int) -> None:
+        """Adds feature rows of a piece placed on a square."""
+        self.values[0] += self.weights[_feature_table[0][piece][square]]
+        self.values[1] += self.weights[_feature_table[1][piece][square]]
+    def remove(self, square: int, piece: int) -> None:
+        """Subtracts feature rows of a piece removed from a square."""
+        self.values[0] -= self.weights[_feature_table[0][piece][square]]
+        self.values[1] -= self.weights[_feature_table[1][piece][square]]
+    def copy(self) -> Accumulator:
+        """Returns an independent copy (weights are shared)."""
+        return Accumulator(self.weights, self.values.copy())
+    def snapshot(self) -> np.ndarray:
+        """Returns copy of the values for unmake_move()."""
+        return self.values.copy()
+    def restore(self, snapshot: np.ndarray) -> None:
+        """Restores values saved by snapshot()."""
+        self.values[:] = snapshot
+
+class NNUE:
+    """
+    Network weights with incremental (per layout) and batched evaluation.
+
+    ATTRIBUTES:
+        - w1 (np.ndarray): (FEATURES, HIDDEN) first layer weights, b1 (np.ndarray): (HIDDEN,) biases.
+        - w2 (np.ndarray): (2 * HIDDEN,) output weights (side to move first), b2 (float): output bias.
+
+    METHODS:
+        - random(seed: int=0) -> NNUE: Network with small random weights (untrained, for testing).
+        - load(path: str) -> NNUE, save(path: str) -> None: Weights in a `.npz` file.
+        - attach(layout: Layout) -> Layout: Gives a layout an accumulator computed from its fields.
+        - evaluate(layout: Layout) -> int: Score of the side to move in centipawns (from the accumulator).
+        - evaluate_batch(features: np.ndarray, white_to_move: np.ndarray) -> np.ndarray: Scores of N positions.
+    """
+    def __init__(self, w1: np.ndarray, b1: np.ndarray, w2: np.ndarray, b2: float) -> None:
+        """
+        Initializes the network from weights.
+
+        Raises:
+        - ValueError: When shapes of weights do not match the network.
+        """
+        if w1.shape[0] != FEATURES or b1.shape != (w1.shape[1],) or w2.shape != (2 * w1.shape[1],):
+            raise ValueError(f"Wrong shapes of NNUE weights: {w1.shape}, {b1.shape}, {w2.shape}")
+        self.w1: np.ndarray = np.ascontiguousarray(w1, dtype=np.float32)
+        self.b1: np.ndarray = np.asarray(b1, dtype=np.float32)
+        self.w2: np.ndarray = np.asarray(w2, dtype=np.float32)
+        self.b2: float = float(b2)
+    @classmethod
+    def random(cls, seed: int=0, hidden: int=HIDDEN) -> NNUE:
+        """Returns network with small random weights (untrained, for testing and benchmarks)."""
+        rng = np.random.default_rng(seed)
+        return cls(rng.normal(0, 0.05, (FEATURES, hidden)), np.zeros(hidden),
+                   rng.normal(0, 1 / hidden, 2 * hidden), 0.0)
+    @classmethod
+    def load(cls, path: str) -> NNUE:
+        """Loads weights saved with save()."""
+        with np.load(path) as data:
+            return cls(data["w1"], data["b1"], data["w2"], float(data["b2"]))
+    def save(self, path: str) -> None:
+        """Saves weights to a `.npz` file."""
+        np.savez(path, w1=self.w1, b1=self.b1, w2=self.w2, b2=np.float32(self.b2))
+
+    # Incremental evaluation
+    def attach(self, layout: Layout) -> Layout:
+        """Computes accumulators of a layout from its fields and attaches them (Layout.update() keeps them in sync)."""
+        values: np.ndarray = np.tile(self.b1, (2, 1))
+        fields: list[int] = layout.fields
+        for perspective in (0, 1):
+            table: list[list[int]] = _feature_table[perspective]
+            rows: list[int] = [table[fields[square]][square] for pieces in layout.piece_squares for square in pieces]
+            values[perspective] += self.w1[rows].sum(axis=0)
+        layout.accumulator = Accumulator(self.w1, values)
+        return layout
+    def evaluate(self, layout: Layout) -> int:
+        """
+        Returns score in centipawns from the point of view of the side to move.
+        Only the output layer is computed, the first layer comes from the layout's accumulator
+        (attached on the first call).
+        """
+        accumulator: Accumulator | None = layout.accumulator
+        if accumulator is None or accumulator.weights is not self.w1:
+            self.attach(layout)
+            accumulator = layout.accumulator
+        side: int = 1 if layout.white_moves else 0
+        hidden: int = self.b1.shape[0]
+        values: np.ndarray = np.clip(accumulator.values, 0.0, 1.0)
+        score: float = values[side] @ self.w2[:hidden] + values[side ^ 1] @ self.w2[hidden:] + self.b2
+        return int(score * OUTPUT_SCALE)
+
+    # Batched evaluation
+    def evaluate_batch(self, features: np.ndarray, white_to_move: np.ndarray) -> np.ndarray:
+        """
+        Scores many positions at once.
+
+        Arguments:
+        - features (np.ndarray): (N, FEATURES) white perspective input features (see `features()`).
+        - white_to_move (np.ndarray): (N,) bool, side to move of every position.
+
+        Returns:
+        - np.ndarray: (N,) int32 scores in centipawns from the point of view of the side to move.
+        """
+        features = np.asarray(features, dtype=np.float32)
+        hidden: int = self.b1.shape[0]
+        white: np.ndarray = np.clip(features @ self.w1 + self.b1, 0.0, 1.0)
+        black: np.ndarray = np.clip(features[:, _black_perspective] @ self.w1 + self.b1, 0.0, 1.0)
+        to_move: np.ndarray = np.asarray(white_to_move, dtype=bool)[:, None]
+        own: np.ndarray = np.where(to_move, white, black)
+        other: np.ndarray = np.where(to_move, black, white)
+        scores: np.ndarray = own @ self.w2[:hidden] + other @ self.w2[hidden:] + self.b2
+        return (scores * OUTPUT_SCALE).astype(np.int32)
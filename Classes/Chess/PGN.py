@@ -0,0 +1,349 @@
+"""
+This module reads and writes chess games in PGN (Portable Game Notation) with moves in SAN (Standard Algebraic Notation).
+
+Reading is streaming: `read_games()` is a generator that reads a text stream line by line and yields games
+one at a time, so memory use depends only on the length of the longest game, not on the size of the file.
+Comments, variations and NAGs are skipped. SAN moves are matched against legal moves generated by `Layout`
+and returned as packed moves (see Classes.Chess.Move), which can be applied with `Layout.update(*decode_move(move))`.
+
+Usage (from the root catalogue of the repository):
+    python -m Classes.Chess.PGN games.pgn            # prints number of games, moves and games per second
+    python -m Classes.Chess.PGN games.pgn --rewrite  # prints games written back from parsed moves
+
+Classes:
+    - PGNGame: Headers, moves and result of a game.
+
+Functions:
+    - read_games(stream: Iterable[str]) -> Iterator[PGNGame]: Games of a PGN stream (generator).
+    - san2move(layout: Layout, san: str, move_list: MoveList | None=None) -> int: Packed move from SAN.
+    - move2san(layout: Layout, move: int) -> str: SAN of a packed move (with disambiguation and check marks).
+    - game2pgn(game: PGNGame) -> str: PGN text of a game.
+    - write_games(stream: TextIO, games: Iterable[PGNGame]) -> int: Writes games, returns their number.
+    - main(argv: list[str] | None=None) -> int: Command line entry point.
+
+Author: WK-K
+"""
+
+# standard modules
+import argparse
+import re
+import sys
+import time
+from typing import Iterable, Iterator, TextIO
+# project modules
+from Classes.Chess.Common import board_index2file_rank_string, file_rank_string2board_index
+from Classes.Chess.Layout import Layout
+from Classes.Chess.Move import MoveList, CASTLING, decode_move, encode_move, special_move_code
+
+# CONSTANTS:
+START_FEN: str = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+RESULTS: tuple[str, ...] = ("1-0", "0-1", "1/2-1/2", "*")
+SEVEN_TAG_ROSTER: tuple[str, ...] = ("Event", "Site", "Date", "Round", "White", "Black", "Result")
+san_character2piece_type: dict[str, int] = {'R': 2, 'N': 3, 'B': 4, 'Q': 5, 'K': 6}
+"""SAN piece letter -> piece type (as in `Layout.fields` without colour), pawns have no letter."""
+piece_type2san_character: dict[int, str] = {v: k for k, v in san_character2piece_type.items()}
+_header_pattern = re.compile(r'\[\s*(\w+)\s+"((?:[^"\\]|\\.)*)"\s*\]')
+_san_pattern = re.compile(r'^([RNBQK])?([a-h])?([1-8])?x?([a-h][1-8])(?:=?([RNBQ]))?$')
+_move_number_pattern = re.compile(r'^\d+\.*')
+
+# CLASSES:
+class PGNGame:
+    """
+    A game read from (or to be written to) PGN.
+
+    ATTRIBUTES:
+        - headers (dict[str, str]): Tag pairs (e.g. "White", "Result", "FEN").
+        - moves (list[int]): Packed moves from the starting position.
+        - result (str): Game termination marker ("1-0", "0-1", "1/2-1/2" or "*").
+        - error (str | None): Description of the first move that could not be parsed (moves stop before it).
+
+    METHODS:
+        - start_fen() -> str: FEN of the starting position (from the "FEN" tag or the standard one).
+        - layout(plies: int | None=None) -> Layout: Position after a given number of plies (all if None).
+    """
+    __slots__ = ("headers", "moves", "result", "error")
+    def __init__(self, headers: dict[str, str] | None=None, moves: list[int] | None=None, result: str="*",
+                 error: str | None=None) -> None:
+        """Initializes the game."""
+        self.headers: dict[str, str] = headers if headers is not None else {}
+        self.moves: list[int] = moves if moves is not None else []
+        self.result: str = result
+        self.error: str | None = error
+    def start_fen(self) -> str:
+        """Returns FEN of the starting position."""
+        return self.headers.get("FEN", START_FEN)
+    def layout(self, plies: int | None=None) -> Layout:
+        """Returns position after the first `plies` moves (after all moves if None)."""
+        layout = Layout(self.start_fen())
+        for move in self.moves[:plies]:
+            layout.update(*decode_move(move))
+        return layout
+    def __repr__(self) -> str:
+        """Returns one line summary of the game."""
+        return f"PGNGame({self.headers.get('White', '?')} - {self.headers.get('Black', '?')}, " + \
+            f"{len(self.moves)} plies, {self.result})"
+
+# FUNCTIONS:
+# -- SAN --
+def san2move(layout: Layout, san: str, move_list: MoveList | None=None) -> int:
+    """
+    Returns packed legal move of the side to move written in SAN (e.g. `e4`, `exd5`, `Nbd2`, `R1e2`, `e8=Q`, `O-O`).
+    Check and annotation marks (+, #, !, ?) are ignored.
+
+    Arguments:
+    - layout (Layout): Position in which the move is played.
+    - san (str): Move in SAN.
+    - move_list (MoveList | None): Reusable list for legal moves of castling (avoids allocating one per move).
+
+    Raises:
+    - ValueError: When the move is not legal or ambiguous in the position, or is not SAN.
+    """
+    text: str = san.rstrip("+#!?")
+    fields: list[int] = layout.fields
+
+    # castling
+    if text in ("O-O", "0-0", "O-O-O", "0-0-0"):
+        king: int = layout.king_squares[layout.white_moves]
+        target: int = king + (2 if len(text) == 3 else -2)
+        for move in layout.generate_moves(move_list):
+            if move & 63 == king and (move >> 6) & 63 == target and move >> 12 == CASTLING:
+                return move
+        raise ValueError(f"Illegal move {san} in position {layout.layout2fen()}")
+
+    match = _san_pattern.match(text)
+    if match is None:
+        raise ValueError(f"Not a move in SAN: {san}")
+    piece_char, from_file, from_rank, target_square, promotion_char = match.groups()
+    piece: int = (san_character2piece_type[piece_char] if piece_char else 1) | (8 if layout.white_moves else 0)
+    target: int = file_rank_string2board_index[target_square]
+    promotion: int | None = san_character2piece_type[promotion_char] if promotion_char else None
+    file: int = ord(from_file) - 97 if from_file else -1
+    rank: int = int(from_rank) - 1 if from_rank else -1
+    if piece & 7 == 1 and file < 0:
+        file = target % 8 # pawn moving forward stays on its file
+
+    # only pieces of the given type (and file, rank) are tested, instead of generating all legal moves
+    found: int = -1
+    for old_field in tuple(layout.piece_squares[layout.white_moves]):
+        if fields[old_field] != piece or (file >= 0 and old_field % 8 != file) or \
+            (rank >= 0 and old_field // 8 != rank):
+            continue
+        quiet, captures = layout.legal_moves_for_piece(old_field)
+        if target in quiet or target in captures:
+            if found >= 0:
+                raise ValueError(f"Ambiguous move {san} in position {layout.layout2fen()}")
+            found = old_field
+    if found < 0:
+        raise ValueError(f"Illegal move {san} in position {layout.layout2fen()}")
+    if piece & 7 == 1 and (target > 55 or target < 8):
+        if promotion is None:
+            raise ValueError(f"Promotion piece missing in {san}")
+    elif promotion is not None:
+        raise ValueError(f"Not a promotion: {san}")
+    return encode_move(found, target, promotion, special_move_code(piece, found, target, layout.en_passant))
+
+def move2san(layout: Layout, move: int) -> str:
+    """
+    Returns SAN of a legal packed move of the side to move, with the shortest disambiguation
+    (file, rank or both) and a check (+) or checkmate (#) mark.
+    """
+    fields: list[int] = layout.fields
+    old_field, new_field, promotion = decode_move(move)
+    piece: int = fields[old_field]
+    piece_type: int = piece & 7
+
+    if move >> 12 == CASTLING:
+        san: str = "O-O" if new_field > old_field else "O-O-O"
+    elif piece_type == 1:
+        capture: bool = new_field % 8 != old_field % 8
+        san: str = (board_index2file_rank_string[old_field][0] + "x" if capture else "") + \
+            board_index2file_rank_string[new_field] + \
+            ("=" + piece_type2san_character[promotion] if promotion else "")
+    else:
+        # other pieces of the same type that can legally move to the same square
+        others: list[int] = [other & 63 for other in layout.generate_moves()
+                             if (other >> 6) & 63 == new_field and other & 63 != old_field and
+                             fields[other & 63] == piece]
+        disambiguation: str = ""
+        if others:
+            square: str = board_index2file_rank_string[old_field]
+            if all(other % 8 != old_field % 8 for other in others):
+                disambiguation = square[0]
+            elif all(other // 8 != old_field // 8 for other in others):
+                disambiguation = square[1]
+            else:
+                disambiguation = square
+        san: str = piece_type2san_character[piece_type] + disambiguation + \
+            ("x" if fields[new_field] else "") + board_index2file_rank_string[new_field]
+
+    # check and checkmate
+    undo = layout.make_move(old_field, new_field, promotion)
+    if layout.is_king_in_check(layout.white_moves):
+        san += "+" if layout.has_legal_move() else "#"
+    layout.unmake_move(undo)
+    return san
+
+# -- READING --
+def _tokens(text: str) -> Iterator[str]:
+    """Splits move text into tokens, with braces, parentheses and semicolons as separate tokens."""
+    for token in text.replace("{", " { ").replace("}", " } ").replace("(", " ( ").replace(")", " ) ") \
+                     .replace(";", " ; ").split():
+        yield token
+
+def read_games(stream: Iterable[str]) -> Iterator[PGNGame]:
+    """
+    Reads games from a PGN text stream (e.g. an open file) one at a time.
+
+    Only the current game is kept in memory. A game with an illegal or unreadable move is still yielded,
+    with moves up to that move and `error` describing it.
+
+    Arguments:
+    - stream (Iterable[str]): Lines of PGN text.
+
+    Yields:
+    - PGNGame: Games in the order of the stream.
+    """
+    move_list: MoveList = MoveList()
+    headers: dict[str, str] = {}
+    moves: list[int] = []
+    layout: Layout | None = None
+    error: str | None = None
+    comment: bool = False # inside {...}
+    variation: int = 0 # depth of (...)
+    in_moves: bool = False
+
+    for line in stream:
+        # tag pairs (a tag after move text starts a new game)
+        if not comment and line.startswith("["):
+            if in_moves:
+                yield PGNGame(headers, moves, headers.get("Result", "*"), error)
+                headers, moves, layout, error, variation, in_moves = {}, [], None, None, 0, False
+            for name, value in _header_pattern.findall(line):
+                headers[name] = value.replace('\\"', '"').replace("\\\\", "\\")
+            continue
+        if line.startswith("%"):
+            continue # escape line
+
+        for token in _tokens(line):
+            if comment:
+                comment = token != "}"
+                continue
+            if token == "{":
+                comment = True
+                continue
+            if token == ";":
+                break # rest of the line is a comment
+            if token == "(":
+                variation += 1
+                continue
+            if token == ")":
+                variation -= 1
+                continue
+            if variation:
+                continue
+            in_moves = True
+            if token in RESULTS:
+                yield PGNGame(headers, moves, token, error)
+                headers, moves, layout, error, in_moves = {}, [], None, None, False
+                continue
+            if token.startswith("$"):
+                continue # numeric annotation glyph
+            token = _move_number_pattern.sub("", token)
+            if not token or error is not None:
+                continue
+            if layout is None:
+                layout = Layout(headers.get("FEN", START_FEN))
+            try:
+                move: int = san2move(layout, token, move_list)
+            except ValueError as e:
+                error = f"ply {len(moves) + 1}: {e}"
+                continue
+            layout.make_move(*decode_move(move))
+            moves.append(move)
+
+    if in_moves or headers:
+        yield PGNGame(headers, moves, headers.get("Result", "*"), error)
+
+# -- WRITING --
+def game2pgn(game: PGNGame, line_length: int=79) -> str:
+    """
+    Returns PGN text of a game: tag pairs (Seven Tag Roster first) and move text in SAN
+    wrapped at `line_length` characters. A game with a "FEN" tag gets `[SetUp "1"]` right before it
+    (required by the PGN standard).
+    """
+    headers: dict[str, str] = dict(game.headers)
+    headers["Result"] = game.result
+    if "FEN" in headers:
+        fen_tag: str = headers.pop("FEN")
+        headers.pop("SetUp", None)
+        headers["SetUp"] = "1"
+        headers["FEN"] = fen_tag
+    lines: list[str] = []
+    tags: list[tuple[str, str]] = [(name, headers.pop(name, "?")) for name in SEVEN_TAG_ROSTER] + \
+        list(headers.items())
+    for name, value in tags:
+        value = value.replace("\\", "\\\\").replace('"', '\\"')
+        lines.append(f'[{name} "{value}"]')
+    lines.append("")
+
+    fen: str = game.start_fen()
+    layout = Layout(fen)
+    # move number is taken from FEN (Layout.moves_made counts plies made on the layout)
+    move_number: int = int(fen.split(' ')[5]) if len(fen.split(' ')) > 5 else 1
+    tokens: list[str] = []
+    for ply, move in enumerate(game.moves):
+        if layout.white_moves:
+            tokens.append(f"{move_number}.")
+        elif ply == 0:
+            tokens.append(f"{move_number}...")
+        tokens.append(move2san(layout, move))
+        if not layout.white_moves:
+            move_number += 1
+        layout.make_move(*decode_move(move))
+    tokens.append(game.result)
+
+    line: str = ""
+    for token in tokens:
+        if line and len(line) + 1 + len(token) > line_length:
+            lines.append(line)
+            line = token
+        else:
+            line = f"{line} {token}" if line else token
+    lines.append(line)
+    return "\n".join(lines) + "\n"
+
+def write_games(stream: TextIO, games: Iterable[PGNGame]) -> int:
+    """Writes games to a text stream (separated by empty lines), returns number of written games."""
+    count: int = 0
+    for game in games:
+        stream.write(game2pgn(game) + "\n")
+        count += 1
+    return count
+
+def main(argv: list[str] | None=None) -> int:
+    """Command line entry point, returns exit code (1 when any game had an unreadable move)."""
+    parser = argparse.ArgumentParser(prog="python -m Classes.Chess.PGN", description="Read (and rewrite) PGN files.")
+    parser.add_argument("path", help="PGN file")
+    parser.add_argument("--rewrite", action="store_true", help="print games written back from parsed moves")
+    args = parser.parse_args(argv)
+
+    games: int = 0
+    plies: int = 0
+    errors: int = 0
+    start: float = time.perf_counter()
+    with open(args.path, encoding="utf-8", errors="replace") as file:
+        for game in read_games(file):
+            games += 1
+            plies += len(game.moves)
+            if game.error is not None:
+                errors += 1
+                print(f"Game {games}: {game.error}", file=sys.stderr)
+            if args.rewrite:
+                print(game2pgn(game))
+    elapsed: float = time.perf_counter() - start
+    print(f"Games: {games}\nPlies: {plies}\nErrors: {errors}\nTime: {elapsed:.2f} s\n" +
+          f"Games per second: {games / max(elapsed, 1e-9):.1f}", file=sys.stderr if args.rewrite else sys.stdout)
+    return 1 if errors else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,208 @@
+"""
+This module stores large numbers of positions in files of fixed-width binary records
+(PACKED_SIZE bytes each, see `position2bytes()` in Common.py), about 3 times smaller than FEN text.
+
+Files have no header, a file is just records written one after another, so files can be concatenated
+and a record is found by its index without reading (or parsing) anything before it.
+`PositionFile` memory-maps such a file, records are unpacked into a `Layout` only when asked for.
+
+Text files with one FEN or EPD per line are streamed by `load_positions()`, which parses every line once
+(see `fen2position()` in Common.py) and reports malformed lines without stopping.
+
+Usage (from the root catalogue of the repository):
+    python -m Classes.Chess.Positions positions.bin                  # number of records
+    python -m Classes.Chess.Positions positions.bin --index 0 -1     # FEN of chosen records
+    python -m Classes.Chess.Positions positions.bin --pack fens.epd  # appends positions from a FEN / EPD file
+    python -m Classes.Chess.Positions --bench fens.epd               # FENs parsed per second
+
+Classes:
+    - PositionFile: Read-only random access to a memory-mapped file of packed positions.
+
+Functions:
+    - load_positions(lines: Iterable[str], packed: bool=False, backend: str="list", errors: list | None=None):
+        Generator yielding layouts (or packed records) from lines of FEN / EPD.
+    - write_positions(path: str, layouts: Iterable[Layout | bytes], append: bool=False) -> int: Writes records.
+    - benchmark(path: str) -> None: Prints FENs of a file parsed per second.
+    - main(argv: list[str] | None=None) -> int: Command line entry point.
+
+Author: WK-K
+"""
+
+# standard modules
+import argparse
+import mmap
+import os
+import sys
+import time
+from struct import error as struct_error
+from typing import Iterable, Iterator
+# project modules
+from Classes.Chess.Common import PACKED_SIZE, fen2position, position2bytes
+from Classes.Chess.Layout import Layout
+
+# CLASSES:
+class PositionFile:
+    """
+    Read-only random access to a memory-mapped file of packed positions.
+
+    ATTRIBUTES:
+        - path (str): Path of the file.
+
+    METHODS:
+        - __len__() -> int: Number of records.
+        - __getitem__(index: int) -> bytes: Raw record (negative indices count from the end).
+        - __iter__() -> Iterator[bytes]: Raw records in file order.
+        - layout(index: int, backend: str="list") -> Layout: Record unpacked into a layout.
+        - close() -> None: Unmaps the file (also on leaving a `with` block).
+    """
+    def __init__(self, path: str) -> None:
+        """
+        Maps a file of packed positions.
+
+        Raises:
+        - ValueError: When size of the file is not a multiple of PACKED_SIZE.
+        """
+        self.path: str = path
+        self._file = open(path, "rb")
+        size: int = os.fstat(self._file.fileno()).st_size
+        if size % PACKED_SIZE:
+            self._file.close()
+            raise ValueError(f"Size of {path} ({size} B) is not a multiple of the record size ({PACKED_SIZE} B)")
+        self._length: int = size // PACKED_SIZE
+        # empty files can not be mapped
+        self._map: mmap.mmap | None = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+    def __len__(self) -> int:
+        """Returns number of records."""
+        return self._length
+    def __getitem__(self, index: int) -> bytes:
+        """
+        Returns raw record of a given index (PACKED_SIZE bytes, nothing is parsed).
+
+        Raises:
+        - IndexError: When index is out of range.
+        """
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError(f"Record index out of range: {index} (records: {self._length})")
+        start: int = index * PACKED_SIZE
+        return self._map[start:start + PACKED_SIZE]
+    def __iter__(self) -> Iterator[bytes]:
+        """Yields raw records in file order."""
+        for start in range(0, self._length * PACKED_SIZE, PACKED_SIZE):
+            yield self._map[start:start + PACKED_SIZE]
+    def layout(self, index: int, backend: str="list") -> Layout:
+        """Returns record of a given index unpacked into a layout."""
+        return Layout(self[index], backend)
+    def close(self) -> None:
+        """Unmaps and closes the file."""
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+    def __enter__(self) -> "PositionFile":
+        """Returns the file itself for `with` blocks."""
+        return self
+    def __exit__(self, *exc_info) -> None:
+        """Closes the file on leaving a `with` block."""
+        self.close()
+
+# FUNCTIONS:
+def load_positions(lines: Iterable[str], packed: bool=False, backend: str="list", 
+                   errors: list[tuple[int, str]] | None=None) -> Iterator[Layout | bytes]:
+    """
+    Streams positions from lines of FEN or EPD (e.g. an open text file), one line at a time.
+    Empty lines and lines starting with '#' are skipped, malformed lines are reported and skipped.
+
+    Arguments:
+    - lines (Iterable[str]): Lines with one position each.
+    - packed (bool): Whether packed records (bytes) are yielded instead of layouts
+        (no Layout is built then, which is a few times faster).
+    - backend (str): Backend of yielded layouts ("list" or "bitboard").
+    - errors (list[tuple[int, str]] | None): List to which (line number, message) of malformed lines is appended,
+        if None they are printed to stderr.
+
+    Yields:
+    - Layout | bytes: Position of every correct line.
+    """
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line[0] == '#':
+            continue
+        try:
+            if packed:
+                position: Layout | bytes = position2bytes(*fen2position(line))
+            else:
+                position: Layout | bytes = Layout(line, backend)
+        except (ValueError, struct_error) as error:
+            if errors is None:
+                print(f"Line {number}: {error}", file=sys.stderr)
+            else:
+                errors.append((number, str(error)))
+            continue
+        yield position
+
+def write_positions(path: str, layouts: Iterable[Layout | bytes], append: bool=False) -> int:
+    """
+    Writes layouts (or already packed records) to a file of packed positions.
+
+    Arguments:
+    - path (str): Path of the file.
+    - layouts (Iterable[Layout | bytes]): Layouts or records to write (consumed lazily, so it can be a generator).
+    - append (bool): Whether records are added at the end of an existing file (instead of overwriting it).
+
+    Returns:
+    - int: Number of written records.
+    """
+    count: int = 0
+    with open(path, "ab" if append else "wb") as file:
+        for layout in layouts:
+            file.write(layout if isinstance(layout, bytes) else layout.layout2bytes())
+            count += 1
+    return count
+
+def benchmark(path: str) -> None:
+    """Prints how many FENs per second of a file are loaded as layouts and as packed records."""
+    with open(path, encoding="utf-8") as file:
+        lines: list[str] = file.readlines()
+    for name, packed in (("Layout", False), ("packed", True)):
+        errors: list[tuple[int, str]] = []
+        start: float = time.perf_counter()
+        count: int = sum(1 for _ in load_positions(lines, packed=packed, errors=errors))
+        elapsed: float = time.perf_counter() - start
+        print(f"{name:>6}: {count / max(elapsed, 1e-9):8.0f} FEN/s ({count} positions, {elapsed:.2f} s)")
+    print(f"Malformed lines: {len(errors)}")
+
+def main(argv: list[str] | None=None) -> int:
+    """Command line entry point: prints number of records, FEN of chosen records, packs a FEN file or benchmarks it."""
+    parser = argparse.ArgumentParser(prog="python -m Classes.Chess.Positions",
+                                     description="Inspect or create files of packed positions.")
+    parser.add_argument("path", nargs="?", default=None, help="file of packed positions")
+    parser.add_argument("--index", type=int, nargs="+", default=[], help="print FEN of records with given indices")
+    parser.add_argument("--pack", default=None, metavar="FEN_FILE",
+                        help="append positions from a text file with one FEN / EPD per line")
+    parser.add_argument("--bench", default=None, metavar="FEN_FILE",
+                        help="measure parsing speed of a text file with one FEN / EPD per line")
+    args = parser.parse_args(argv)
+
+    if args.bench is not None:
+        benchmark(args.bench)
+    if args.path is None:
+        if args.bench is None:
+            parser.error("path of a file of packed positions is required")
+        return 0
+    if args.pack is not None:
+        errors: list[tuple[int, str]] = []
+        with open(args.pack, encoding="utf-8") as fens:
+            count: int = write_positions(args.path, load_positions(fens, packed=True, errors=errors), append=True)
+        for number, message in errors:
+            print(f"Line {number}: {message}", file=sys.stderr)
+        print(f"Packed: {count}, malformed lines: {len(errors)}")
+    with PositionFile(args.path) as positions:
+        print(f"Records: {len(positions)} ({PACKED_SIZE} B each)")
+        for index in args.index:
+            print(f"{index}: {positions.layout(index).layout2fen()}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+"""
+This module defines the `TranspositionTable` class, a fixed-capacity hash table of search results keyed by
+position hash (`Layout.zobrist_key`).
+
+Entries are kept in parallel `array` columns instead of Python objects, so memory use is known in advance
+(ENTRY_SIZE bytes per entry) and bounded by the cap given in MB, however many positions are stored.
+Slot of a position is `key & (capacity - 1)`. When two positions meet in one slot, the entry searched to a greater
+depth is kept (depth-preferred replacement); entries stored in previous generations (e.g. earlier puzzles)
+are always replaced.
+
+Classes:
+    - TranspositionTable: Array backed hash table of (key, depth, flag, move) entries.
+
+Author: WK-K
+"""
+
+# standard modules
+from array import array
+
+# CONSTANTS:
+ENTRY_SIZE: int = 13
+"""Bytes per entry: key (8), move (2), depth (1), flag (1), generation (1)."""
+EMPTY: int = 0
+"""Flag of an unused slot (other flags are defined by the search using the table)."""
+
+class TranspositionTable:
+    """
+    Fixed-capacity, array backed transposition table with depth-preferred replacement.
+
+    ATTRIBUTES:
+        - capacity (int): Number of slots (a power of two).
+        - keys (array): 64-bit position keys ('Q').
+        - moves (array): Packed best moves ('H', see Classes.Chess.Move).
+        - depths (array): Depths of stored results ('B').
+        - flags (array): Kinds of stored results ('B', EMPTY for unused slots).
+        - generations (array): Generation in which entries were stored ('B').
+        - generation (int): Current generation (see new_generation()).
+        - hits (int), stores (int): Statistics of successful probes and stores.
+
+    METHODS:
+        - probe(key: int) -> int: Returns slot of a stored position or -1.
+        - store(key: int, depth: int, flag: int, move: int=0) -> None: Stores an entry (depth-preferred).
+        - new_generation() -> None: Marks all stored entries as old (they are still probed, but replaced first).
+        - clear() -> None: Empties the table.
+        - usage() -> float: Fraction of used slots.
+    """
+    def __init__(self, size_mb: float=16) -> None:
+        """
+        Allocates the table.
+
+        Arguments:
+        - size_mb (float): Memory cap in MB, capacity is the greatest power of two that fits in it.
+
+        Raises:
+        - ValueError: When the cap is too small for a single entry.
+        """
+        slots: int = int(size_mb * 1024 * 1024) // ENTRY_SIZE
+        if slots < 1:
+            raise ValueError(f"Transposition table cap is too small: {size_mb} MB")
+        self.capacity: int = 1 << (slots.bit_length() - 1)
+        self._mask: int = self.capacity - 1
+        self.keys: array = array('Q', bytes(8 * self.capacity))
+        self.moves: array = array('H', bytes(2 * self.capacity))
+        self.depths: array = array('B', bytes(self.capacity))
+        self.flags: array = array('B', bytes(self.capacity))
+        self.generations: array = array('B', bytes(self.capacity))
+        self.generation: int = 0
+        self.hits: int = 0
+        self.stores: int = 0
+    def probe(self, key: int) -> int:
+        """Returns slot index of the entry of a given position or -1 if it is not stored."""
+        slot: int = key & self._mask
+        if self.flags[slot] != EMPTY and self.keys[slot] == key:
+            self.hits += 1
+            return slot
+        return -1
+    def store(self, key: int, depth: int, flag: int, move: int=0) -> None:
+        """
+        Stores an entry, unless its slot holds a deeper entry of the current generation.
+
+        Arguments:
+        - key (int): 64-bit position key.
+        - depth (int): Depth of the result (0-255).
+        - flag (int): Kind of the result (other than EMPTY).
+        - move (int): Packed best move (0 if none).
+        """
+        slot: int = key & self._mask
+        if self.flags[slot] != EMPTY and self.generations[slot] == self.generation and \
+            self.keys[slot] != key and self.depths[slot] > depth:
+            return
+        self.keys[slot] = key
+        self.depths[slot] = depth
+        self.flags[slot] = flag
+        self.moves[slot] = move
+        self.generations[slot] = self.generation
+        self.stores += 1
+    def new_generation(self) -> None:
+        """Starts a new generation, entries of older ones are kept but always replaced."""
+        self.generation = (self.generation + 1) & 255
+    def clear(self) -> None:
+        """Empties the table."""
+        self.flags = array('B', bytes(self.capacity))
+        self.generation = 0
+        self.hits = 0
+        self.stores = 0
+    def usage(self) -> float:
+        """Returns fraction of used slots."""
+        return (self.capacity - self.flags.count(EMPTY)) / self.capacity
+    def __repr__(self) -> str:
+        """Returns one line summary of the table."""
+        return f"TranspositionTable({self.capacity} entries, {self.capacity * ENTRY_SIZE / 1024 / 1024:.1f} MB)"
@@ -0,0 +1,100 @@
+"""
+Tests of draw detection on Layout: repetitions() from the key history, draw_reason() and the Zobrist key
+(which must equal the key computed from scratch after every move and take back).
+
+Run (from the root catalogue of the repository):
+    python -m pytest -q Classes/Chess
+
+Author: WK-K
+"""
+
+# standard modules
+import random
+# external modules
+import pytest
+# project modules
+from Classes.Chess.Common import file_rank_string2board_index, zobrist_key
+from Classes.Chess.Layout import Layout
+from Classes.Chess.Move import MoveList, decode_move
+
+# CONSTANTS:
+KNIGHT_SHUFFLE: list[str] = ["g1f3", "g8f6", "f3g1", "f6g8"]
+"""Four plies returning to the position before them."""
+
+# FUNCTIONS:
+def play(layout: Layout, moves: list[str]) -> Layout:
+    """Plays moves written as square pairs (e.g. `e2e4`) and returns the layout."""
+    for move in moves:
+        layout.update(file_rank_string2board_index[move[:2]], file_rank_string2board_index[move[2:4]])
+    return layout
+
+# TESTS:
+@pytest.mark.parametrize("backend", ["list", "bitboard"])
+def test_repetitions(backend: str) -> None:
+    layout = Layout(backend=backend)
+    assert layout.repetitions() == 0
+    play(layout, KNIGHT_SHUFFLE)
+    assert layout.repetitions() == 1
+    assert layout.draw_reason() is None
+    play(layout, KNIGHT_SHUFFLE)
+    assert layout.repetitions() == 2
+    assert layout.draw_reason() == "threefold repetition"
+    assert layout.draw_reason(claim=False) is None
+    assert layout.copy().repetitions() == 2
+    play(layout, KNIGHT_SHUFFLE * 2)
+    assert layout.draw_reason(claim=False) == "fivefold repetition"
+
+def test_pawn_move_clears_history() -> None:
+    layout = play(Layout(), KNIGHT_SHUFFLE + ["e2e4"])
+    assert layout.key_history == []
+    assert layout.repetitions() == 0
+    undo = layout.make_move(file_rank_string2board_index["e7"], file_rank_string2board_index["e5"])
+    assert layout.key_history == []
+    layout.unmake_move(undo)
+    undo = layout.make_move(file_rank_string2board_index["g8"], file_rank_string2board_index["f6"])
+    assert len(layout.key_history) == 1
+    layout.unmake_move(undo)
+    assert layout.key_history == []
+
+def test_repetition_after_double_push() -> None:
+    # no black pawn can take on e3, so the position after 1. e4 is reached again after 3. Ng1
+    layout = play(Layout(), ["e2e4", "g8f6", "g1f3", "f6g8", "f3g1"])
+    assert layout.en_passant is None
+    assert layout.repetitions() == 1
+    # a possible en passant capture makes the positions different
+    layout = play(Layout("4k3/8/8/8/5p2/8/4P3/4K3 w - - 0 1"), ["e2e4", "e8d8", "e1d1", "d8e8", "d1e1"])
+    assert layout.repetitions() == 0
+
+@pytest.mark.parametrize("fen, claim, reason", [
+    ("7k/8/6K1/8/8/8/8/6Q1 w - - 100 80", True, "50-move rule"),
+    ("7k/8/6K1/8/8/8/8/6Q1 w - - 100 80", False, None),
+    ("7k/8/6K1/8/8/8/8/6Q1 w - - 150 80", False, "75-move rule"),
+    ("7k/6Q1/6K1/8/8/8/8/8 b - - 100 80", True, None),       # checkmate comes before the 50-move rule
+    ("7k/8/6QK/8/8/8/8/8 b - - 0 80", True, "stalemate"),
+    ("7k/8/8/8/8/8/8/5BK1 w - - 0 1", False, "insufficient material"),
+    ("7k/8/8/8/8/8/8/4NNK1 w - - 0 1", False, None),       # two knights can mate (with help)
+    ("2b4k/8/8/8/8/8/8/5BK1 w - - 0 1", False, "insufficient material"),   # bishops on squares of one colour
+    ("3b3k/8/8/8/8/8/8/5BK1 w - - 0 1", False, None),
+])
+def test_draw_reason(fen: str, claim: bool, reason: str | None) -> None:
+    assert Layout(fen).draw_reason(claim) == reason
+
+@pytest.mark.parametrize("backend", ["list", "bitboard"])
+def test_zobrist_key_matches_scratch(backend: str) -> None:
+    rng = random.Random(1)
+    for _ in range(20):
+        layout = Layout(backend=backend)
+        undos: list[tuple] = []
+        for _ in range(60):
+            moves: list[int] = list(layout.generate_moves(MoveList()))
+            if not moves:
+                break
+            before: tuple[int, list[int]] = (layout.zobrist_key, layout.key_history[:])
+            undos.append((layout.make_move(*decode_move(rng.choice(moves))), before))
+            assert layout.zobrist_key == zobrist_key(layout.fields, layout.white_moves, layout.castling,
+                                                     layout.en_passant)
+            assert len(layout.key_history) <= layout.clock
+        while undos:
+            undo, before = undos.pop()
+            layout.unmake_move(undo)
+            assert (layout.zobrist_key, layout.key_history) == before
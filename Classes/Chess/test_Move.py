@@ -0,0 +1,46 @@
+"""
+Tests of packed moves (encode_move(), decode_move(), UCI conversion) and of the MoveList buffer.
+
+Run (from the root catalogue of the repository):
+    python -m pytest -q Classes/Chess
+
+Author: WK-K
+"""
+
+# external modules
+import pytest
+# project modules
+from Classes.Chess.Layout import Layout
+from Classes.Chess.Move import MoveList, decode_move, encode_move, move2uci, uci2move
+
+# TESTS:
+def test_encode_decode() -> None:
+    for old_field, new_field, promotion in ((12, 28, None), (52, 60, 5), (49, 56, 3), (0, 63, None)):
+        assert decode_move(encode_move(old_field, new_field, promotion)) == (old_field, new_field, promotion)
+
+def test_uci_round_trip() -> None:
+    layout = Layout("r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1")
+    for move in layout.generate_moves(MoveList()):
+        assert uci2move(layout, move2uci(move)) == move
+
+@pytest.mark.parametrize("uci", ["a7a8", "a7a8k", "e2e4q", "e2", "z9e4"])
+def test_uci_errors(uci: str) -> None:
+    layout = Layout("4k3/P7/8/8/8/8/4P3/4K3 w - - 0 1")
+    with pytest.raises(ValueError):
+        uci2move(layout, uci)
+
+@pytest.mark.parametrize("capacity", [1, 2, 256])
+def test_move_list_grows(capacity: int) -> None:
+    moves = MoveList(capacity)
+    moves.append(1)
+    moves.extend(list(range(2, 600)))
+    moves.append(600)
+    assert list(moves) == list(range(1, 601))
+    assert moves[-1] == 600
+    moves.clear()
+    assert len(moves) == 0 and list(moves) == []
+
+@pytest.mark.parametrize("capacity", [0, -1])
+def test_move_list_capacity(capacity: int) -> None:
+    with pytest.raises(ValueError):
+        MoveList(capacity)
@@ -0,0 +1,66 @@
+"""
+Tests of MoveCache: cached moves must be the same as Layout.legal_moves_for_piece() of every square,
+and the cache must stay bounded.
+
+Run (from the root catalogue of the repository):
+    python -m pytest -q Classes/Chess
+
+Author: WK-K
+"""
+
+# standard modules
+import random
+# external modules
+import pytest
+# project modules
+from Classes.Chess.Layout import Layout
+from Classes.Chess.Move import MoveList, decode_move
+from Classes.Chess.MoveCache import MoveCache
+from Classes.Chess.Perft import REFERENCE_POSITIONS
+
+# FUNCTIONS:
+def assert_same_moves(cache: MoveCache, layout: Layout) -> None:
+    """Compares cached moves of every square with moves generated by the layout."""
+    for index in range(64):
+        quiet, captures = layout.legal_moves_for_piece(index)
+        cached_quiet, cached_captures = cache.moves_for_piece(layout, index)
+        assert (sorted(set(cached_quiet)), sorted(set(cached_captures))) == (sorted(set(quiet)), sorted(set(captures))), \
+            f"square {index} in {layout.layout2fen()}"
+    assert cache.has_legal_move(layout) == layout.has_legal_move()
+    assert cache.is_checkmate(layout) == layout.is_checkmate()
+    assert cache.is_stalemate(layout) == layout.is_stalemate()
+
+# TESTS:
+@pytest.mark.parametrize("backend", ["list", "bitboard"])
+@pytest.mark.parametrize("name, fen", [(name, fen) for name, fen, _ in REFERENCE_POSITIONS],
+                         ids=[name for name, _, _ in REFERENCE_POSITIONS])
+def test_reference_positions(backend: str, name: str, fen: str) -> None:
+    assert_same_moves(MoveCache(), Layout(fen, backend=backend))
+
+def test_random_games() -> None:
+    rng = random.Random(2)
+    cache = MoveCache(max_positions=8)
+    for _ in range(5):
+        layout = Layout()
+        for _ in range(80):
+            assert_same_moves(cache, layout)
+            moves: list[int] = list(layout.generate_moves(MoveList()))
+            if not moves:
+                break
+            layout.update(*decode_move(rng.choice(moves)))
+    assert len(cache) <= 8
+
+def test_hits_and_warm() -> None:
+    cache = MoveCache(max_positions=2)
+    layout = Layout()
+    cache.warm(layout)
+    cache.moves_for_piece(layout, 1)
+    cache.moves_for_piece(layout, 6)
+    assert (cache.hits, cache.misses) == (2, 0)
+    for fen in (REFERENCE_POSITIONS[1][1], REFERENCE_POSITIONS[2][1]):
+        cache.legal_moves(Layout(fen))
+    assert len(cache) == 2
+    cache.legal_moves(layout) # dropped as the least recently used position
+    assert cache.misses == 3
+    with pytest.raises(ValueError):
+        MoveCache(max_positions=0)
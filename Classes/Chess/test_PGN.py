@@ -0,0 +1,82 @@
+"""
+Tests of SAN conversion (san2move() / move2san()) and of writing and reading PGN.
+
+Run (from the root catalogue of the repository):
+    python -m pytest -q Classes/Chess
+
+Author: WK-K
+"""
+
+# standard modules
+import io
+import random
+# external modules
+import pytest
+# project modules
+from Classes.Chess.Layout import Layout
+from Classes.Chess.Move import MoveList, decode_move
+from Classes.Chess.Perft import REFERENCE_POSITIONS
+from Classes.Chess.PGN import PGNGame, game2pgn, move2san, read_games, san2move, write_games
+
+# FUNCTIONS:
+def random_game(fen: str, plies: int, seed: int) -> list[int]:
+    """Returns packed moves of a random game from `fen` (shorter if it ends earlier)."""
+    rng = random.Random(seed)
+    layout = Layout(fen)
+    moves: list[int] = []
+    for _ in range(plies):
+        legal: list[int] = list(layout.generate_moves(MoveList()))
+        if not legal:
+            break
+        moves.append(rng.choice(legal))
+        layout.update(*decode_move(moves[-1]))
+    return moves
+
+# TESTS:
+@pytest.mark.parametrize("name, fen", [(name, fen) for name, fen, _ in REFERENCE_POSITIONS],
+                         ids=[name for name, _, _ in REFERENCE_POSITIONS])
+def test_san_round_trip(name: str, fen: str) -> None:
+    layout = Layout(fen)
+    for move in layout.generate_moves(MoveList()):
+        assert san2move(layout, move2san(layout, move)) == move
+
+@pytest.mark.parametrize("san, expected", [("e4", "e4"), ("Nf3", "Nf3"), ("O-O", "O-O"), ("Rfe1", "Rfe1"),
+                                           ("exd5", "exd5"), ("Qxf7+", "Qxf7+")])
+def test_san_spelling(san: str, expected: str) -> None:
+    fens: dict[str, str] = {
+        "e4": "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+        "Nf3": "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+        "O-O": "r1bqk2r/pppp1ppp/2n2n2/2b1p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4",
+        "Rfe1": "7k/8/8/8/8/8/8/R4RK1 w - - 0 1",
+        "exd5": "rnbqkbnr/ppp1pppp/8/3p4/4P3/8/PPPP1PPP/RNBQKBNR w KQkq d6 0 2",
+        "Qxf7+": "rnbqkbnr/pppp1ppp/8/4p3/4P3/5Q2/PPPP1PPP/RNB1KBNR w KQkq - 0 3",
+    }
+    layout = Layout(fens[san])
+    assert move2san(layout, san2move(layout, san)) == expected
+
+def test_san_errors() -> None:
+    layout = Layout()
+    for san in ("e5", "Nf4", "O-O", "xyz"):
+        with pytest.raises(ValueError):
+            san2move(layout, san)
+
+@pytest.mark.parametrize("seed", range(5))
+def test_pgn_round_trip(seed: int) -> None:
+    fen: str = REFERENCE_POSITIONS[1][1] if seed % 2 else Layout().layout2fen()
+    headers: dict[str, str] = {"White": "A", "Black": "B"}
+    if seed % 2:
+        headers["FEN"] = fen
+    game = PGNGame(headers, random_game(fen, 80, seed), "*")
+    stream = io.StringIO()
+    assert write_games(stream, [game]) == 1
+    stream.seek(0)
+    games: list[PGNGame] = list(read_games(stream))
+    assert len(games) == 1
+    assert games[0].error is None
+    assert games[0].moves == game.moves
+    assert games[0].result == "*"
+
+def test_setup_tag_before_fen() -> None:
+    fen: str = "4k3/8/8/8/8/8/8/4K2R w K - 0 1"
+    text: str = game2pgn(PGNGame({"FEN": fen}, [], "*"))
+    assert f'[SetUp "1"]\n[FEN "{fen}"]' in text
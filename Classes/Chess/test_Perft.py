@@ -0,0 +1,45 @@
+"""
+Tests of move generation of both Layout backends with perft counts of the reference positions.
+
+Run (from the root catalogue of the repository):
+    python -m pytest -q Classes/Chess
+
+Author: WK-K
+"""
+
+# external modules
+import pytest
+# project modules
+from Classes.Chess.Layout import Layout
+from Classes.Chess.Move import MoveList
+from Classes.Chess.Perft import REFERENCE_POSITIONS, divide, game_positions, perft
+
+# CONSTANTS:
+MAX_NODES: int = 10000
+"""Deepest depth of every reference position with at most this many leaf nodes is tested (keeps the suite fast)."""
+
+CASES: list[tuple[str, str, int, int]] = [
+    (name, fen, depth, count)
+    for name, fen, counts in REFERENCE_POSITIONS
+    for depth, count in [max(((depth, count) for depth, count in enumerate(counts, 1) if count <= MAX_NODES),
+                             default=(1, counts[0]))]
+]
+"""(name, FEN, depth, expected leaf nodes) of every reference position."""
+
+# TESTS:
+@pytest.mark.parametrize("backend", ["list", "bitboard"])
+@pytest.mark.parametrize("name, fen, depth, count", CASES, ids=[case[0] for case in CASES])
+def test_perft_counts(backend: str, name: str, fen: str, depth: int, count: int) -> None:
+    layout = Layout(fen, backend=backend)
+    before: tuple[str, int] = (layout.layout2fen(), layout.zobrist_key)
+    assert perft(layout, depth) == count
+    assert (layout.layout2fen(), layout.zobrist_key) == before # make_move()/unmake_move() leave the position as it was
+
+def test_backends_divide_equally() -> None:
+    fen: str = REFERENCE_POSITIONS[1][1] # Kiwipete
+    assert divide(Layout(fen, backend="list"), 2) == divide(Layout(fen, backend="bitboard"), 2)
+
+def test_backends_generate_same_moves() -> None:
+    for fen in game_positions(games=4, seed=1):
+        assert sorted(Layout(fen, backend="list").generate_moves(MoveList())) == \
+               sorted(Layout(fen, backend="bitboard").generate_moves(MoveList())), fen
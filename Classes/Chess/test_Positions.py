@@ -0,0 +1,55 @@
+"""
+Tests of the fixed-width binary position records (position2bytes() / bytes2position() in Common.py)
+and of files of them (PositionFile, write_positions()).
+
+Run (from the root catalogue of the repository):
+    python -m pytest -q Classes/Chess
+
+Author: WK-K
+"""
+
+# external modules
+import pytest
+# project modules
+from Classes.Chess.Common import PACKED_SIZE, bytes2position, fen2position, position2bytes
+from Classes.Chess.Layout import Layout
+from Classes.Chess.Perft import REFERENCE_POSITIONS
+from Classes.Chess.Positions import PositionFile, write_positions
+
+# CONSTANTS:
+FENS: list[str] = [fen for _, fen, _ in REFERENCE_POSITIONS] + [
+    "rnbqkbnr/pppp1ppp/8/4p3/4P3/8/PPPP1PPP/RNBQKBNR w KQkq e6 0 2",   # en passant square
+    "4k3/8/8/8/8/8/8/4K3 b - - 99 300",                                # clock and move number
+]
+"""Positions with all kinds of pieces, castling rights, en passant squares and both sides to move."""
+
+# TESTS:
+@pytest.mark.parametrize("fen", FENS)
+def test_record_round_trip(fen: str) -> None:
+    position: tuple = fen2position(fen)
+    data: bytes = position2bytes(*position)
+    assert len(data) == PACKED_SIZE
+    assert bytes2position(data) == position
+
+@pytest.mark.parametrize("fen", FENS)
+def test_layout_round_trip(fen: str) -> None:
+    layout = Layout(fen)
+    copy = Layout(layout.layout2bytes(), backend="bitboard")
+    assert copy.layout2fen() == layout.layout2fen()
+    assert copy.zobrist_key == layout.zobrist_key
+
+def test_too_many_pieces() -> None:
+    fields, white_moves, castling, en_passant, clock, moves_made = fen2position(FENS[0])
+    fields[16:24] = [9] * 8 # a third rank of pawns (40 pieces)
+    with pytest.raises(ValueError):
+        position2bytes(fields, white_moves, castling, en_passant, clock, moves_made)
+
+def test_position_file(tmp_path) -> None:
+    path: str = str(tmp_path / "positions.bin")
+    assert write_positions(path, [Layout(fen) for fen in FENS[:3]]) == 3
+    assert write_positions(path, [Layout(fen).layout2bytes() for fen in FENS[3:]], append=True) == len(FENS) - 3
+    with PositionFile(path) as positions:
+        assert len(positions) == len(FENS)
+        assert [positions.layout(index).layout2fen() for index in range(len(FENS))] == \
+               [Layout(fen).layout2fen() for fen in FENS]
+        assert positions[-1] == Layout(FENS[-1]).layout2bytes()
@@ -5,10 +5,13 @@ Initializes all needed classes and takes care of data flow between them.
 Author: WK-K
 """
 
-# Project modules
+# Standard modules
+import io
+import os
+import time
+# Project modules (only the main menu, chess modules and the gameplay screen are imported when the first game starts)
 from Classes.UI.Main_menu import Main_menu
-from Classes.UI.Gameplay import *
-from Classes.Chess.Layout import Layout
+from Classes.UI.Common import StartupProfile
 
 class Game():
     """
@@ -17,29 +20,140 @@ class Game():
     Attributes:
         root_dir (str): Directory in which the main script was called for easy relative path operations.
         ui (UI.UI_main.UI): UI Instance for meaging user interaction.
+        opponent (Engine | None): Procedural opponent playing black pieces (created when the first game starts).
+        save_path (str): PGN file new games are appended to when the gameplay ends 
+                         and from which the last game is loaded (`Load` option), a continued game replaces it.
+        menu_ui (Main_menu | None): Main menu (created at start and again after the window was closed).
+        gameplay_ui (AbstractGameplay | None): Gameplay screen, its assets are loaded when the first game starts.
 
     Methods:
+        new_game() -> PGNGame: Record of a new game from the starting position.
+        load_game() -> tuple[PGNGame, int] | None: The last game of the save file and its position in the file.
+        save_game(game: PGNGame, layout: Layout, offset: int | None=None) -> None:
+            Appends a game (with its result) to the save file or replaces the game starting at `offset`.
 
     """
-    def __init__(self, root_dir: str) -> None:
+    def __init__(self, root_dir: str, startup_profile: StartupProfile | None = None) -> None:
         """
         Initializes the Game instance.
         
         Arguments:
             root_dir (str): Path to the main catalogue of the repository for relative path operations.
+            startup_profile (StartupProfile | None): Profile of the startup, printed after the first frame of the menu
+                (None if it is not measured).
         """
 
         self.root_dir: str = root_dir
+        self.opponent: "Engine | None" = None
+        self.save_path: str = os.path.join(self.root_dir, "Saves", "game.pgn")
+        self.menu_ui: Main_menu | None = None
+        self.gameplay_ui: "AbstractGameplay | None" = None
 
         while True:
-            self.menu_ui: Main_menu = Main_menu(self.root_dir)
-            self.gameplay_ui: AbstractGameplay = gameplay_factory(self.root_dir, "Developer")
+            # UI instances share one window and are kept until it is closed (pygame.quit() drops their surfaces)
+            if self.menu_ui is None:
+                self.menu_ui = Main_menu(self.root_dir, startup_profile)
+                startup_profile = None
             action: str = self.menu_ui.display_menu()
 
             # testing gameplay
             if action == "Play":
-                layout = Layout()
+                game = self.new_game()
+                offset: int | None = None # new games are appended to the save file
+                layout = game.layout()
                 print('\nStaring layoutout: ', layout, '\n')
-                self.gameplay_ui.gameplay(layout)
+            # continue the last game of the save file
+            elif action == "Load":
+                loaded = self.load_game()
+                if loaded is None:
+                    continue
+                game, offset = loaded # the game is saved in place of the loaded one
+                layout = game.layout()
             else:
                 break
+
+            # gameplay screen and the engine (with their chess modules) are loaded when the first game starts
+            if self.gameplay_ui is None:
+                from Classes.UI.Gameplay import gameplay_factory
+                self.gameplay_ui = gameplay_factory(self.root_dir, "Developer")
+            if self.opponent is None:
+                from Classes.Chess.Engine import Engine
+                self.opponent = Engine(time_limit=1.0)
+            ending: str = self.gameplay_ui.gameplay(layout, self.opponent, opponent_white=False)
+            game.moves.extend(self.gameplay_ui.played_moves)
+            self.save_game(game, layout, offset)
+            if ending == "Terminated":
+                self.menu_ui = self.gameplay_ui = None
+
+    def new_game(self) -> "PGNGame":
+        """Returns record of a new game from the starting position (user plays white against the engine)."""
+        from Classes.Chess.PGN import PGNGame # PGN modules are imported once a game starts, not at startup
+        return PGNGame({"Event": "Casual game", "Site": "?", "Date": time.strftime("%Y.%m.%d"), "Round": "-",
+                        "White": "Player", "Black": "Engine"})
+
+    def load_game(self) -> "tuple[PGNGame, int] | None":
+        """
+        Returns the last game of the save file (PGN) to be continued with the byte offset it starts at
+        (see save_game()), or None if there is no save file or no game in it.
+        Only the last game is parsed, earlier ones are skipped line by line (see _last_game_offset()).
+        """
+        if not os.path.isfile(self.save_path):
+            print(f"\nNo saved game: {self.save_path}\n")
+            return None
+        from Classes.Chess.PGN import read_games
+        offset: int = self._last_game_offset()
+        with open(self.save_path, "rb") as file:
+            file.seek(offset)
+            game = next(read_games(io.TextIOWrapper(file, encoding="utf-8")), None)
+        if game is None:
+            print(f"\nNo game in: {self.save_path}\n")
+            return None
+        if game.error is not None:
+            print(f"\nSaved game is read up to an unreadable move ({game.error})\n")
+            game.error = None # it is continued (and saved again) from the last readable move
+        return game, offset
+
+    def _last_game_offset(self) -> int:
+        """
+        Returns byte offset of the first tag pair line of the last game in the save file
+        (0 if there is none): the last line starting with `[` that follows a line of move text.
+        """
+        offset: int = 0
+        start: int = 0
+        in_tags: bool = False
+        with open(self.save_path, "rb") as file:
+            for line in file:
+                if line.startswith(b"["):
+                    if not in_tags:
+                        start, in_tags = offset, True
+                elif line.strip():
+                    in_tags = False
+                offset += len(line)
+        return start
+
+    def save_game(self, game: "PGNGame", layout: "Layout", offset: int | None=None) -> None:
+        """
+        Writes a game to the save file (PGN), so `Load` continues it.
+        A new game is appended, a continued one replaces the loaded game (the file is cut at `offset`
+        before writing), so the file does not grow by the whole game every time it is continued.
+        Result is taken from the final position: checkmate, automatic draw 
+        (see Layout.draw_reason()) or `*` for an unfinished game.
+
+        Arguments:
+            game (PGNGame): Record of the game with all moves played (including ones of a loaded game).
+            layout (Layout): Position after the last move.
+            offset (int | None): Byte offset the loaded game starts at (see load_game()), None for a new game.
+        """
+        from Classes.Chess.PGN import write_games
+        if layout.is_checkmate():
+            game.result = "0-1" if layout.white_moves else "1-0"
+        elif layout.draw_reason(claim=False) is not None:
+            game.result = "1/2-1/2"
+        else:
+            game.result = "*"
+        os.makedirs(os.path.dirname(self.save_path), exist_ok=True)
+        with open(self.save_path, "a", encoding="utf-8") as file:
+            if offset is not None:
+                file.truncate(offset)
+            write_games(file, [game])
+        print(f"\nGame saved: {self.save_path} ({len(game.moves)} plies, {game.result})\n")
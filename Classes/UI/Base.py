@@ -12,7 +12,7 @@ Author: WK-K
 import pygame
 import os
 # project modules
-from Classes.UI.Common import InputStack
+from Classes.UI.Common import InputStack, StartupProfile
 
 class UI_base():
     """
@@ -39,17 +39,22 @@ class UI_base():
                                       to string representations of key actions.
             memo (dict[tuple[int, int, int, int], pygame.Surface]): Memory for mask subsurfaces.
             param_scrren_rect (pygame.Rect): Rectangle of the screen.
+            startup_profile (StartupProfile | None): Profile of the startup that is still being measured 
+                                                     (None when it is not measured or already finished).
 
     Methods:
-        __init__(root_dir: str) -> None:
+        __init__(root_dir: str, startup_profile: StartupProfile | None = None) -> None:
             Initializes the game window and sets up essential paths and input handling.
             
             Arguments:
                 root_dir (str): 
                     Path to the main directory of the project for asset loading and other operations.
+                startup_profile (StartupProfile | None):
+                    Profile of the startup, `display init` phase is marked after the window is set up.
 
         window_set_up(window_caption: str = "The Szaszki Game") -> None:
-            Initializes pygame and configures the game window for full-screen mode.
+            Initializes pygame and configures the game window for full-screen mode
+            (only once, UI instances created later share the window).
             
             Arguments:
                 window_caption (str): 
@@ -89,17 +94,21 @@ class UI_base():
     RES: tuple[int, int] = 1920, 1080 # resolution (Full-HD)
 
     # Constructor methods
-    def __init__(self, root_dir) -> None:
+    def __init__(self, root_dir, startup_profile: StartupProfile | None = None) -> None:
         """
         Initializes the game window and sets up essential paths and input handling.
 
         Arguments:
             root_dir (str): Path to the main directory of the project for asset loading and other operations.
+            startup_profile (StartupProfile | None): Profile of the startup (None if it is not measured).
         """
         # set up window and pygame
         self.param_screen_rect: pygame.Rect = pygame.Rect((0, 0) + self.RES)
         """Rectangle of the screen"""
         self.window_set_up()
+        self.startup_profile: StartupProfile | None = startup_profile
+        if self.startup_profile is not None:
+            self.startup_profile.mark("display init")
 
         # paths
         self.root_dir: str = root_dir
@@ -132,16 +141,23 @@ class UI_base():
         - setting resolution and full-screen mode
         - setting caption to window_caption argument
         - initializing screen surface and clock variables
+
+        Pygame and the window are initialized only by the first UI instance,
+        next ones reuse the window (switching to full-screen mode again is the slowest part of the startup).
         
         Arguments:
             - window_caption (str): Name for the game window (Defaults to `The Szaszki Game).
         """
 
-        # initialize Pygame
-        pygame.init()
-        # set up the full-screen mode and resolution
-        self.screen: pygame.Surface = \
-            pygame.display.set_mode(self.RES, pygame.FULLSCREEN)
+        # initialize only used modules of Pygame (pygame.init() would also open audio and joystick devices)
+        if not pygame.display.get_init():
+            pygame.display.init()
+        if not pygame.font.get_init():
+            pygame.font.init()
+        # set up the full-screen mode and resolution (unless the window is already open)
+        self.screen: pygame.Surface = pygame.display.get_surface()
+        if self.screen is None:
+            self.screen = pygame.display.set_mode(self.RES, pygame.FULLSCREEN)
         # set_clips prevents drawing outside of the screen, which results in:
         # ValueError: subsurface rectangle outside surface area
         self.screen.set_clip(self.param_screen_rect)
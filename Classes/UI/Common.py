@@ -4,6 +4,7 @@ This module provides data structures and functions used in UI module.
 Classes:
     - InputEvent: Represents an individual input event (e.g., key press or mouse click).
     - InputStack: Manages a stack of InputEvent objects, allowing for easy handling of input events.
+    - StartupProfile: Measures phases of the game window startup (`python main.py --profile-startup`).
 
 Functions:
     - render_multiline_text(text: str, font: pygame.font.Font,
@@ -14,6 +15,7 @@ Functions:
 Author: WK-K
 """
 
+import time
 import pygame
 
 # Data Type for stacking events
@@ -119,6 +121,44 @@ class InputStack:
             num += 1
         return representation
 
+class StartupProfile:
+    """
+    Measures phases of the game window startup, every phase lasts from the end of the previous one
+    (the first one from the start of the launcher).
+
+    Attributes:
+    - started: float - time.perf_counter() value at the start of the launcher.
+    - phases: list of tuple[str, float] - Names of finished phases and their durations in seconds.
+
+    Methods:
+    - mark(phase: str) -> None: Ends a phase.
+    - __repr__() -> str: Returns a table of phases with the total time (multiple lines).
+    """
+    def __init__(self, started: float) -> None:
+        """
+        Initialize profile of a startup.
+
+        Parameters:
+        - started: float - time.perf_counter() value at the start of the launcher.
+        """
+        self.started: float = started
+        self.phases: list[tuple[str, float]] = []
+        self._last: float = started
+
+    def mark(self, phase: str) -> None:
+        """Ends a phase (e.g. "imports", "display init", "asset load", "first frame") and records its duration."""
+        now: float = time.perf_counter()
+        self.phases.append((phase, now - self._last))
+        self._last = now
+
+    def __repr__(self) -> str:
+        """Returns a table of phases (in milliseconds) with the total time, multiple line string."""
+        representation = "Startup profile:"
+        for phase, seconds in self.phases:
+            representation += f"\n{phase:<14}{seconds * 1000:9.1f} ms"
+        representation += f"\n{'total':<14}{(self._last - self.started) * 1000:9.1f} ms"
+        return representation
+
 def render_multiline_text(text: str, font: pygame.font.Font,
                             color: tuple[int, int, int] | tuple[int, int, int, int],
                             spacing_factor: float=1, tabulator_width: int=8) -> pygame.Surface:
@@ -15,6 +15,7 @@ Classes:
 Functions:
     - gameplay(root_dir: str, theme: str="Developer") -> None:
         Factory function that returns an instance of the appropriate Gameplay class based on the theme.
+    - performance_probe() -> tuple: psutil module and this process, imported and created once (on the first call).
 
 Author: WK-K
 """
@@ -23,12 +24,29 @@ Author: WK-K
 import pygame
 import os
 from abc import ABC, abstractmethod
-import time, psutil # performance metrics in developer theme
+from functools import cache
+import time # performance metrics in developer theme (psutil is imported on the first frame of the gameplay)
 # project modules
 from Classes.UI.Base import UI_base
 from Classes.Chess.Layout import Layout
+from Classes.Chess.Engine import Engine
+from Classes.Chess.MoveCache import MoveCache
+from Classes.Chess.Move import decode_move, encode_move, special_move_code
+from Classes.Chess.Common import board_index2file_rank_string
 from Classes.UI.Common import render_multiline_text
 
+# -- Performance metrics --
+@cache
+def performance_probe() -> tuple:
+    """
+    Returns psutil module and `psutil.Process` of this process, both created on the first call only
+    (psutil is needed just by the developer theme). CPU usage measurement is started here,
+    so later `psutil.cpu_percent(interval=None)` calls return usage since the previous call without blocking.
+    """
+    import psutil
+    psutil.cpu_percent(interval=None)
+    return psutil, psutil.Process(os.getpid())
+
 # -- Abstract class --
 class AbstractGameplay(UI_base, ABC):
     """
@@ -54,6 +72,16 @@ class AbstractGameplay(UI_base, ABC):
         """List of available moves, without captures"""
         self.possible_captures_arr: list[int] = []
         """List of available moves that end in capture"""
+        self.captures_see: dict[int, int] = {}
+        """Material won (positive) or lost (negative) by available captures (static exchange evaluation)"""
+        self.opponent: Engine | None = None
+        """Engine playing against the user (None if user plays both sides)"""
+        self.opponent_white: bool = False
+        """Whether the opponent plays white pieces"""
+        self.move_cache: MoveCache = MoveCache()
+        """Legal moves of recent positions, filled once per ply (grabbing a piece is then a lookup)"""
+        self.played_moves: list[int] = []
+        """Packed moves (see Classes.Chess.Move) played by both sides since gameplay() started"""
 
         self.set_parameters()
         self.load_assets()
@@ -78,7 +106,7 @@ class AbstractGameplay(UI_base, ABC):
         pass
 
     @abstractmethod
-    def gameplay(self, layout: Layout) -> str:
+    def gameplay(self, layout: Layout, opponent: Engine | None=None, opponent_white: bool=False) -> str:
         """
         Abstract method to display the gameplay screen and handle user input.
 
@@ -120,6 +148,9 @@ class DeveloperGameplay(AbstractGameplay):
         self.param_info_block_rect: pygame.Rect = pygame.Rect(1080, 0, 840, 1080)
         self.param_info_block_layout_change_rect: pygame.Rect = pygame.Rect(1080, 600, 840, 50)
         self.param_info_block_perf_rect: pygame.Rect = pygame.Rect(1080, 650, 840, 300)
+        self.param_info_block_engine_rect: pygame.Rect = pygame.Rect(1080, 950, 840, 50)
+        self.param_info_block_captures_rect: pygame.Rect = pygame.Rect(1080, 1000, 840, 80)
+        self.param_engine_slice_s: float = 0.5 / self.FPS # half of the frame is given to the opponent's search
         self.colors = {
             "Board_background": (33, 110, 46), # Dark green
             "Info_block": (100, 100, 100), # Grey
@@ -260,7 +291,16 @@ class DeveloperGameplay(AbstractGameplay):
                 self.grabbed_piece_field = clicked_field
                 self.gfx_grabbed_piece = self.gfx_pieces[clicked_piece]
                 self.possible_moves_arr, self.possible_captures_arr = \
-                    layout.all_possible_moves_for_piece(clicked_field)
+                    self.move_cache.moves_for_piece(layout, clicked_field)
+                # label captures as winning or losing without a search
+                self.captures_see = {capture: layout.see(encode_move(clicked_field, capture))
+                                     for capture in self.possible_captures_arr}
+                captures_info: str = "Captures: " + ", ".join(
+                    f"{board_index2file_rank_string[capture]} " + 
+                    f"{'winning' if see > 0 else 'losing' if see < 0 else 'even'} ({see:+d})"
+                    for capture, see in self.captures_see.items())
+                self.dirty_rectangles.append((self.param_info_block_captures_rect,
+                    [render_multiline_text(captures_info, self.small_font, self.colors["Info_text"])]))
                 self.whether_layout_has_changed = True
 
             def loosing_grabbed_piece():
@@ -278,7 +318,13 @@ class DeveloperGameplay(AbstractGameplay):
                 # move possible -> do move
                 if clicked_field in self.possible_moves_arr or \
                     clicked_field in self.possible_captures_arr :
-                    layout.update(self.grabbed_piece_field, clicked_field)  # update layout
+                    # pawns are always promoted to a queen (the user can not choose the piece yet)
+                    moved_piece: int = layout.fields[self.grabbed_piece_field]
+                    promotion: int | None = 5 if moved_piece in (1, 9) and (clicked_field > 55 or clicked_field < 8) \
+                        else None
+                    self.played_moves.append(encode_move(self.grabbed_piece_field, clicked_field, promotion,
+                        special_move_code(moved_piece, self.grabbed_piece_field, clicked_field, layout.en_passant)))
+                    layout.update(self.grabbed_piece_field, clicked_field, promotion)  # update layout
                     loosing_grabbed_piece()
                     self.whether_layout_has_changed = True
                 # move not possible
@@ -294,12 +340,14 @@ class DeveloperGameplay(AbstractGameplay):
             # no piece grabbed
             else:
                 # there is piece in the same color (information is in the fourth bit)
+                # and it is not the opponent's turn
                 if clicked_piece != 0 and \
-                    (layout.white_moves == bool(clicked_piece >> 3 & 1)): 
+                    (layout.white_moves == bool(clicked_piece >> 3 & 1)) and \
+                    not (self.opponent is not None and layout.white_moves == self.opponent_white): 
                     grabb_new_piece()
 
     # Main loop
-    def gameplay(self, layout: Layout) -> str:
+    def gameplay(self, layout: Layout, opponent: Engine | None=None, opponent_white: bool=False) -> str:
         """
         Display the gameplay screen and handle user input until 
         user goes back to the main menu or the window is closed.
@@ -307,7 +355,19 @@ class DeveloperGameplay(AbstractGameplay):
         This method enters a loop where it continuously checks for user input,
         updates the UI elements based on that input
         and renders the updated screen.
+
+        Arguments:
+        - layout (Layout): Position the game starts from.
+        - opponent (Engine | None): Engine playing against the user, its search runs in slices 
+            of `param_engine_slice_s` seconds every frame (user plays both sides if None).
+        - opponent_white (bool): Whether the opponent plays white pieces.
+
+        Moves played by both sides are collected in `played_moves` (e.g. to save the game afterwards).
         """
+        self.opponent = opponent
+        self.opponent_white = opponent_white
+        self.played_moves = []
+
         # display initial gameplay screen
         self.gamplay_init(layout)
 
@@ -319,16 +379,32 @@ class DeveloperGameplay(AbstractGameplay):
                 # place pieces
                 pos_x, pos_y = self.param_board_pos
                 tile_x, tile_y = self.param_tile_size
-                for i, piece in enumerate(layout.fields):
-                    # if there is a piece
-                    if piece:
+                # only occupied fields are visited (piece lists of both colours)
+                for pieces in layout.piece_squares:
+                    for i in pieces:
                         # if the piece is not currently grabbed
                         if self.grabbed_piece_field and i != self.grabbed_piece_field:
-                            self.background_mask.blit(self.gfx_pieces[piece],
+                            self.background_mask.blit(self.gfx_pieces[layout.fields[i]],
                                                       (pos_x + tile_x * (i % 8),
                                                        pos_y + tile_y * (i//8)))
                                                         # % and // - ranks and files
         
+        def opponent_move():
+            if self.opponent is None or layout.white_moves != self.opponent_white:
+                return
+            if not self.opponent.is_searching:
+                if not self.move_cache.has_legal_move(layout):
+                    return # game is over
+                self.opponent.start(layout)
+            # search is continued in every frame until it is finished
+            result = self.opponent.step(self.param_engine_slice_s)
+            if result is not None and result.move is not None:
+                self.played_moves.append(result.move)
+                layout.update(*decode_move(result.move))
+                self.whether_layout_has_changed = True
+                self.dirty_rectangles.append((self.param_info_block_engine_rect,
+                    [render_multiline_text(f"Engine: {result}", self.small_font, self.colors["Info_text"])]))
+
         def mouse_hover():
             if not self.grabbed_piece_field and \
                 (mhr_rect := self.mouse_field_rect()) != mhr_rect_old:
@@ -395,11 +471,12 @@ class DeveloperGameplay(AbstractGameplay):
                 self.perf_min_fps = min(self.perf_min_fps, current_fps)
 
             # get memory usage
-            current_memory_usage: int = psutil.Process(os.getpid()).memory_info().rss / 1024 / 1024  # Convert to MB
+            psutil, process = performance_probe()
+            current_memory_usage: int = process.memory_info().rss / 1024 / 1024  # Convert to MB
             self.perf_max_memory_usage = max(self.perf_max_memory_usage, current_memory_usage)
 
-            # get cpu usage
-            cpu_usage: float = psutil.cpu_percent(interval=0.1)
+            # get cpu usage (since the previous frame with metrics, does not block the frame)
+            cpu_usage: float = psutil.cpu_percent(interval=None)
 
             # Render debugging information
             perf_info = f"Current FPS: {current_fps:.2f}\n" + \
@@ -420,6 +497,8 @@ class DeveloperGameplay(AbstractGameplay):
             # get and menege user input
             # Whether the window was closed
             if self.get_input():
+                if self.opponent is not None:
+                    self.opponent.stop()
                 return "Terminated"
             
             # Wheter any interaction happened
@@ -431,6 +510,9 @@ class DeveloperGameplay(AbstractGameplay):
                 self.mouse_down_handling(layout)
                 self.mouse_clicked = False
 
+            # Opponent
+            opponent_move()
+
             # Pieces
             reset_background_mask()
 
@@ -443,6 +525,11 @@ class DeveloperGameplay(AbstractGameplay):
             # Information block
             info_block()
 
+            # Legal moves of a new position are generated once, before the user grabs a piece
+            if self.whether_layout_has_changed and \
+                not (self.opponent is not None and layout.white_moves == self.opponent_white):
+                self.move_cache.warm(layout)
+
             # Reset variables
             if self.whether_layout_has_changed:
                 self.background_mask.blit(self.screen.subsurface(self.param_board_rect), self.param_board_pos)
@@ -463,15 +550,16 @@ class DeveloperGameplay(AbstractGameplay):
         self.empty_chessboard_mask = self.screen.subsurface(self.param_board_rect)
 
         # pieces
-        for i, piece in enumerate(layout.fields):
-            if piece:
-                self.screen.blit(self.gfx_pieces[piece], 
+        for pieces in layout.piece_squares:
+            for i in pieces:
+                self.screen.blit(self.gfx_pieces[layout.fields[i]], 
                                             (60 + 120 * (i % 8), 60 + 120 * (i//8)))
                                             # 80 - board shift on screen
                                             # 120 - tile size
                                             # % or // - ranks and files
-        # save screen as mask             
+        # save screen as mask (memorized subsurfaces belong to the previous one)
         self.background_mask = self.screen.copy()
+        self.memo.clear()
 
         # Info Block
         self.screen.blit(render_multiline_text(str(layout),self.small_font, 
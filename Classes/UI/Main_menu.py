@@ -15,6 +15,7 @@ import pygame
 import os
 # project modules
 from Classes.UI.Base import UI_base
+from Classes.UI.Common import StartupProfile
 
 
 class Main_menu(UI_base):
@@ -35,21 +36,25 @@ class Main_menu(UI_base):
         - option_piece_rects (list[pygame.Rect]): List of rectangles that encapsulate the option piece.
 
     Methods:
-        - __init__(root_dir: str) -> None: Initialize the main menu by loading assets and preparing the UI elements.
+        - __init__(root_dir: str, startup_profile: StartupProfile | None = None) -> None: Initialize the main menu by loading assets and preparing the UI elements.
         - load_assets() -> None: Load the necessary graphical assets for the main menu and prepare the UI elements.
         - display_menu() -> str | None: Display the main menu and handle user input until a menu option is selected or the window is closed.
         - screen_init() -> None: Render the initial screen of the main menu.
         - handle_input() -> str | None: Handle user input to navigate through the menu options or select an option.
     """
-    def __init__(self, root_dir: str) -> None:
+    def __init__(self, root_dir: str, startup_profile: StartupProfile | None = None) -> None:
         """
         Initialize the main menu by loading assets and preparing the UI elements.
 
         Parameters:
             - root_dir (str): The root directory of the project for easy relative path operations.
+            - startup_profile (StartupProfile | None): Profile of the startup, finished and printed 
+                                                       after the first frame of the menu.
         """
-        super().__init__(root_dir)
+        super().__init__(root_dir, startup_profile)
         self.load_assets()
+        if self.startup_profile is not None:
+            self.startup_profile.mark("asset load")
 
     def load_assets(self) -> None:
         """
@@ -131,6 +136,12 @@ class Main_menu(UI_base):
             # Update UI
             self.update()
 
+            # the first frame is on the screen, the game is interactive from now on
+            if self.startup_profile is not None:
+                self.startup_profile.mark("first frame")
+                print(self.startup_profile)
+                self.startup_profile = None
+
     def screen_init(self) -> None:
         """
         Renders the initial screen of the main menu 
@@ -147,8 +158,9 @@ class Main_menu(UI_base):
             self.screen.blit(opt, (option_coord_x, option_coord_y))
             option_coord_y += 120
 
-        # save screen as mask
+        # save screen as mask (memorized subsurfaces belong to the previous one)
         self.background_mask = self.screen.copy()
+        self.memo.clear()
         
         self.screen.blit(self.rook_gfx, (self.title_coord[0] + 10, 370))
         
@@ -190,7 +202,7 @@ class Main_menu(UI_base):
                      return "Play"
                 # Load
                 if self.current_option == 1: 
-                     raise NotImplementedError()
+                     return "Load"
                 # Exit
                 if self.current_option == 2:
                     return "Exit"
@@ -2,20 +2,53 @@
 Main file of the project. 
 This script works as programm launcher, imports and runs game instance.
 
+Usage:
+    python main.py                      # game window
+    python main.py --profile-startup    # game window, prints duration of startup phases after the first frame
+    python main.py --headless           # rules engine on standard input / output, without the UI (see Classes.Chess.Headless)
+
 Author: WK-K
 """
 
-# Project modules
-import Classes.Game as game
 # Standard modules
+import time
+started: float = time.perf_counter() # startup time is measured from here
+import argparse
 import os
+import sys
 
-# MAIN
-if __name__ == "__main__":
+def main(argv: list[str] | None=None) -> int:
+    """Parses launcher arguments and runs the game (or the headless engine), returns exit code."""
+    parser = argparse.ArgumentParser(prog="python main.py", description="Chess game launcher.")
+    parser.add_argument("--headless", action="store_true",
+                        help="drive the rules engine over standard input / output without loading the UI (pygame); " +
+                             "other arguments are passed to Classes.Chess.Headless (e.g. --check-startup)")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="print time of startup phases of the game window (imports, display init, asset load, " +
+                             "first frame)")
+    args, rest = parser.parse_known_args(argv)
+
+    if args.headless:
+        if args.profile_startup:
+            parser.error("--profile-startup measures the game window, use --headless --check-startup instead")
+        # Project modules (Classes.Chess only, UI modules are never imported)
+        from Classes.Chess.Headless import main as headless_main
+        return headless_main(rest, started)
+    if rest:
+        parser.error(f"unrecognized arguments: {' '.join(rest)}")
+
+    # Project modules
+    import Classes.Game as game
+    from Classes.UI.Common import StartupProfile
+    profile: StartupProfile | None = StartupProfile(started) if args.profile_startup else None
+    if profile is not None:
+        profile.mark("imports")
     # Get current directory for easy relative paths
     scripts_directory: str = os.path.dirname(os.path.abspath(__file__))
     # Run the program
-    game.Game(scripts_directory)
-
-
+    game.Game(scripts_directory, profile)
+    return 0
 
+# MAIN
+if __name__ == "__main__":
+    sys.exit(main())